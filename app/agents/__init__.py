@@ -1,16 +1,14 @@
 """Agents module."""
 
-# Import submodules for backward compatibility
-from . import orchestrator
-from . import user_query_validator
-from . import mongo_query_builder
-from . import result_summarizer
-from . import suggested_questions
+from app.utils.lazy import lazyExports
 
-__all__ = [
+
+# Submodules load on first access (app.agents.orchestrator pulls in every agent).
+__getattr__, __dir__, __all__ = lazyExports(__name__, {}, submodules=[
     "orchestrator",
     "user_query_validator",
     "mongo_query_builder",
+    "mongo_query_validator",
     "result_summarizer",
     "suggested_questions",
-]
+])
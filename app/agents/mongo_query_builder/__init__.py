@@ -1,4 +1,7 @@
-from .mongo_query_builder import runMongoQueryBuilder
-from .schemas import MongoQueryOutput
+from app.utils.lazy import lazyExports
 
-__all__ = ["runMongoQueryBuilder", "MongoQueryOutput"]
+
+__getattr__, __dir__, __all__ = lazyExports(__name__, {
+    "runMongoQueryBuilder": ".mongo_query_builder",
+    "MongoQueryOutput": ".schemas",
+})
@@ -1,14 +1,12 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import json
 from pathlib import Path
 
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-
 from .schemas import MongoQueryOutput
-from app.core.llm import getChatModel
-from app.utils.prompt_loader import loadPrompt
-from app.utils.field_catalog import loadFieldCatalog
-from app.utils.data_overview import loadDataOverview
+from app.core.llm import runAgentChain, usesNativeStructuredOutput
+from app.utils.prompt_builder import buildAgentPrompt
+from app.db.session_store import SessionTurn
+from app.db.entity_index import EntityMatch
 
 
 PROMPTS_DIR = Path(__file__).parent
@@ -62,38 +60,45 @@ def runMongoQueryBuilder(
     history: List[Dict[str, Any]],
     collectionName: str,
     refinement: str = None,
+    previousTurn: Optional[SessionTurn] = None,
+    resolvedEntities: Optional[List[EntityMatch]] = None,
 ) -> MongoQueryOutput:
-    systemPrompt = loadPrompt(PROMPTS_DIR, "query_builder_system.txt")
-
-    userPrompt = loadPrompt(PROMPTS_DIR, "query_builder_user.txt")
-
-    dataOverview = loadDataOverview()
-    fieldCatalog = loadFieldCatalog()
-
-    parser = PydanticOutputParser(pydantic_object=MongoQueryOutput)
-
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", systemPrompt + "\n\n{format_instructions}"),
-            ("human", userPrompt),
-        ]
+    prompt, parser = buildAgentPrompt(
+        PROMPTS_DIR,
+        "query_builder_system.txt",
+        "query_builder_user.txt",
+        MongoQueryOutput,
+        native=usesNativeStructuredOutput("mongo_query_builder"),
     )
 
-    model = getChatModel()
-
-    chain = prompt.partial(format_instructions=parser.get_format_instructions()) | model | parser
-
     trimmedHistory = history[-5:] if history else []
 
-    result = chain.invoke(
+    previousResult = "None"
+    if previousTurn is not None:
+        previousResult = json.dumps(
+            {
+                "question": previousTurn.normalizedQuery,
+                "pipeline": previousTurn.pipeline,
+                "columns": previousTurn.columns,
+                "rowCount": previousTurn.resultCount,
+            },
+            default=str,
+        )
+
+    result = runAgentChain(
+        "mongo_query_builder",
+        prompt,
+        parser,
         {
             "normalizedQuery": normalizedQuery,
             "history": trimmedHistory,
             "collectionName": collectionName,
-            "dataOverview": dataOverview,
-            "fieldCatalog": fieldCatalog,
-            "refinement": refinement or "None"
-        }
+            "refinement": refinement or "None",
+            "previousResult": previousResult,
+            "resolvedEntities": "\n".join(
+                f'- "{m.mention}" -> {m.field} = "{m.value}"' for m in resolvedEntities
+            ) if resolvedEntities else "None",
+        },
     )
 
     # Validate pipeline before returning
@@ -28,3 +28,8 @@ class MongoQueryOutput(BaseModel):
         default_factory=list,
         description="List of columns that will be returned in the query results with their types"
     )
+
+    applyToPrevious: bool = Field(
+        default=False,
+        description="True when the pipeline post-processes the previous result set instead of querying the collection"
+    )
@@ -1,3 +1,9 @@
-from .mongo_query_validator import runMongoQueryValidator
+from app.utils.lazy import lazyExports
 
-__all__ = ["runMongoQueryValidator"]
+
+__getattr__, __dir__, __all__ = lazyExports(__name__, {
+    "runMongoQueryValidator": ".mongo_query_validator",
+    "runHeuristicValidation": ".heuristics",
+    "recordValidatorDecision": ".heuristics",
+    "getValidatorStats": ".heuristics",
+})
@@ -0,0 +1,199 @@
+"""Deterministic result checks that decide whether the LLM validator is needed."""
+
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .schemas import HeuristicValidationOutput
+from app.core.config import settings
+
+
+# Text fields the query builder matches with regex; several distinct values
+# for one of these usually means the user asked about one entity and got many.
+ENTITY_FIELDS = [
+    "department_name",
+    "supplier_name",
+    "commodity_title",
+    "acquisition_method",
+    "acquisition_type",
+    "item_name",
+]
+
+SAMPLE_SIZE = 50
+
+
+_statsLock = Lock()
+
+_stats: Dict[str, int] = {"checked": 0, "skipped": 0, "escalated": 0}
+
+
+def recordValidatorDecision(skipped: bool) -> None:
+    with _statsLock:
+        _stats["checked"] += 1
+
+        if skipped:
+            _stats["skipped"] += 1
+        else:
+            _stats["escalated"] += 1
+
+
+def getValidatorStats() -> Dict[str, Any]:
+    """Return how often the LLM validator was skipped by the local checks."""
+    with _statsLock:
+        stats: Dict[str, Any] = dict(_stats)
+
+    stats["skipRate"] = round(stats["skipped"] / stats["checked"], 4) if stats["checked"] else 0.0
+
+    return stats
+
+
+def _collectKeys(value: Any, keys: Set[str]) -> None:
+    if isinstance(value, dict):
+        for key, nested in value.items():
+            keys.add(key)
+            _collectKeys(nested, keys)
+    elif isinstance(value, list):
+        for item in value:
+            _collectKeys(item, keys)
+
+
+def _regexEntityFields(spec: Any, fields: Set[str]) -> None:
+    """Collect entity fields matched with $regex anywhere inside a $match spec."""
+    if isinstance(spec, dict):
+        for key, value in spec.items():
+            if key in ENTITY_FIELDS and (
+                (isinstance(value, dict) and "$regex" in value) or hasattr(value, "pattern")
+            ):
+                fields.add(key)
+            elif key == "$regexMatch" and isinstance(value, dict):
+                inputPath = value.get("input")
+                if isinstance(inputPath, str) and inputPath.lstrip("$") in ENTITY_FIELDS:
+                    fields.add(inputPath.lstrip("$"))
+            else:
+                _regexEntityFields(value, fields)
+    elif isinstance(spec, list):
+        for item in spec:
+            _regexEntityFields(item, fields)
+
+
+def _stageNames(pipeline: List[Dict[str, Any]]) -> Set[str]:
+    return {operator for stage in pipeline for operator in stage}
+
+
+def _groupedByField(pipeline: List[Dict[str, Any]], field: str) -> bool:
+    """Whether a $group stage uses the field itself as its scalar _id."""
+    return any(
+        isinstance(stage.get("$group"), dict) and stage["$group"].get("_id") == f"${field}"
+        for stage in pipeline
+    )
+
+
+def _distinctValues(
+    results: Iterable[Dict[str, Any]],
+    field: str,
+    groupedById: bool,
+) -> Optional[Set[str]]:
+    values: Set[str] = set()
+    seen = False
+
+    for row in results:
+        if field in row:
+            value = row[field]
+        elif isinstance(row.get("_id"), dict) and field in row["_id"]:
+            value = row["_id"][field]
+        elif groupedById and "_id" in row:
+            value = row["_id"]
+        else:
+            continue
+
+        seen = True
+        if value is not None:
+            values.add(str(value))
+
+    return values if seen else None
+
+
+def runHeuristicValidation(
+    pipeline: List[Dict[str, Any]],
+    results: List[Dict[str, Any]],
+    columns: List[Any],
+) -> HeuristicValidationOutput:
+    """
+    Run cheap local checks over the aggregation results.
+
+    Results that pass every check can go straight to summarization; anything
+    flagged here should be escalated to the LLM query validator.
+
+    Args:
+        pipeline: Aggregation pipeline that produced the results
+        results: Result documents returned by MongoDB
+        columns: Column metadata declared by the query builder
+
+    Returns:
+        HeuristicValidationOutput with the findings and any entity context
+    """
+    reasons: List[str] = []
+    contextParts: List[str] = []
+
+    # 1. Empty results usually mean the match criteria were too strict.
+    
+    if not results:
+        return HeuristicValidationOutput(isSuspicious=True, reasons=["Query returned no results."])
+
+    # 2. Cardinality: raw record listings must be bounded.
+    
+    stages = _stageNames(pipeline)
+
+    if len(results) > settings.heuristicMaxRows:
+        reasons.append(f"Query returned {len(results)} rows, more than the expected maximum of {settings.heuristicMaxRows}.")
+    elif not stages & {"$group", "$limit", "$count", "$bucket", "$bucketAuto", "$sortByCount"}:
+        reasons.append("Query returns individual records without any $limit or aggregation.")
+
+    # 3. Declared columns must match the result shape.
+    
+    declared = {getattr(col, "name", col) for col in columns}
+    sample = results[:SAMPLE_SIZE]
+    presentKeys: Set[str] = set()
+    topLevelKeys: Set[str] = set()
+
+    for row in sample:
+        topLevelKeys.update(row.keys())
+        _collectKeys(row, presentKeys)
+
+    missing = sorted(declared - presentKeys)
+    undeclared = sorted(topLevelKeys - declared - {"_id"})
+
+    if missing:
+        reasons.append(f"Declared columns missing from results: {', '.join(missing)}.")
+    if undeclared:
+        reasons.append(f"Result fields not declared as columns: {', '.join(undeclared)}.")
+
+    # 4. Columns where every value is null point at a wrong field reference.
+    
+    allNull = [key for key in sorted(topLevelKeys) if all(row.get(key) is None for row in results)]
+
+    if allNull:
+        reasons.append(f"Columns with only null values: {', '.join(allNull)}.")
+
+    # 5. Regex-vs-exact: a regex on an entity field should resolve to one entity.
+    
+    regexFields: Set[str] = set()
+    for stage in pipeline:
+        if "$match" in stage:
+            _regexEntityFields(stage["$match"], regexFields)
+
+    for field in sorted(regexFields):
+        values = _distinctValues(results, field, _groupedByField(pipeline, field))
+
+        if values is None:
+            reasons.append(f"Regex match on {field} but {field} is not included in the results.")
+        elif len(values) > 1:
+            preview = ", ".join(sorted(values)[:5])
+            reasons.append(f"Regex match on {field} matched {len(values)} different values: {preview}.")
+        elif values:
+            contextParts.append(f"Matched {field}: {next(iter(values))}")
+
+    return HeuristicValidationOutput(
+        isSuspicious=bool(reasons),
+        reasons=reasons,
+        context="; ".join(contextParts) or None,
+    )
@@ -1,15 +1,11 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pathlib import Path
-import json
-
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
 
 from .schemas import MongoQueryValidatorOutput
-from app.core.llm import getChatModel
-from app.utils.prompt_loader import loadPrompt
-from app.utils.field_catalog import loadFieldCatalog
-from app.utils.data_overview import loadDataOverview
+from app.core.llm import runAgentChain, usesNativeStructuredOutput
+from app.utils.prompt_builder import buildAgentPrompt
+from app.utils.result_digest import resultsForPrompt
+from app.utils.serialization import dumpsJsonText
 
 
 PROMPTS_DIR = Path(__file__).parent
@@ -21,41 +17,34 @@ def runMongoQueryValidator(
     pipeline: List[Dict[str, Any]],
     results: List[Dict[str, Any]],
     history: List[Dict[str, Any]],
+    findings: Optional[List[str]] = None,
+    columns: Optional[List[Dict[str, Any]]] = None,
 ) -> MongoQueryValidatorOutput:
-    systemPrompt = loadPrompt(PROMPTS_DIR, "validator_system.txt")
-    userPrompt = loadPrompt(PROMPTS_DIR, "validator_user.txt")
-
-    dataOverview = loadDataOverview()
-    fieldCatalog = loadFieldCatalog()
-
-    parser = PydanticOutputParser(pydantic_object=MongoQueryValidatorOutput)
-
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", systemPrompt + "\n\n{format_instructions}"),
-            ("human", userPrompt),
-        ]
+    prompt, parser = buildAgentPrompt(
+        PROMPTS_DIR,
+        "validator_system.txt",
+        "validator_user.txt",
+        MongoQueryValidatorOutput,
+        native=usesNativeStructuredOutput("mongo_query_validator"),
     )
 
-    model = getChatModel()
-
-    chain = prompt.partial(format_instructions=parser.get_format_instructions()) | model | parser
-
-    # Limit results sent to LLM to avoid token overflow
-    limitedResults = results[:50] if len(results) > 50 else results
+    # Limit results sent to LLM to avoid token overflow: large results go in as a digest
+    resultsText = resultsForPrompt("mongo_query_validator", results, columns)
     trimmedHistory = history[-5:] if history else []
 
-    result = chain.invoke(
+    result = runAgentChain(
+        "mongo_query_validator",
+        prompt,
+        parser,
         {
             "userMessage": userMessage,
             "normalizedQuery": normalizedQuery,
             "history": trimmedHistory,
-            "pipeline": json.dumps(pipeline, indent=2),
-            "results": json.dumps(limitedResults, indent=2, default=str),
+            "pipeline": dumpsJsonText(pipeline, indent=True),
+            "results": resultsText,
             "resultCount": len(results),
-            "dataOverview": dataOverview,
-            "fieldCatalog": fieldCatalog,
-        }
+            "findings": "\n".join(f"- {f}" for f in findings) if findings else "None",
+        },
     )
 
     return result
@@ -17,3 +17,20 @@ class MongoQueryValidatorOutput(BaseModel):
         default=None,
         description="Additional context about matched entities or refinements to pass to summarizer"
     )
+
+
+class HeuristicValidationOutput(BaseModel):
+    isSuspicious: bool = Field(
+        ...,
+        description="Whether the local checks found anything that needs the LLM validator"
+    )
+
+    reasons: List[str] = Field(
+        default_factory=list,
+        description="Human-readable findings from the local checks"
+    )
+
+    context: Optional[str] = Field(
+        default=None,
+        description="Context about matched entities to pass to summarizer"
+    )
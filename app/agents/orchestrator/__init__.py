@@ -1,3 +1,8 @@
-from .orchestrator import runProcurementAssistant
+from app.utils.lazy import lazyExports
 
-__all__ = ["runProcurementAssistant"]
+
+__getattr__, __dir__, __all__ = lazyExports(__name__, {
+    "runProcurementAssistant": ".orchestrator",
+    "getSingleFlightStats": ".orchestrator",
+    "normalizeQuestion": ".orchestrator",
+})
@@ -1,20 +1,188 @@
-from typing import Any, Dict, List
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import xxhash
+from pymongo.errors import WaitQueueTimeoutError
 
 from app.agents.user_query_validator import runUserQueryValidator
 from app.agents.mongo_query_builder import runMongoQueryBuilder
-from app.agents.mongo_query_validator import runMongoQueryValidator
+from app.agents.mongo_query_validator import (
+    runMongoQueryValidator,
+    runHeuristicValidation,
+    recordValidatorDecision,
+)
 from app.agents.result_summarizer import runResultSummarizer
-from app.agents.suggested_questions import runSuggestedQuestions
+from app.agents.suggested_questions import getSuggestionBank, runSuggestedQuestions
+
+from app.core.config import settings
+from app.core.concurrency import SingleFlight
+from app.core.deadline import DeadlineExceeded, latencyBudget, requestDeadline
+from app.core.metrics import cacheEvents, refinementIterations, requestDuration, requestOutcomes
+from app.core.tracing import setSpanAttributes, startSpan
+from app.db.mongo import pipelineHash, runAggregation
+from app.db.pagination import firstPage
+from app.db.pipeline_policy import enforcePipelinePolicy
+from app.db.pipeline_registry import getPipelineRegistry
+from app.db.local_aggregation import runLocalAggregation, UnsupportedPipelineError
+from app.db.session_store import SessionTurn, getSessionStore
+from app.db.entity_index import resolveEntities
+from app.agents.mongo_query_builder import MongoQueryOutput
+
+
+_singleFlight = SingleFlight()
+
+
+def getSingleFlightStats() -> Dict[str, int]:
+    return _singleFlight.stats()
+
+
+def _executeQuery(
+    queryOutput: MongoQueryOutput,
+    previousTurn: Optional[SessionTurn],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Run the builder's pipeline and return (effective pipeline, results).
+
+    Follow-up pipelines run locally on the previous turn's cached rows; when
+    that isn't possible they are appended to the previous pipeline and sent
+    to MongoDB, which yields the same result.
+
+    Raises:
+        PipelinePolicyError: If the pipeline breaks the pipeline policy (the
+            message is fed back to the builder as refinement guidance)
+        WaitQueueTimeoutError: If no pooled connection frees up within
+            MONGO_WAIT_QUEUE_TIMEOUT_MS
+    """
+    columns = [col.name for col in queryOutput.columns]
+
+    # Important: nothing generated reaches MongoDB without passing the pipeline policy.
+
+    if not (queryOutput.applyToPrevious and previousTurn is not None):
+        queryPipeline = enforcePipelinePolicy(queryOutput.pipeline)
+        return queryPipeline, runAggregation(queryPipeline, columns=columns)
+
+    # A local $group can't yield more groups than the cached rows, so the group estimate (made for
+    # the whole collection) only applies once the combined pipeline goes to MongoDB below.
+
+    queryPipeline = enforcePipelinePolicy(queryOutput.pipeline, checkGroups=False)
+
+    pipeline = previousTurn.pipeline + queryPipeline
+
+    if previousTurn.results is not None:
+        try:
+            results = runLocalAggregation(previousTurn.results, queryPipeline)
+            cacheEvents.inc(cache="session_results", result="hit")
+            setSpanAttributes(sessionCacheHit=True)
+            return pipeline, results
+        except UnsupportedPipelineError:
+            pass
+
+    cacheEvents.inc(cache="session_results", result="miss")
+    setSpanAttributes(sessionCacheHit=False)
+
+    pipeline = enforcePipelinePolicy(pipeline)
+
+    return pipeline, runAggregation(pipeline, columns=columns)
+
 
-from app.db.mongo import runAggregation
-from app.utils.serialization import convertObjectIds
+def normalizeQuestion(message: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a question."""
+    return " ".join(message.lower().split()).rstrip("?!. ")
+
+
+def _requestKey(
+    message: str,
+    history: List[Dict[str, Any]],
+    collectionName: str,
+    previousTurn: Optional[SessionTurn],
+) -> str:
+    """Hash of everything the answer depends on: normalized message, history and prior result."""
+    payload = {
+        "message": normalizeQuestion(message),
+        "history": history,
+        "collection": collectionName,
+        "previousPipeline": previousTurn.pipeline if previousTurn else None,
+    }
+
+    return xxhash.xxh3_64_hexdigest(json.dumps(payload, sort_keys=True, default=str))
 
 
 def runProcurementAssistant(
     message: str,
     history: List[Dict[str, Any]],
     collectionName: str,
+    sessionId: Optional[str] = None,
 ) -> Dict[str, Any]:
+    sessionStore = getSessionStore()
+    session = sessionStore.getOrCreate(sessionId) if sessionId else None
+    previousTurn = session.lastResultTurn() if session else None
+
+    # Important: prefer server-side history when the client didn't send any.
+    
+    if session and not history:
+        history = session.toHistory()[-5:]
+
+    def answer() -> Tuple[Dict[str, Any], Optional[SessionTurn]]:
+        with requestDeadline(settings.requestTimeoutSeconds), latencyBudget(settings.latencyBudgetSeconds):
+            return _answerQuestion(message, history, collectionName, previousTurn)
+
+    startedAt = time.perf_counter()
+    status = "exception"
+
+    with startSpan("orchestrator", followUp=previousTurn is not None) as span:
+        try:
+            # Identical in-flight questions share one agent chain run.
+            
+            if settings.singleFlightEnabled:
+                (response, turn), shared = _singleFlight.do(
+                    _requestKey(message, history, collectionName, previousTurn),
+                    answer,
+                )
+                cacheEvents.inc(cache="single_flight", result="hit" if shared else "miss")
+                span.setAttributes(singleFlightShared=shared)
+            else:
+                response, turn = answer()
+
+            status = response.get("status", "ok")
+        except DeadlineExceeded as e:
+            response = {
+                "status": "timeout",
+                "error": f"Request timed out: {str(e)}",
+                "suggestedQuestions": [],
+            }
+            turn = None
+            status = "timeout"
+        except WaitQueueTimeoutError as e:
+            # Important: an exhausted connection pool is load, not a bad query; the route answers 503.
+            response = {
+                "status": "unavailable",
+                "error": f"Database is busy, try again shortly: {str(e)}",
+                "suggestedQuestions": [],
+            }
+            turn = None
+            status = "unavailable"
+        finally:
+            requestOutcomes.inc(status=status)
+            requestDuration.observe(time.perf_counter() - startedAt, status=status)
+            span.setAttributes(status=status)
+
+    response = dict(response)
+
+    if session is not None:
+        if turn is not None:
+            sessionStore.appendTurn(session, turn.model_copy())
+        response["sessionId"] = session.sessionId
+
+    return response
+
+
+def _answerQuestion(
+    message: str,
+    history: List[Dict[str, Any]],
+    collectionName: str,
+    previousTurn: Optional[SessionTurn],
+) -> Tuple[Dict[str, Any], Optional[SessionTurn]]:
     # Agent 1: User Query Validator
     validatorResult = runUserQueryValidator(message=message, history=history)
     
@@ -25,74 +193,123 @@ def runProcurementAssistant(
             answer=validatorResult.clarifyingQuestion,
             history=history + [{"role": "assistant", "content": validatorResult.clarifyingQuestion}]
         )
-        return {
+        clarification = {
             "status": "needs_clarification",
             "clarifyingQuestion": validatorResult.clarifyingQuestion,
             "suggestedQuestions": suggestionsOutput.suggestedQuestions,
         }
+        clarificationTurn = SessionTurn(
+            message=message,
+            normalizedQuery="",
+            answer=validatorResult.clarifyingQuestion,
+        )
+
+        return clarification, clarificationTurn
 
     normalizedQuery = validatorResult.normalizedQuery or message
     historyWithNormalized = history + [{"role": "assistant", "content": f"Normalized: {normalizedQuery}"}]
 
+    # Resolve entity mentions up front so the builder can use exact matches.
+    with startSpan("entity_resolution") as span:
+        resolvedEntities = resolveEntities(normalizedQuery)
+        span.setAttributes(matches=len(resolvedEntities))
+
     maxRefinements = 1
     refinementCount = 0
     refinementGuidance = None
     queryContext = None
     executionErrorRetry = False
 
+    attempt = 0
+
     while refinementCount <= maxRefinements:
-        # Agent 2: Mongo Query Builder
-        try:
-            queryOutput = runMongoQueryBuilder(
-                normalizedQuery=normalizedQuery,
-                history=historyWithNormalized,
-                collectionName=collectionName,
-                refinement=refinementGuidance,
-            )
-            pipeline = queryOutput.pipeline
-        except (ValueError, Exception) as e:
-            return {
-                "status": "error",
-                "error": f"Unable to generate query: {str(e)}",
-                "suggestedQuestions": [],
-            }
+        attempt += 1
 
-        try:
-            results = runAggregation(pipeline)
-        except Exception as e:
-            if not executionErrorRetry:
-                executionErrorRetry = True
-                refinementGuidance = f"Previous query failed: {str(e)}. Fix the query."
-                continue
-            return {
-                "status": "error",
-                "error": f"Database query failed: {str(e)}",
-                "suggestedQuestions": [],
-            }
+        with startSpan("refinement", iteration=attempt) as iterationSpan:
+            # Agent 2: Mongo Query Builder
+            try:
+                queryOutput = runMongoQueryBuilder(
+                    normalizedQuery=normalizedQuery,
+                    history=historyWithNormalized,
+                    collectionName=collectionName,
+                    refinement=refinementGuidance,
+                    previousTurn=previousTurn,
+                    resolvedEntities=resolvedEntities,
+                )
+            except DeadlineExceeded:
+                raise
+            except (ValueError, Exception) as e:
+                return {
+                    "status": "error",
+                    "error": f"Unable to generate query: {str(e)}",
+                    "suggestedQuestions": [],
+                }, None
 
-        # Agent 3: Mongo Query Validator
-        try:
-            queryValidation = runMongoQueryValidator(
-                userMessage=message,
-                normalizedQuery=normalizedQuery,
-                pipeline=pipeline,
-                results=results,
-                history=history,
-            )
+            try:
+                pipeline, results = _executeQuery(queryOutput, previousTurn)
+                iterationSpan.setAttributes(pipelineHash=pipelineHash(pipeline), resultCount=len(results))
+            except (DeadlineExceeded, WaitQueueTimeoutError):
+                raise
+            except Exception as e:
+                iterationSpan.setAttributes(queryError=str(e))
+                if not executionErrorRetry:
+                    executionErrorRetry = True
+                    refinementGuidance = f"Previous query failed: {str(e)}. Fix the query."
+                    continue
+                return {
+                    "status": "error",
+                    "error": f"Database query failed: {str(e)}",
+                    "suggestedQuestions": [],
+                }, None
+
+            # Local result checks: only escalate suspicious results to the LLM validator.
+            heuristicFindings = None
+            if settings.heuristicValidatorEnabled:
+                heuristicResult = runHeuristicValidation(
+                    pipeline=pipeline,
+                    results=results,
+                    columns=queryOutput.columns,
+                )
+
+                recordValidatorDecision(skipped=not heuristicResult.isSuspicious)
+                cacheEvents.inc(cache="query_validator", result="miss" if heuristicResult.isSuspicious else "hit")
+                iterationSpan.setAttributes(validatorSkipped=not heuristicResult.isSuspicious)
+
+                if not heuristicResult.isSuspicious:
+                    queryContext = heuristicResult.context
+                    break
+
+                heuristicFindings = heuristicResult.reasons
+
+            # Agent 3: Mongo Query Validator
+            try:
+                queryValidation = runMongoQueryValidator(
+                    userMessage=message,
+                    normalizedQuery=normalizedQuery,
+                    pipeline=pipeline,
+                    results=results,
+                    history=history,
+                    findings=heuristicFindings,
+                    columns=[col.model_dump(mode="json") for col in queryOutput.columns],
+                )
             
-            if queryValidation.isValid:
-                queryContext = queryValidation.context
-                break
+                if queryValidation.isValid:
+                    queryContext = queryValidation.context
+                    break
+            
+                if refinementCount >= maxRefinements:
+                    queryContext = queryValidation.context
+                    break
             
-            if refinementCount >= maxRefinements:
+                refinementGuidance = queryValidation.refinement
                 queryContext = queryValidation.context
+                refinementCount += 1
+            except DeadlineExceeded:
+                raise
+            except Exception:
                 break
-            
-            refinementGuidance = queryValidation.refinement
-            queryContext = queryValidation.context
-            refinementCount += 1
-        except Exception:
-            break
+
+    refinementIterations.observe(refinementCount + (1 if executionErrorRetry else 0))
 
     historyWithQuery = historyWithNormalized + [
         {"role": "assistant", "content": f"Pipeline: {len(pipeline)} stages"}
@@ -104,21 +321,52 @@ def runProcurementAssistant(
     summarizerOutput = runResultSummarizer(
         question=normalizedQuery, 
         results=results, 
-        history=historyWithQuery
+        history=historyWithQuery,
+        columns=[col.model_dump(mode="json") for col in queryOutput.columns],
     )
     
     # Agent 5: Suggested Questions
     suggestionsOutput = runSuggestedQuestions(
         question=normalizedQuery,
         answer=summarizerOutput.answer,
-        history=historyWithQuery + [{"role": "assistant", "content": summarizerOutput.answer}]
+        history=historyWithQuery + [{"role": "assistant", "content": summarizerOutput.answer}],
+        entities={match.field: match.value for match in resolvedEntities},
+    )
+
+    # Questions that returned data become suggestions for later requests.
+
+    if results:
+        getSuggestionBank().learn(normalizedQuery)
+
+    turn = SessionTurn(
+        message=message,
+        normalizedQuery=normalizedQuery,
+        pipeline=pipeline,
+        columns=[col.model_dump(mode="json") for col in queryOutput.columns],
+        results=results if len(results) <= settings.sessionMaxRows else None,
+        resultCount=len(results),
+        answer=summarizerOutput.answer,
     )
 
-    return {
+    # Important: register the pipeline so the full result can be exported by hash.
+
+    exportHash = getPipelineRegistry().register(pipeline, turn.columns)
+
+    # Large result sets go out one page at a time; the rest is served by /api/results/{token}.
+
+    data, page = firstPage(exportHash, pipeline, results)
+
+    response = {
         "status": "ok",
         "answer": summarizerOutput.answer,
         "suggestedQuestions": suggestionsOutput.suggestedQuestions,
         "pipeline": pipeline,
-        "data": convertObjectIds(results),
+        "pipelineHash": exportHash,
+        "data": data,
         "columns": [col.model_dump() for col in queryOutput.columns],
     }
+
+    if page is not None:
+        response["page"] = page
+
+    return response, turn
@@ -1,4 +1,7 @@
-from .result_summarizer import runResultSummarizer
-from .schemas import SummarizerOutput
+from app.utils.lazy import lazyExports
 
-__all__ = ["runResultSummarizer", "SummarizerOutput"]
+
+__getattr__, __dir__, __all__ = lazyExports(__name__, {
+    "runResultSummarizer": ".result_summarizer",
+    "SummarizerOutput": ".schemas",
+})
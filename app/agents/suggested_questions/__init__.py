@@ -1,4 +1,8 @@
-from .suggested_questions import runSuggestedQuestions
-from .schemas import SuggestionsOutput
+from app.utils.lazy import lazyExports
 
-__all__ = ["runSuggestedQuestions", "SuggestionsOutput"]
+
+__getattr__, __dir__, __all__ = lazyExports(__name__, {
+    "runSuggestedQuestions": ".suggested_questions",
+    "SuggestionsOutput": ".schemas",
+    "getSuggestionBank": ".suggestion_bank",
+})
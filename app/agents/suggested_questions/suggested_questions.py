@@ -1,62 +1,76 @@
 from pathlib import Path
-from typing import Any, Dict, List
-
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
+from typing import Any, Dict, List, Optional
 
 from .schemas import SuggestionsOutput
-from app.core.llm import getChatModel
-from app.utils.prompt_loader import loadPrompt
-from app.utils.data_overview import loadDataOverview
-from app.utils.field_catalog import loadFieldCatalog
+from .suggestion_bank import getSuggestionBank
+from app.core.config import settings
+from app.core.llm import runAgentChain, usesNativeStructuredOutput
+from app.core.metrics import cacheEvents
+from app.core.tracing import setSpanAttributes
+from app.utils.prompt_builder import buildAgentPrompt
 
 
 PROMPTS_DIR = Path(__file__).parent
 
+SUGGESTION_COUNT = 3
 
-def runSuggestedQuestions(question: str, answer: str, history: List[Dict[str, Any]]) -> SuggestionsOutput:
-    systemPrompt = loadPrompt(PROMPTS_DIR, "suggestions_system.txt")
 
-    userPrompt = loadPrompt(PROMPTS_DIR, "suggestions_user.txt")
+def runSuggestedQuestions(
+    question: str,
+    answer: str,
+    history: List[Dict[str, Any]],
+    entities: Optional[Dict[str, str]] = None,
+) -> SuggestionsOutput:
+    """
+    Three follow-up questions, from the local suggestion bank unless SUGGESTIONS_MODE=llm.
 
-    dataOverview = loadDataOverview()
-    fieldCatalog = loadFieldCatalog()
+    Args:
+        question: The question just answered
+        answer: The answer (or clarifying question) given
+        history: Chat history
+        entities: Resolved entity values by field, for entity-specific follow-ups
+    """
+    # Important: keep history small.
+    trimmedHistory = history[-5:] if history else []
 
-    parser = PydanticOutputParser(pydantic_object=SuggestionsOutput)
+    bank = getSuggestionBank()
 
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", systemPrompt + "\n\n{format_instructions}"),
-            ("human", userPrompt),
-        ]
-    )
+    if settings.suggestionsMode == "local":
+        local = bank.suggest(question, answer, trimmedHistory, entities, count=SUGGESTION_COUNT)
 
-    model = getChatModel()
+        if len(local) == SUGGESTION_COUNT or not settings.suggestionsLlmFallback:
+            cacheEvents.inc(cache="suggestions", result="hit")
+            setSpanAttributes(suggestionSource="local")
+            return SuggestionsOutput(suggestedQuestions=local)
 
-    chain = prompt.partial(format_instructions=parser.get_format_instructions()) | model | parser
+        cacheEvents.inc(cache="suggestions", result="miss")
 
-    # Important: keep history small.
-    trimmedHistory = history[-5:] if history else []
+    prompt, parser = buildAgentPrompt(
+        PROMPTS_DIR,
+        "suggestions_system.txt",
+        "suggestions_user.txt",
+        SuggestionsOutput,
+        native=usesNativeStructuredOutput("suggested_questions"),
+    )
 
-    result = chain.invoke(
+    result = runAgentChain(
+        "suggested_questions",
+        prompt,
+        parser,
         {
             "question": question,
             "answer": answer,
             "history": trimmedHistory,
-            "dataOverview": dataOverview,
-            "fieldCatalog": fieldCatalog,
-        }
+        },
     )
 
-    # Important: enforce exactly 3 questions in case the model misbehaves.
+    # Important: enforce exactly 3 questions in case the model misbehaves; pad from the local bank.
     
-    if len(result.suggestedQuestions) > 3:
-        result.suggestedQuestions = result.suggestedQuestions[:3]
-
-    if len(result.suggestedQuestions) < 3:
-        # Pad safely with generic but relevant questions.
-        
-        while len(result.suggestedQuestions) < 3:
-            result.suggestedQuestions.append("Which vendor had the highest total spend in this period?")
+    result.suggestedQuestions = result.suggestedQuestions[:SUGGESTION_COUNT]
+
+    if len(result.suggestedQuestions) < SUGGESTION_COUNT:
+        askedHistory = trimmedHistory + [{"role": "user", "content": q} for q in result.suggestedQuestions]
+        padding = bank.suggest(question, answer, askedHistory, entities, count=SUGGESTION_COUNT)
+        result.suggestedQuestions += padding[:SUGGESTION_COUNT - len(result.suggestedQuestions)]
 
     return result
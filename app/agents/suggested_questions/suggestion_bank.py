@@ -0,0 +1,277 @@
+"""Local follow-up suggestions: TF-IDF retrieval over curated and learned questions."""
+
+import math
+import re
+from collections import Counter, OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.utils.field_catalog import loadFieldCatalog
+from app.utils.prompt_loader import loadPrompt
+
+
+PROMPTS_DIR = Path(__file__).parent
+
+SEEDS_FILE = "suggestion_seeds.txt"
+
+STOPWORDS = {
+    "a", "an", "and", "the", "of", "for", "in", "on", "at", "to", "by", "&", "is", "was", "were", "are",
+    "what", "which", "who", "how", "did", "does", "do", "me", "show", "list", "give", "each", "most",
+    "much", "many", "with", "from", "between", "than", "over", "it", "its", "s",
+}
+
+# Field-name parts too generic to identify a field on their own.
+GENERIC_FIELD_PARTS = {"name", "number", "code", "title", "date", "type", "sub", "zip", "normalized"}
+
+# Word forms folded together before field lookup.
+INFLECTIONS = {"spending": "spend", "spent": "spend", "money": "spend", "bought": "buy", "purchased": "purchase"}
+
+# Relevance vs. diversity trade-off for maximal marginal relevance.
+MMR_LAMBDA = 0.7
+
+# Candidates this similar to what was just asked are repeats, not follow-ups.
+REPEAT_SIMILARITY = 0.8
+
+ANSWER_WEIGHT = 0.5
+
+# Follow-ups about the entity the user is looking at rank above generic ones.
+ENTITY_BOOST = 0.25
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:-[0-9]+)?")
+
+_PLACEHOLDER_PATTERN = re.compile(r"\{([a-z_]+)\}")
+
+Vector = Dict[str, float]
+
+# (text, features, precomputed vector or None for {field} templates)
+Document = Tuple[str, Counter, Optional[Vector]]
+
+
+def _stem(token: str) -> str:
+    if token in INFLECTIONS:
+        return INFLECTIONS[token]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def _fieldTags() -> Dict[str, FrozenSet[str]]:
+    """Word -> field tags, from field names and catalog synonyms ("vendor" -> field:supplier_name)."""
+    tags: Dict[str, set] = {}
+
+    for field, spec in loadFieldCatalog().items():
+        words = [part for part in field.split("_") if part not in GENERIC_FIELD_PARTS]
+
+        for synonym in (spec.get("synonyms") or []) if isinstance(spec, dict) else []:
+            words.extend(synonym.lower().split())
+
+        for word in words:
+            if word not in STOPWORDS:
+                tags.setdefault(_stem(word), set()).add(f"field:{field}")
+
+    return {word: frozenset(fieldTags) for word, fieldTags in tags.items()}
+
+
+def _features(text: str, fieldTags: Dict[str, FrozenSet[str]]) -> Counter:
+    features: Counter = Counter()
+
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+
+        token = _stem(token)
+
+        # Synonyms collapse onto their field ("vendor", "supplier" -> field:supplier_name).
+
+        for tag in fieldTags.get(token, ()):
+            features[tag] += 1
+
+        if token not in fieldTags:
+            features[token] += 1
+
+    return features
+
+
+def _questionKey(text: str) -> str:
+    return " ".join(text.lower().split()).rstrip("?!. ")
+
+
+def _cosine(a: Vector, b: Vector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(feature, 0.0) for feature, weight in a.items())
+
+
+class SuggestionBank:
+    """
+    Follow-up questions ranked by TF-IDF similarity to the current question.
+
+    The bank holds curated seed questions (optionally with {field} placeholders
+    filled from resolved entities) plus questions learned from successful
+    requests. Suggestions are picked with maximal marginal relevance so the
+    three follow-ups don't all say the same thing.
+    """
+
+    def __init__(self, seeds: Iterable[str], maxLearned: int):
+        self.maxLearned = maxLearned
+        self._fieldTags = _fieldTags()
+        self._seeds = [seed for seed in seeds if seed]
+        self._learned: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = Lock()
+        self._index: Optional[Tuple[List[Document], Dict[str, float]]] = None
+
+    def learn(self, question: str) -> bool:
+        """Add a question that produced a useful answer; returns False for repeats."""
+        key = _questionKey(question)
+
+        if not key or key in {_questionKey(seed) for seed in self._seeds}:
+            return False
+
+        with self._lock:
+            isNew = key not in self._learned
+            self._learned[key] = question.strip()
+            self._learned.move_to_end(key)
+
+            while len(self._learned) > self.maxLearned:
+                self._learned.popitem(last=False)
+
+            if isNew:
+                self._index = None
+
+        return isNew
+
+    def _buildIndex(self) -> Tuple[List[Document], Dict[str, float]]:
+        with self._lock:
+            if self._index is not None:
+                return self._index
+
+            texts = self._seeds + list(self._learned.values())
+            featureSets = [_features(text, self._fieldTags) for text in texts]
+            documentFrequency: Counter = Counter()
+
+            for features in featureSets:
+                documentFrequency.update(features.keys())
+
+            count = len(texts)
+            idf = {feature: math.log((1 + count) / (1 + df)) + 1 for feature, df in documentFrequency.items()}
+
+            documents: List[Document] = [
+                (text, features, None if _PLACEHOLDER_PATTERN.search(text) else self._vector(features, idf))
+                for text, features in zip(texts, featureSets)
+            ]
+
+            self._index = (documents, idf)
+
+            return self._index
+
+    @staticmethod
+    def _vector(features: Counter, idf: Dict[str, float]) -> Vector:
+        weights = {feature: count * idf.get(feature, 1.0) for feature, count in features.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        return {feature: weight / norm for feature, weight in weights.items()}
+
+    @staticmethod
+    def _fill(text: str, entities: Dict[str, str]) -> Optional[str]:
+        fields = _PLACEHOLDER_PATTERN.findall(text)
+
+        if any(field not in entities for field in fields):
+            return None
+
+        return _PLACEHOLDER_PATTERN.sub(lambda match: entities[match.group(1)], text)
+
+    def suggest(
+        self,
+        question: str,
+        answer: str = "",
+        history: Optional[List[Dict[str, Any]]] = None,
+        entities: Optional[Dict[str, str]] = None,
+        count: int = 3,
+    ) -> List[str]:
+        """
+        Pick follow-ups for a question.
+
+        Args:
+            question: The question just answered
+            answer: The answer given (weighted lower than the question)
+            history: Chat history; questions the user already asked are skipped
+            entities: Resolved entity values by field, for {field} placeholders
+            count: Number of suggestions
+
+        Returns:
+            Up to `count` questions, most relevant first
+        """
+        documents, idf = self._buildIndex()
+
+        queryFeatures = _features(question, self._fieldTags)
+        for feature, weight in _features(answer, self._fieldTags).items():
+            queryFeatures[feature] += weight * ANSWER_WEIGHT
+        queryVector = self._vector(queryFeatures, idf)
+
+        asked = {_questionKey(question)} | {
+            _questionKey(str(message.get("content", "")))
+            for message in history or []
+            if message.get("role") == "user"
+        }
+
+        candidates: List[Tuple[str, Vector, float]] = []
+        seen = set(asked)
+
+        for text, features, vector in documents:
+            filled = text if vector is not None else self._fill(text, entities or {})
+
+            if filled is None or _questionKey(filled) in seen:
+                continue
+
+            seen.add(_questionKey(filled))
+
+            if vector is None:
+                vector = self._vector(_features(filled, self._fieldTags), idf)
+
+            relevance = _cosine(queryVector, vector)
+
+            if relevance >= REPEAT_SIMILARITY:
+                continue
+
+            if filled != text:
+                relevance += ENTITY_BOOST
+
+            candidates.append((filled, vector, relevance))
+
+        selected: List[Tuple[str, Vector, float]] = []
+
+        while candidates and len(selected) < count:
+            def marginal(candidate: Tuple[str, Vector, float]) -> float:
+                redundancy = max((_cosine(candidate[1], chosen[1]) for chosen in selected), default=0.0)
+                return MMR_LAMBDA * candidate[2] - (1 - MMR_LAMBDA) * redundancy
+
+            best = max(candidates, key=marginal)
+            selected.append(best)
+            candidates.remove(best)
+
+        return [text for text, _, _ in selected]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"seeds": len(self._seeds), "learned": len(self._learned), "maxLearned": self.maxLearned}
+
+
+_suggestionBank: Optional[SuggestionBank] = None
+
+_suggestionBankLock = Lock()
+
+
+def _loadSeeds() -> List[str]:
+    lines = loadPrompt(PROMPTS_DIR, SEEDS_FILE).splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+
+
+def getSuggestionBank() -> SuggestionBank:
+    global _suggestionBank
+
+    with _suggestionBankLock:
+        if _suggestionBank is None:
+            _suggestionBank = SuggestionBank(_loadSeeds(), maxLearned=settings.suggestionBankMaxLearned)
+
+    return _suggestionBank
@@ -1,4 +1,7 @@
-from .user_query_validator import runUserQueryValidator
-from .schemas import ValidatorOutput
+from app.utils.lazy import lazyExports
 
-__all__ = ["runUserQueryValidator", "ValidatorOutput"]
+
+__getattr__, __dir__, __all__ = lazyExports(__name__, {
+    "runUserQueryValidator": ".user_query_validator",
+    "ValidatorOutput": ".schemas",
+})
@@ -0,0 +1,151 @@
+"""Admission control and backpressure for blocking API handlers."""
+
+import asyncio
+import contextvars
+import math
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict
+
+from app.core.config import settings
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of queued."""
+
+    def __init__(self, reason: str, retryAfter: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retryAfter = retryAfter
+
+
+class AdmissionController:
+    """
+    Runs blocking work on a dedicated executor with a bounded wait queue.
+
+    Requests are rejected up front when the queue is full or when the
+    estimated wait (queue position x average service time / workers) would
+    exceed the configured deadline, so latency stays bounded under bursts.
+    """
+
+    def __init__(self, name: str, maxWorkers: int, maxQueue: int, maxWaitSeconds: float):
+        self.name = name
+        self.maxWorkers = maxWorkers
+        self.maxQueue = maxQueue
+        self.maxWaitSeconds = maxWaitSeconds
+        self._executor = ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix=f"{name}-worker")
+        self._lock = Lock()
+        self._inFlight = 0
+        self._queued = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._completed = 0
+        # Exponentially weighted average service time, seeded pessimistically.
+        self._avgServiceSeconds = 5.0
+
+    def estimatedWaitSeconds(self) -> float:
+        with self._lock:
+            return self._estimateLocked()
+
+    def _estimateLocked(self) -> float:
+        if self._inFlight + self._queued < self.maxWorkers:
+            return 0.0
+
+        position = self._queued + 1
+
+        return position * self._avgServiceSeconds / self.maxWorkers
+
+    def _admit(self) -> None:
+        with self._lock:
+            busy = self._inFlight + self._queued >= self.maxWorkers
+
+            if busy and self._queued >= self.maxQueue:
+                self._rejected += 1
+                raise AdmissionRejected("Server is busy: request queue is full", self._retryAfterLocked())
+
+            estimate = self._estimateLocked()
+
+            if estimate > self.maxWaitSeconds:
+                self._rejected += 1
+                raise AdmissionRejected(
+                    f"Server is busy: estimated wait {estimate:.1f}s exceeds {self.maxWaitSeconds:.0f}s",
+                    self._retryAfterLocked(),
+                )
+
+            self._queued += 1
+            self._admitted += 1
+
+    def _retryAfterLocked(self) -> int:
+        return max(1, math.ceil(self._estimateLocked()))
+
+    def _runAdmitted(self, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._inFlight += 1
+
+        startedAt = time.perf_counter()
+
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - startedAt
+
+            with self._lock:
+                self._inFlight -= 1
+                self._completed += 1
+                self._avgServiceSeconds = 0.8 * self._avgServiceSeconds + 0.2 * elapsed
+
+    def _releaseIfCancelled(self, future: Future) -> None:
+        # A request cancelled before a worker picked it up (client disconnect) never
+        # reaches _runAdmitted, so its queue slot is given back here.
+
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run fn on the executor if admitted.
+
+        Raises:
+            AdmissionRejected: If the request should be shed (respond 503)
+        """
+        self._admit()
+
+        context = contextvars.copy_context()
+
+        try:
+            future = self._executor.submit(context.run, self._runAdmitted, fn, args, kwargs)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            raise
+
+        future.add_done_callback(self._releaseIfCancelled)
+
+        # Important: cancelling the awaiting task cancels the executor future if it hasn't started.
+
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "maxWorkers": self.maxWorkers,
+                "maxQueue": self.maxQueue,
+                "inFlight": self._inFlight,
+                "queued": self._queued,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "completed": self._completed,
+                "avgServiceSeconds": round(self._avgServiceSeconds, 3),
+                "estimatedWaitSeconds": round(self._estimateLocked(), 3),
+            }
+
+
+chatAdmission = AdmissionController(
+    name="chat",
+    maxWorkers=settings.admissionMaxWorkers,
+    maxQueue=settings.admissionMaxQueue,
+    maxWaitSeconds=settings.admissionMaxWaitSeconds,
+)
@@ -0,0 +1,130 @@
+"""Batch chat: answer many questions in one request and stream each answer as it finishes."""
+
+import asyncio
+import contextvars
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from app.agents.orchestrator import normalizeQuestion, runProcurementAssistant
+from app.core.config import settings
+from app.core.tracing import startSpan
+from app.db.mongo import sharedAggregationResults
+from app.utils.serialization import dumpsJson
+
+
+# Important: batches get their own workers so a long report can't starve interactive chat.
+
+_batchExecutor = ThreadPoolExecutor(max_workers=settings.batchMaxWorkers, thread_name_prefix="batch-worker")
+
+
+def dedupeQuestions(questions: List[str]) -> List[Tuple[str, List[int]]]:
+    """
+    Group questions that normalize to the same text.
+
+    Returns:
+        (first spelling, indices in the request) per unique question, in request order
+    """
+    groups: Dict[str, Tuple[str, List[int]]] = {}
+
+    for index, question in enumerate(questions):
+        key = normalizeQuestion(question)
+
+        if key in groups:
+            groups[key][1].append(index)
+        else:
+            groups[key] = (question, [index])
+
+    return list(groups.values())
+
+
+def _answerQuestion(
+    question: str,
+    history: List[Dict[str, Any]],
+    sharedResults: Dict[str, List[Dict[str, Any]]],
+    batchId: str,
+) -> Dict[str, Any]:
+    with startSpan("chat.batch_item", batchId=batchId) as span, sharedAggregationResults(sharedResults):
+        result = runProcurementAssistant(
+            message=question,
+            history=history,
+            collectionName=settings.mongodbCollection,
+        )
+        span.setAttributes(status=result.get("status"))
+
+    if "clarifyingQuestion" in result and "answer" not in result:
+        result["answer"] = result["clarifyingQuestion"]
+
+    result["traceId"] = span.traceId
+
+    return result
+
+
+async def streamBatch(
+    questions: List[str],
+    history: List[Dict[str, Any]],
+    concurrency: int,
+    batchId: str,
+) -> AsyncIterator[bytes]:
+    """
+    Answer a batch of questions and yield one NDJSON line per unique question.
+
+    Lines come out in completion order; each lists every request index it
+    answers. A final summary line reports status counts and throughput.
+    """
+    groups = dedupeQuestions(questions)
+    sharedResults: Dict[str, List[Dict[str, Any]]] = {}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    loop = asyncio.get_running_loop()
+    startedAt = time.perf_counter()
+
+    async def answerGroup(question: str, indices: List[int]) -> Dict[str, Any]:
+        async with semaphore:
+            itemStartedAt = time.perf_counter()
+            context = contextvars.copy_context()
+
+            try:
+                result = await loop.run_in_executor(
+                    _batchExecutor, context.run, _answerQuestion, question, history, sharedResults, batchId
+                )
+                status = result.get("status", "ok")
+            except Exception as e:
+                result = {"error": f"{type(e).__name__}: {e}"}
+                status = "error"
+
+        return {
+            "type": "item",
+            "indices": indices,
+            "question": question,
+            "status": status,
+            "seconds": round(time.perf_counter() - itemStartedAt, 3),
+            "result": result,
+        }
+
+    tasks = [asyncio.create_task(answerGroup(question, indices)) for question, indices in groups]
+    statuses: Counter = Counter()
+
+    try:
+        for finished in asyncio.as_completed(tasks):
+            item = await finished
+            statuses[item["status"]] += len(item["indices"])
+
+            yield dumpsJson(item) + b"\n"
+    finally:
+        # Client went away: drop questions that haven't started yet.
+
+        for task in tasks:
+            task.cancel()
+
+    elapsed = time.perf_counter() - startedAt
+
+    yield dumpsJson({
+        "type": "summary",
+        "batchId": batchId,
+        "questions": len(questions),
+        "unique": len(groups),
+        "statuses": dict(statuses),
+        "seconds": round(elapsed, 3),
+        "questionsPerSecond": round(len(questions) / elapsed, 3) if elapsed > 0 else None,
+    }) + b"\n"
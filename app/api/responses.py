@@ -0,0 +1,16 @@
+"""Response classes for the API routes."""
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from app.utils.serialization import dumpsJson
+
+
+class BsonJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, with native handling for BSON types."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumpsJson(content)
@@ -1,12 +1,33 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Any, Dict, List
-
-from app.agents.orchestrator import runProcurementAssistant
+import secrets
+import time
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from app.agents.orchestrator import runProcurementAssistant, getSingleFlightStats
+from app.agents.mongo_query_validator import getValidatorStats
+from app.agents.suggested_questions import getSuggestionBank
+from app.api.admission import AdmissionRejected, chatAdmission
+from app.api.batch import streamBatch
+from app.api.responses import BsonJSONResponse
+from app.core.llm import llmLimiter
+from app.core.metrics import responseBytes, serializationDuration
+from app.core.deadline import requestDeadline
+from app.core.profiling import SamplingProfiler, saveProfile, shouldProfileSampledRequest
+from app.core.tracing import currentTraceId, startSpan
+from app.db.entity_index import getEntityIndexStats
 from app.core.config import settings
 
 
-router = APIRouter()
+router = APIRouter(default_response_class=BsonJSONResponse)
+
+
+PROFILE_FORMATS = ("speedscope", "collapsed")
+
+# Orchestrator statuses that aren't a 200: out of time, or no MongoDB connection free.
+RESULT_STATUS_CODES = {"timeout": 504, "unavailable": 503}
 
 
 class HistoryMessage(BaseModel):
@@ -20,22 +41,46 @@ class ChatRequest(BaseModel):
 
     history: List[HistoryMessage] = Field(default_factory=list)
 
+    sessionId: Optional[str] = Field(default=None, min_length=1, max_length=128)
+
+
+class ChatBatchRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1)
+
+    history: List[HistoryMessage] = Field(default_factory=list)
+
+    concurrency: Optional[int] = Field(default=None, ge=1)
+
 
 @router.get("/health")
 def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
-@router.post("/chat")
-def chat(body: ChatRequest) -> Dict[str, Any]:
+@router.get("/stats")
+def stats() -> Dict[str, Any]:
+    return {
+        "queryValidator": getValidatorStats(),
+        "entityIndex": getEntityIndexStats(),
+        "singleFlight": getSingleFlightStats(),
+        "llmConcurrency": llmLimiter.stats(),
+        "admission": chatAdmission.stats(),
+        "suggestionBank": getSuggestionBank().stats(),
+    }
+
+
+def _answerChat(body: ChatRequest) -> Dict[str, Any]:
     # Important: keep history trimmed to avoid huge prompts.
     
     history = [h.model_dump() for h in body.history[-5:]]
 
+    # Important: only clients that send a sessionId get a server-side session (and its cached rows).
+
     result = runProcurementAssistant(
         message=body.message,
         history=history,
         collectionName=settings.mongodbCollection,
+        sessionId=body.sessionId,
     )
 
     # Normalize response: set answer = clarifyingQuestion if present
@@ -43,3 +88,99 @@ def chat(body: ChatRequest) -> Dict[str, Any]:
         result["answer"] = result["clarifyingQuestion"]
 
     return result
+
+
+def _requestedProfileFormat(request: Request) -> Optional[str]:
+    """Profile format asked for via X-Profile header or ?profile=; admin token required."""
+    profileFormat = request.headers.get("X-Profile") or request.query_params.get("profile")
+
+    if not profileFormat:
+        return None
+
+    if profileFormat not in PROFILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"profile must be one of: {', '.join(PROFILE_FORMATS)}")
+
+    adminToken = request.headers.get("X-Admin-Token", "")
+
+    if not settings.profilingAdminToken or not secrets.compare_digest(adminToken, settings.profilingAdminToken):
+        raise HTTPException(status_code=403, detail="Profiling requires a valid admin token")
+
+    return profileFormat
+
+
+def _answerChatProfiled(body: ChatRequest, profileFormat: Optional[str]) -> Dict[str, Any]:
+    with SamplingProfiler(interval=settings.profilingIntervalMs / 1000) as profiler:
+        result = _answerChat(body)
+
+    name = currentTraceId() or uuid4().hex
+
+    # Requested profiles come back inline; sampled ones go to the profiling directory.
+
+    if profileFormat:
+        result["profile"] = profiler.render(profileFormat, name)
+    else:
+        saveProfile(profiler, name)
+
+    return result
+
+
+@router.post("/chat")
+async def chat(body: ChatRequest, request: Request) -> BsonJSONResponse:
+    profileFormat = _requestedProfileFormat(request)
+
+    with startSpan("chat", sessionId=body.sessionId, historyLength=len(body.history)) as span:
+        # Important: run on the bounded chat executor; shed load with 503 instead of queueing forever.
+        # The request deadline starts here so time spent queued counts against it.
+        
+        try:
+            with requestDeadline(settings.requestTimeoutSeconds):
+                if profileFormat or shouldProfileSampledRequest():
+                    span.setAttributes(profiled=True)
+                    result = await chatAdmission.run(_answerChatProfiled, body, profileFormat)
+                else:
+                    result = await chatAdmission.run(_answerChat, body)
+        except AdmissionRejected as e:
+            raise HTTPException(
+                status_code=503,
+                detail=e.reason,
+                headers={"Retry-After": str(e.retryAfter), "X-Trace-Id": span.traceId},
+            )
+
+        result["traceId"] = span.traceId
+        span.setAttributes(status=result.get("status"), sessionId=result.get("sessionId"))
+
+        # Important: return the response directly so rows skip jsonable_encoder.
+        
+        with startSpan("serialization") as serializationSpan:
+            startedAt = time.perf_counter()
+            statusCode = RESULT_STATUS_CODES.get(result.get("status"), 200)
+            headers = {"X-Trace-Id": span.traceId}
+
+            if statusCode == 503:
+                headers["Retry-After"] = "1"
+
+            response = BsonJSONResponse(result, status_code=statusCode, headers=headers)
+            serializationDuration.observe(time.perf_counter() - startedAt)
+            responseBytes.observe(len(response.body))
+            serializationSpan.setAttributes(responseBytes=len(response.body))
+
+    return response
+
+
+@router.post("/chat/batch")
+async def chatBatch(body: ChatBatchRequest) -> StreamingResponse:
+    if len(body.questions) > settings.batchMaxQuestions:
+        raise HTTPException(status_code=413, detail=f"A batch takes at most {settings.batchMaxQuestions} questions")
+
+    if any(not question.strip() for question in body.questions):
+        raise HTTPException(status_code=422, detail="Questions must not be empty")
+
+    history = [h.model_dump() for h in body.history[-5:]]
+    concurrency = min(body.concurrency or settings.batchMaxConcurrency, settings.batchMaxConcurrency)
+    batchId = uuid4().hex
+
+    return StreamingResponse(
+        streamBatch(body.questions, history, concurrency, batchId),
+        media_type="application/x-ndjson",
+        headers={"X-Batch-Id": batchId},
+    )
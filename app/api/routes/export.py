@@ -0,0 +1,117 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from pymongo.errors import PyMongoError
+
+from app.db.export import (
+    EXPORT_FORMATS,
+    exportRowsStream,
+    stripRowLimits,
+)
+from app.db.mongo import pipelineHash as hashPipeline
+from app.db.pipeline_policy import PipelinePolicyError, enforcePipelinePolicy
+from app.db.pipeline_registry import getPipelineRegistry
+
+
+router = APIRouter()
+
+
+FORMAT_PATTERN = "^(" + "|".join(EXPORT_FORMATS) + ")$"
+
+
+class ExportRequest(BaseModel):
+    # Either a pipeline, or the pipelineHash of a previous chat response.
+    pipeline: Optional[List[Dict[str, Any]]] = None
+
+    pipelineHash: Optional[str] = None
+
+    columns: List[Dict[str, Any]] = Field(default_factory=list)
+
+    format: str = Field(default="ndjson", pattern=FORMAT_PATTERN)
+
+    keepLimits: bool = False
+
+
+def _registeredPipeline(key: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    entry = getPipelineRegistry().get(key)
+
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired pipelineHash; send the pipeline instead")
+
+    return entry.pipeline, entry.columns
+
+
+def _wantsZstd(request: Request) -> bool:
+    accepted = request.headers.get("Accept-Encoding", "")
+    return "zstd" in [encoding.split(";")[0].strip() for encoding in accepted.split(",")]
+
+
+def _exportResponse(
+    pipeline: List[Dict[str, Any]],
+    columns: List[Dict[str, Any]],
+    exportFormat: str,
+    keepLimits: bool,
+    request: Request,
+) -> StreamingResponse:
+    # Exports are meant to be complete, so only the safety rules apply (no $limit cap or group bound).
+
+    if not pipeline:
+        raise HTTPException(status_code=400, detail="Pipeline is empty")
+
+    try:
+        enforcePipelinePolicy(pipeline, capLimits=False, checkGroups=False)
+    except PipelinePolicyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    exportPipeline = pipeline if keepLimits else stripRowLimits(pipeline)
+    compress = _wantsZstd(request)
+    mediaType, extension = EXPORT_FORMATS[exportFormat]
+
+    # Important: the aggregate command runs before streaming starts, so errors still get a status code.
+
+    try:
+        body = exportRowsStream(exportPipeline, columns, exportFormat, compress=compress)
+    except PyMongoError as e:
+        raise HTTPException(status_code=502, detail=f"Export query failed: {e}")
+
+    headers = {
+        "Content-Disposition": f'attachment; filename="{hashPipeline(pipeline)}.{extension}"',
+        "Vary": "Accept-Encoding",
+    }
+
+    if compress:
+        headers["Content-Encoding"] = "zstd"
+
+    return StreamingResponse(body, media_type=mediaType, headers=headers)
+
+
+@router.post("/export")
+def exportResults(body: ExportRequest, request: Request) -> StreamingResponse:
+    """Stream the full result of a pipeline (no LLM row limits) as NDJSON or CSV."""
+    if body.pipeline is not None:
+        pipeline, columns = body.pipeline, body.columns
+    elif body.pipelineHash:
+        pipeline, columns = _registeredPipeline(body.pipelineHash)
+        columns = body.columns or columns
+    else:
+        raise HTTPException(status_code=422, detail="Send either pipeline or pipelineHash")
+
+    return _exportResponse(pipeline, columns, body.format, body.keepLimits, request)
+
+
+@router.get("/export/{pipelineHash}")
+def exportRegistered(
+    pipelineHash: str,
+    request: Request,
+    format: str = "ndjson",
+    keepLimits: bool = False,
+) -> StreamingResponse:
+    """Download link form of /export for a pipeline from a previous chat response."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    pipeline, columns = _registeredPipeline(pipelineHash)
+
+    return _exportResponse(pipeline, columns, format, keepLimits, request)
@@ -0,0 +1,41 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.agents.orchestrator import getSingleFlightStats
+from app.api.admission import chatAdmission
+from app.core.llm import llmLimiter
+from app.core.metrics import renderMetrics, runtimeGauges
+from app.db.mongo import mongoPoolStats
+from app.db.pagination import resultSetCache
+from app.db.session_store import getSessionStore
+
+
+router = APIRouter()
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _updateRuntimeGauges() -> None:
+    admission = chatAdmission.stats()
+    for state in ("inFlight", "queued", "rejected"):
+        runtimeGauges.set(admission[state], component="chat_admission", state=state)
+
+    limiter = llmLimiter.stats()
+    runtimeGauges.set(limiter["queueDepth"], component="llm", state="queued")
+    runtimeGauges.set(limiter["inFlight"], component="llm", state="inFlight")
+
+    runtimeGauges.set(getSingleFlightStats()["inFlight"], component="single_flight", state="inFlight")
+    runtimeGauges.set(getSessionStore().stats()["sessions"], component="sessions", state="cached")
+    runtimeGauges.set(resultSetCache.stats()["rows"], component="result_pages", state="cachedRows")
+
+    for clientName, pool in mongoPoolStats().items():
+        runtimeGauges.set(pool["open"], component=f"mongo_pool_{clientName}", state="open")
+        runtimeGauges.set(pool["checkedOut"], component=f"mongo_pool_{clientName}", state="checkedOut")
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    _updateRuntimeGauges()
+
+    return PlainTextResponse(renderMetrics(), media_type=PROMETHEUS_CONTENT_TYPE)
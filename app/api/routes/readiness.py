@@ -0,0 +1,17 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.core.warmup import warmupState
+
+
+router = APIRouter()
+
+
+@router.get("/ready")
+def ready() -> JSONResponse:
+    """Load balancer readiness: 200 only after startup warmup completed."""
+    state: Dict[str, Any] = warmupState.snapshot()
+
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
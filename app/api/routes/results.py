@@ -0,0 +1,32 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException
+
+from app.api.responses import BsonJSONResponse
+from app.db.pagination import InvalidPageToken, PageExpired, decodePageToken, nextPage
+from app.db.pipeline_registry import getPipelineRegistry
+
+
+router = APIRouter(default_response_class=BsonJSONResponse)
+
+
+@router.get("/results/{token}")
+def resultPage(token: str) -> Dict[str, Any]:
+    """Next page of a chat result set, from the token in the previous page's `page.nextToken`."""
+    try:
+        entry = getPipelineRegistry().get(decodePageToken(token)["h"])
+
+        pipeline = entry.pipeline if entry else None
+        columns = [column["name"] for column in entry.columns] if entry else None
+
+        rows, page = nextPage(token, pipeline, columns)
+    except InvalidPageToken as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PageExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+
+    return {
+        "data": rows,
+        "columns": entry.columns if entry else [],
+        "page": page,
+    }
@@ -0,0 +1,181 @@
+"""Request coalescing and concurrency limits for expensive calls."""
+
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Event, Lock
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key onto one computation.
+
+    The first caller (leader) runs the function; callers arriving while it is
+    in flight wait and receive the same result (or exception).
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, _Call] = {}
+        self._lock = Lock()
+        self._leaders = 0
+        self._followers = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn once per in-flight key; returns (result, shared) where shared is True for followers."""
+        with self._lock:
+            call = self._calls.get(key)
+
+            if call is not None:
+                call.followers += 1
+                self._followers += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._leaders += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+        return call.result, False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "inFlight": len(self._calls),
+                "executed": self._leaders,
+                "coalesced": self._followers,
+            }
+
+
+class SlotLease:
+    """
+    A held limiter slot.
+
+    detach() hands the release over to the caller, e.g. to keep the slot
+    until a call left running in the background finishes.
+    """
+
+    def __init__(self, release: Callable[[], None]) -> None:
+        self._release = release
+        self.detached = False
+
+    def detach(self) -> Callable[[], None]:
+        self.detached = True
+        return self._release
+
+
+class ConcurrencyLimiter:
+    """
+    Global plus per-name concurrency limits with blocking (queued) acquisition.
+
+    Callers wait for a slot instead of failing; queue depth is tracked so
+    bursts are visible in the stats.
+    """
+
+    def __init__(self, globalLimit: int, defaultLimit: int, limits: Optional[Dict[str, int]] = None):
+        self.globalLimit = globalLimit
+        self.defaultLimit = defaultLimit
+        self.limits = dict(limits or {})
+        self._global = BoundedSemaphore(globalLimit)
+        self._named: Dict[str, BoundedSemaphore] = {}
+        self._lock = Lock()
+        self._waiting: Dict[str, int] = {}
+        self._active: Dict[str, int] = {}
+        self._maxQueueDepth = 0
+
+    def _semaphore(self, name: str) -> BoundedSemaphore:
+        with self._lock:
+            if name not in self._named:
+                self._named[name] = BoundedSemaphore(self.limits.get(name, self.defaultLimit))
+            return self._named[name]
+
+    def _adjust(self, counters: Dict[str, int], name: str, delta: int) -> None:
+        with self._lock:
+            counters[name] = counters.get(name, 0) + delta
+
+            if counters is self._waiting:
+                self._maxQueueDepth = max(self._maxQueueDepth, sum(self._waiting.values()))
+
+    @contextmanager
+    def slot(self, name: str, timeout: Optional[float] = None) -> Iterator[SlotLease]:
+        """
+        Hold one slot for `name` and one global slot for the duration of the
+        block, unless the yielded lease is detached (the detacher releases it).
+
+        Raises:
+            TimeoutError: If no slot frees up within timeout seconds
+        """
+        semaphore = self._semaphore(name)
+
+        self._adjust(self._waiting, name, 1)
+
+        try:
+            # Important: take the per-name slot first so a queued agent never holds a global slot.
+
+            if not semaphore.acquire(timeout=timeout):
+                raise TimeoutError(f"Timed out waiting for a {name} slot")
+
+            if not self._global.acquire(timeout=timeout):
+                semaphore.release()
+                raise TimeoutError(f"Timed out waiting for a global slot ({name})")
+        finally:
+            self._adjust(self._waiting, name, -1)
+
+        self._adjust(self._active, name, 1)
+
+        released = Lock()
+
+        def release() -> None:
+            # Important: idempotent, a detached release may be called from a done-callback.
+
+            if released.acquire(blocking=False):
+                self._adjust(self._active, name, -1)
+                self._global.release()
+                semaphore.release()
+
+        lease = SlotLease(release)
+
+        try:
+            yield lease
+        finally:
+            if not lease.detached:
+                release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "globalLimit": self.globalLimit,
+                "queueDepth": sum(self._waiting.values()),
+                "maxQueueDepth": self._maxQueueDepth,
+                "inFlight": sum(self._active.values()),
+                "perName": {
+                    name: {
+                        "limit": self.limits.get(name, self.defaultLimit),
+                        "queued": self._waiting.get(name, 0),
+                        "inFlight": self._active.get(name, 0),
+                    }
+                    for name in sorted(set(self._waiting) | set(self._active))
+                },
+            }
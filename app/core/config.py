@@ -1,17 +1,71 @@
 from pydantic import BaseModel
 import os
+from typing import Dict, List
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
 
+def parseMapping(value: str) -> Dict[str, str]:
+    """Parse "key=value,key2=value2" env values into a dict."""
+    mapping: Dict[str, str] = {}
+
+    for item in value.split(","):
+        if "=" in item:
+            key, _, val = item.partition("=")
+            mapping[key.strip()] = val.strip()
+
+    return mapping
+
+
 class Settings(BaseModel):
     # OpenAI
     
     openaiApiKey: str = os.getenv("OPENAI_API_KEY", "")
     
     openaiModel: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    
+    llmTimeoutSeconds: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+
+    # Deadlines and hedging
+    
+    requestTimeoutSeconds: float = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "120"))
+    
+    mongoMaxTimeMs: int = int(os.getenv("MONGO_MAX_TIME_MS", "30000"))
+    
+    llmHedgingEnabled: bool = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+    
+    llmHedgeQuantile: float = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+    
+    llmHedgeMinDelaySeconds: float = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1"))
+
+    # Per-agent model tiering (agent package name -> value)
+    
+    agentModels: Dict[str, str] = parseMapping(os.getenv("AGENT_MODELS", ""))
+    
+    agentMaxTokens: Dict[str, int] = {
+        name: int(limit) for name, limit in parseMapping(os.getenv("AGENT_MAX_TOKENS", "")).items()
+    }
+    
+    agentTimeoutSeconds: Dict[str, float] = {
+        name: float(timeout) for name, timeout in parseMapping(os.getenv("AGENT_TIMEOUT_SECONDS", "")).items()
+    }
+
+    # Structured output: parser (format instructions in the prompt, reply parsed from text)
+    # or native (provider JSON-schema response format bound to the agent's Pydantic schema)
+    
+    structuredOutputMode: str = os.getenv("STRUCTURED_OUTPUT_MODE", "parser")
+    
+    agentStructuredOutput: Dict[str, str] = parseMapping(os.getenv("AGENT_STRUCTURED_OUTPUT", ""))
+
+    # Latency budget: degrade a stage to fastModel when the primary model won't fit
+    
+    latencyBudgetSeconds: float = float(os.getenv("LATENCY_BUDGET_SECONDS", "0"))
+    
+    fastModel: str = os.getenv("FAST_MODEL", "")
+    
+    latencyBudgetReserveSeconds: float = float(os.getenv("LATENCY_BUDGET_RESERVE_SECONDS", "5"))
 
     # MongoDB
     
@@ -20,10 +74,175 @@ class Settings(BaseModel):
     mongodbDb: str = os.getenv("MONGODB_DB", "procurement")
     
     mongodbCollection: str = os.getenv("MONGODB_COLLECTION", "purchases")
+    
+    mongoAppName: str = os.getenv("MONGO_APP_NAME", "procurement-ai-backend")
+    
+    mongoMaxPoolSize: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+    
+    mongoMinPoolSize: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    
+    mongoMaxIdleTimeMs: int = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+    
+    # How long a request waits for a free pooled connection before failing (0 = wait forever)
+    mongoWaitQueueTimeoutMs: int = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+    
+    # Wire compression, in order of preference; unavailable codecs are skipped, empty disables it
+    mongoCompressors: str = os.getenv("MONGO_COMPRESSORS", "zstd,zlib")
+    
+    # Read preference for procurement queries only; sessions always read from the primary
+    mongoAnalyticsReadPreference: str = os.getenv("MONGO_ANALYTICS_READ_PREFERENCE", "primary")
+    
+    mongoMaxStalenessSeconds: int = int(os.getenv("MONGO_MAX_STALENESS_SECONDS", "-1"))
+    
+    # Ingest client (bulk loads): its own pool so loads don't starve serving; URI defaults to MONGODB_URI
+    mongoIngestUri: str = os.getenv("MONGO_INGEST_URI", "")
+    
+    mongoIngestMaxPoolSize: int = int(os.getenv("MONGO_INGEST_MAX_POOL_SIZE", "4"))
+    
+    # Time buckets: per-period pre-summed collection written at ingest; empty disables rewriting
+    timeBucketCollection: str = os.getenv("TIME_BUCKET_COLLECTION", "")
+    
+    timeBucketGrain: str = os.getenv("TIME_BUCKET_GRAIN", "month")  # day | month
+    
+    timeBucketDimensions: str = os.getenv("TIME_BUCKET_DIMENSIONS", "department_name,acquisition_type")
+    
+    # pushdown trusts the declared column names, so it's opt-in
+    
+    aggregationMode: str = os.getenv("AGGREGATION_MODE", "standard")  # standard | pushdown
 
     # App
     
     appEnv: str = os.getenv("APP_ENV", "local")
 
+    # Admission control for /api/chat
+    
+    admissionMaxWorkers: int = int(os.getenv("ADMISSION_MAX_WORKERS", "16"))
+    
+    admissionMaxQueue: int = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+    
+    admissionMaxWaitSeconds: float = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "30"))
+
+    # Pipeline policy
+    
+    pipelineMaxLimit: int = int(os.getenv("PIPELINE_MAX_LIMIT", "5000"))
+    
+    pipelineMaxGroups: int = int(os.getenv("PIPELINE_MAX_GROUPS", "20000"))
+    
+    pipelineStatsTimeoutMs: int = int(os.getenv("PIPELINE_STATS_TIMEOUT_MS", "5000"))
+    
+    pipelineStatsSampleSize: int = int(os.getenv("PIPELINE_STATS_SAMPLE_SIZE", "10000"))
+
+    # Batch chat
+    
+    batchMaxQuestions: int = int(os.getenv("BATCH_MAX_QUESTIONS", "200"))
+    
+    batchMaxConcurrency: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+    
+    batchMaxWorkers: int = int(os.getenv("BATCH_MAX_WORKERS", "8"))
+
+    # Export
+    
+    pipelineRegistrySize: int = int(os.getenv("PIPELINE_REGISTRY_SIZE", "1000"))
+    
+    exportBatchSize: int = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+    
+    exportMaxTimeMs: int = int(os.getenv("EXPORT_MAX_TIME_MS", "300000"))
+    
+    exportZstdLevel: int = int(os.getenv("EXPORT_ZSTD_LEVEL", "3"))
+
+    # Result digest
+    
+    resultDigestMinRows: int = int(os.getenv("RESULT_DIGEST_MIN_ROWS", "30"))
+    
+    resultPromptMaxRows: int = int(os.getenv("RESULT_PROMPT_MAX_ROWS", "50"))
+
+    # Suggested questions
+    
+    suggestionsMode: str = os.getenv("SUGGESTIONS_MODE", "local")  # local | llm
+    
+    suggestionsLlmFallback: bool = os.getenv("SUGGESTIONS_LLM_FALLBACK", "false").lower() == "true"
+    
+    suggestionBankMaxLearned: int = int(os.getenv("SUGGESTION_BANK_MAX_LEARNED", "500"))
+
+    # Result paging
+    
+    resultPageSize: int = int(os.getenv("RESULT_PAGE_SIZE", "500"))
+    
+    resultCacheMaxRows: int = int(os.getenv("RESULT_CACHE_MAX_ROWS", "200000"))
+
+    # Query validation
+    
+    heuristicValidatorEnabled: bool = os.getenv("HEURISTIC_VALIDATOR_ENABLED", "true").lower() == "true"
+    
+    heuristicMaxRows: int = int(os.getenv("HEURISTIC_MAX_ROWS", "500"))
+
+    # LLM concurrency
+    
+    singleFlightEnabled: bool = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+    
+    llmMaxConcurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    
+    llmAgentConcurrency: int = int(os.getenv("LLM_AGENT_CONCURRENCY", "8"))
+    
+    llmAgentConcurrencyOverrides: Dict[str, int] = {
+        name: int(limit) for name, limit in parseMapping(os.getenv("LLM_AGENT_CONCURRENCY_OVERRIDES", "")).items()
+    }
+
+    # Entity resolution
+    
+    entityResolutionEnabled: bool = os.getenv("ENTITY_RESOLUTION_ENABLED", "true").lower() == "true"
+
+    # Rebuild the index in the background once it's this old (0 = only at warmup)
+    
+    entityIndexRefreshSeconds: float = float(os.getenv("ENTITY_INDEX_REFRESH_SECONDS", "3600"))
+
+    # First retry delay after a failed build; doubles per failure (up to 15 minutes)
+    
+    entityIndexRetrySeconds: float = float(os.getenv("ENTITY_INDEX_RETRY_SECONDS", "30"))
+
+    # Sessions
+    
+    sessionBackend: str = os.getenv("SESSION_BACKEND", "memory")  # memory | mongo
+    
+    sessionCollection: str = os.getenv("SESSION_COLLECTION", "chat_sessions")
+    
+    sessionMaxSessions: int = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+    
+    sessionMaxTurns: int = int(os.getenv("SESSION_MAX_TURNS", "5"))
+    
+    sessionMaxRows: int = int(os.getenv("SESSION_MAX_ROWS", "5000"))
+
+    # Tracing
+    
+    traceExporter: str = os.getenv("TRACE_EXPORTER", "none")  # none | jsonl | otlp
+    
+    traceJsonlPath: str = os.getenv("TRACE_JSONL_PATH", "traces/spans.jsonl")
+    
+    traceOtlpEndpoint: str = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+
+    # Profiling
+    
+    profilingAdminToken: str = os.getenv("PROFILING_ADMIN_TOKEN", "")
+    
+    profilingIntervalMs: float = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+    
+    profilingEveryN: int = int(os.getenv("PROFILING_EVERY_N", "0"))
+    
+    profilingDir: str = os.getenv("PROFILING_DIR", "profiles")
+    
+    profilingMaxFiles: int = int(os.getenv("PROFILING_MAX_FILES", "50"))
+
+    # Startup warmup
+    
+    warmupEnabled: bool = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    
+    warmupLlmConnection: bool = os.getenv("WARMUP_LLM_CONNECTION", "true").lower() == "true"
+    
+    warmupQuestions: List[str] = [q.strip() for q in os.getenv("WARMUP_QUESTIONS", "").split("|") if q.strip()]
+
+    # First retry delay for failed required steps; doubles per attempt up to a minute (0 = no retries)
+    
+    warmupRetrySeconds: float = float(os.getenv("WARMUP_RETRY_SECONDS", "2"))
+
 
 settings = Settings()
@@ -0,0 +1,109 @@
+"""Request deadlines and latency budgets carried through contextvars."""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request runs out of time."""
+
+
+class Deadline:
+    """A point in time (monotonic clock) by which work should finish."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expiresAt = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expiresAt - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expiresAt
+
+
+_requestDeadline: ContextVar[Optional[Deadline]] = ContextVar("requestDeadline", default=None)
+
+_latencyBudget: ContextVar[Optional[Deadline]] = ContextVar("latencyBudget", default=None)
+
+
+@contextmanager
+def requestDeadline(seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """
+    Set a hard deadline for the enclosed work.
+
+    A tighter deadline that is already active wins, so a deadline set at
+    the API edge also bounds code that sets its own. A falsy value keeps
+    whatever is active.
+    """
+    current = _requestDeadline.get()
+
+    if not seconds or (current is not None and current.remaining() <= seconds):
+        yield current
+        return
+
+    deadline = Deadline(seconds)
+    token = _requestDeadline.set(deadline)
+
+    try:
+        yield deadline
+    finally:
+        _requestDeadline.reset(token)
+
+
+def currentDeadline() -> Optional[Deadline]:
+    return _requestDeadline.get()
+
+
+def timeoutFor(defaultSeconds: Optional[float] = None) -> Optional[float]:
+    """
+    Timeout for the next blocking call: the default clamped to the remaining deadline.
+
+    Raises:
+        DeadlineExceeded: If the request deadline has already passed
+    """
+    deadline = _requestDeadline.get()
+
+    if deadline is None:
+        return defaultSeconds
+
+    if deadline.expired:
+        raise DeadlineExceeded(f"Request deadline of {deadline.seconds:g}s exceeded")
+
+    remaining = deadline.remaining()
+
+    return remaining if defaultSeconds is None else min(defaultSeconds, remaining)
+
+
+def deadlineExpired() -> bool:
+    deadline = _requestDeadline.get()
+    return deadline is not None and deadline.expired
+
+
+@contextmanager
+def latencyBudget(seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """
+    Set a soft latency budget for the enclosed work.
+
+    The budget never fails a request; agents use the remaining time to pick
+    a faster model when the primary one is unlikely to fit. A falsy value
+    leaves the budget unset.
+    """
+    if not seconds:
+        yield None
+        return
+
+    deadline = Deadline(seconds)
+    token = _latencyBudget.set(deadline)
+
+    try:
+        yield deadline
+    finally:
+        _latencyBudget.reset(token)
+
+
+def currentLatencyBudget() -> Optional[Deadline]:
+    return _latencyBudget.get()
@@ -0,0 +1,57 @@
+"""Rolling per-key latency statistics used for model selection and hedging."""
+
+from collections import deque
+from threading import Lock
+from typing import Deque, Dict, Optional, Tuple
+
+
+Key = Tuple[str, ...]
+
+
+class LatencyTracker:
+    """
+    Keeps the most recent observations per key (e.g. agent + model).
+
+    Percentiles come from a bounded window, so they follow provider latency
+    drift instead of averaging over the whole process lifetime.
+    """
+
+    def __init__(self, window: int = 200, minSamples: int = 20):
+        self.window = window
+        self.minSamples = minSamples
+        self._samples: Dict[Key, Deque[float]] = {}
+        self._lock = Lock()
+
+    def observe(self, seconds: float, *key: str) -> None:
+        with self._lock:
+            samples = self._samples.get(key)
+
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+
+            samples.append(seconds)
+
+    def percentile(self, q: float, *key: str) -> Optional[float]:
+        """Latency at quantile q (0-1), or None until minSamples observations exist."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+
+        if len(samples) < self.minSamples:
+            return None
+
+        index = min(len(samples) - 1, int(round(q * (len(samples) - 1))))
+
+        return samples[index]
+
+    def stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        with self._lock:
+            keys = list(self._samples)
+
+        return {
+            "/".join(key): {
+                "samples": len(self._samples[key]),
+                "p50": self.percentile(0.5, *key),
+                "p95": self.percentile(0.95, *key),
+            }
+            for key in keys
+        }
@@ -1,15 +1,389 @@
-from langchain_openai import ChatOpenAI
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextvars import copy_context
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, Type, Union
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import BaseOutputParser
+from langchain_core.messages import BaseMessage
+from langchain_core.prompt_values import PromptValue
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel
+
 from app.core.config import settings
+from app.core.concurrency import ConcurrencyLimiter, SlotLease
+from app.core.deadline import DeadlineExceeded, currentLatencyBudget, deadlineExpired, timeoutFor
+from app.core.latency import LatencyTracker
+from app.core.metrics import (
+    agentDuration,
+    agentErrors,
+    agentHedges,
+    agentModelSelections,
+    agentQueueWait,
+    agentTokens,
+    cacheEvents,
+    deadlineExceeded,
+)
+from app.core.tracing import startSpan
+from app.utils.tokens import countTokens
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+
+llmLimiter = ConcurrencyLimiter(
+    globalLimit=settings.llmMaxConcurrency,
+    defaultLimit=settings.llmAgentConcurrency,
+    limits=settings.llmAgentConcurrencyOverrides,
+)
+
+# Recent call latency per (agent, model); drives latency-budget model selection and hedging.
+agentLatency = LatencyTracker()
+
+# Runs LLM calls that may be hedged (the caller waits on whichever finishes first).
+_hedgeExecutor = ThreadPoolExecutor(max_workers=settings.llmMaxConcurrency * 2, thread_name_prefix="llm-hedge")
+
+
+def getChatModel(
+    agentName: Optional[str] = None,
+    model: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> "ChatOpenAI":
+    """
+    Build the chat model for an agent from its tier settings.
+
+    Args:
+        agentName: Agent package name used to look up model, max tokens and timeout
+        model: Explicit model override (e.g. the latency-budget fast model)
+        timeout: Explicit client timeout (e.g. clamped to the request deadline)
+    """
+    # Important: langchain_openai (and the openai SDK) is imported here, not at module load.
+    
+    from langchain_openai import ChatOpenAI
+
+    options: Dict[str, Any] = {}
 
+    maxTokens = settings.agentMaxTokens.get(agentName or "")
+    if maxTokens:
+        options["max_tokens"] = maxTokens
 
-def getChatModel() -> ChatOpenAI:
     # Important: temperature 0 for deterministic query + summaries.
     
-    model = ChatOpenAI(
-        model=settings.openaiModel,
+    chatModel = ChatOpenAI(
+        model=model or settings.agentModels.get(agentName or "", settings.openaiModel),
         temperature=0,
         api_key=settings.openaiApiKey,  # exact name matters
-        
+        timeout=timeout or agentTimeout(agentName),
+        **options,
     )
 
-    return model
+    return chatModel
+
+
+def usesNativeStructuredOutput(agentName: str) -> bool:
+    """True when the agent's replies are constrained by the provider instead of parsed from text."""
+    return settings.agentStructuredOutput.get(agentName, settings.structuredOutputMode) == "native"
+
+
+def _supportsStrictSchema(schema: Any) -> bool:
+    # Strict JSON-schema mode can't express free-form objects (e.g. pipeline stages as Dict[str, Any]).
+
+    if isinstance(schema, list):
+        return all(_supportsStrictSchema(item) for item in schema)
+
+    if not isinstance(schema, dict):
+        return True
+
+    if schema.get("type") == "object" and ("properties" not in schema or schema.get("additionalProperties")):
+        return False
+
+    return all(_supportsStrictSchema(value) for value in schema.values())
+
+
+class NativeStructuredOutput:
+    """
+    Output schema enforced by the provider's JSON-schema response format.
+
+    Takes the place of the output parser for agents in native mode: the
+    model is bound to the schema, so the prompt carries no format
+    instructions and the reply arrives already validated. Schemas with
+    free-form objects are sent non-strict (the provider follows the schema
+    but doesn't guarantee it), so their replies are still validated here.
+    """
+
+    def __init__(self, outputModel: Type[BaseModel]):
+        self.outputModel = outputModel
+        self.strict = _supportsStrictSchema(outputModel.model_json_schema())
+
+    def bind(self, model: Any) -> Any:
+        return model.with_structured_output(
+            self.outputModel,
+            method="json_schema",
+            include_raw=True,
+            strict=self.strict,
+        )
+
+    def parse(self, output: Dict[str, Any]) -> Tuple[BaseMessage, BaseModel]:
+        """
+        Split a bound model's output into (raw message, parsed model).
+
+        Raises:
+            OutputParserException: If the provider refused or the reply didn't validate
+        """
+        raw = output.get("raw")
+        parsed = output.get("parsed")
+
+        if parsed is None:
+            refusal = (getattr(raw, "additional_kwargs", None) or {}).get("refusal")
+            reason = output.get("parsing_error") or refusal or "empty reply"
+            raise OutputParserException(
+                f"{self.outputModel.__name__} reply was not usable: {reason}",
+                llm_output=str(getattr(raw, "content", "")),
+            )
+
+        return raw, parsed
+
+
+def agentTimeout(agentName: Optional[str]) -> float:
+    return settings.agentTimeoutSeconds.get(agentName or "", settings.llmTimeoutSeconds)
+
+
+def selectModel(agentName: str) -> Tuple[str, bool]:
+    """
+    Pick the model for an agent call; returns (model, degraded).
+
+    With a latency budget active, a stage falls back to the fast model when
+    the remaining budget is below that stage's recent median latency on its
+    primary model.
+    """
+    primary = settings.agentModels.get(agentName, settings.openaiModel)
+    budget = currentLatencyBudget()
+
+    if budget is None or not settings.fastModel or primary == settings.fastModel:
+        return primary, False
+
+    expected = agentLatency.percentile(0.5, agentName, primary) or settings.latencyBudgetReserveSeconds
+
+    if budget.remaining() < expected:
+        return settings.fastModel, True
+
+    return primary, False
+
+
+def recordTokenUsage(
+    agentName: str,
+    promptValue: PromptValue,
+    message: BaseMessage,
+    modelName: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Record prompt/completion/cached tokens, preferring provider usage over a local tiktoken count.
+
+    Returns:
+        Token counts plus promptCache: "hit" when the provider served part of
+        the prompt from its cache, "miss" when it reported none, "unknown"
+        when the response carried no usage data
+    """
+    usage = getattr(message, "usage_metadata", None) or {}
+
+    promptTokens = usage.get("input_tokens")
+    completionTokens = usage.get("output_tokens")
+    cachedTokens = (usage.get("input_token_details") or {}).get("cache_read")
+
+    if promptTokens is None:
+        promptTokens = countTokens(promptValue.to_string(), modelName or settings.openaiModel)
+    if completionTokens is None:
+        completionTokens = countTokens(str(message.content), modelName or settings.openaiModel)
+
+    agentTokens.observe(promptTokens, agent=agentName, kind="prompt")
+    agentTokens.observe(completionTokens, agent=agentName, kind="completion")
+
+    if not usage:
+        promptCache = "unknown"
+    else:
+        cachedTokens = cachedTokens or 0
+        promptCache = "hit" if cachedTokens > 0 else "miss"
+
+        agentTokens.observe(cachedTokens, agent=agentName, kind="cached")
+        cacheEvents.inc(cache="llm_prompt", result=promptCache)
+
+    return {
+        "prompt": promptTokens,
+        "completion": completionTokens,
+        "cached": cachedTokens or 0,
+        "promptCache": promptCache,
+    }
+
+
+def hedgeDelay(agentName: str, modelName: str) -> Optional[float]:
+    """Seconds after which a duplicate request is issued, or None when hedging doesn't apply."""
+    if not settings.llmHedgingEnabled:
+        return None
+
+    p95 = agentLatency.percentile(settings.llmHedgeQuantile, agentName, modelName)
+
+    if p95 is None:
+        return None
+
+    return max(p95, settings.llmHedgeMinDelaySeconds)
+
+
+def _hedgeAttempt(agentName: str, model: Any, promptValue: PromptValue) -> Any:
+    # Important: a hedge only runs if a slot is free right now; it never queues behind real traffic.
+    
+    with llmLimiter.slot(agentName, timeout=0):
+        return model.invoke(promptValue)
+
+
+def invokeModel(
+    agentName: str,
+    modelName: str,
+    model: Any,
+    promptValue: PromptValue,
+    timeout: Optional[float],
+    lease: Optional[SlotLease] = None,
+) -> Any:
+    """
+    Invoke the model, hedging with an identical request once the first one
+    runs past the agent's recent p95. Returns a message, or the raw/parsed
+    dict of a schema-bound model. The first successful answer wins; the
+    slower request is left to finish in the background.
+
+    `lease` is the caller's limiter slot: if the primary request is still
+    running when this returns, the slot is kept until it finishes, so
+    background calls count against LLM_MAX_CONCURRENCY.
+    """
+    delay = hedgeDelay(agentName, modelName)
+
+    if delay is None or (timeout is not None and delay >= timeout):
+        return model.invoke(promptValue)
+
+    primary = _hedgeExecutor.submit(copy_context().run, model.invoke, promptValue)
+
+    try:
+        return _awaitHedged(agentName, model, promptValue, primary, delay)
+    finally:
+        if lease is not None and not primary.done():
+            release = lease.detach()
+            primary.add_done_callback(lambda _: release())
+
+
+def _awaitHedged(agentName: str, model: Any, promptValue: PromptValue, primary: Future, delay: float) -> Any:
+    try:
+        return primary.result(timeout=delay)
+    except FutureTimeoutError:
+        pass
+
+    hedge = _hedgeExecutor.submit(copy_context().run, _hedgeAttempt, agentName, model, promptValue)
+    agentHedges.inc(agent=agentName, outcome="issued")
+
+    pending = {primary, hedge}
+    failures: Dict[Future, BaseException] = {}
+
+    while pending:
+        done, pending = wait(pending, timeout=timeoutFor(None), return_when=FIRST_COMPLETED)
+
+        if not done:
+            raise DeadlineExceeded(f"Request deadline exceeded waiting for {agentName}")
+
+        for future in done:
+            error = future.exception()
+
+            if error is None:
+                if future is hedge:
+                    agentHedges.inc(agent=agentName, outcome="won")
+                else:
+                    agentHedges.inc(agent=agentName, outcome="lost")
+                return future.result()
+
+            if future is hedge and isinstance(error, TimeoutError):
+                agentHedges.inc(agent=agentName, outcome="skipped")
+
+            failures[future] = error
+
+    raise failures.get(primary) or failures[hedge]
+
+
+def runAgentChain(
+    agentName: str,
+    prompt: ChatPromptTemplate,
+    parser: Union[BaseOutputParser, NativeStructuredOutput],
+    variables: Dict[str, Any],
+) -> Any:
+    """
+    Invoke prompt | model | parser for one agent.
+
+    With a NativeStructuredOutput in place of the parser, the model is bound
+    to the output schema and the provider returns the validated object.
+
+    The call waits for a free slot in the global and per-agent limits so
+    bursts queue here instead of hitting provider rate limits. Queue wait and
+    the client timeout are bounded by the request deadline. Latency, queue
+    wait and token usage are recorded per agent.
+
+    Raises:
+        DeadlineExceeded: If the request deadline passes before or during the call
+    """
+    modelName, degraded = selectModel(agentName)
+
+    agentModelSelections.inc(agent=agentName, model=modelName, degraded=str(degraded).lower())
+
+    native = isinstance(parser, NativeStructuredOutput)
+
+    with startSpan(
+        f"agent.{agentName}",
+        agent=agentName,
+        model=modelName,
+        degraded=degraded,
+        structuredOutput="native" if native else "parser",
+    ) as span:
+        promptValue = prompt.invoke(variables)
+
+        queuedAt = time.perf_counter()
+
+        try:
+            with llmLimiter.slot(agentName, timeout=timeoutFor(None)) as lease:
+                startedAt = time.perf_counter()
+                agentQueueWait.observe(startedAt - queuedAt, agent=agentName)
+
+                timeout = timeoutFor(agentTimeout(agentName))
+                model = getChatModel(agentName, modelName, timeout=timeout)
+
+                if native:
+                    model = parser.bind(model)
+
+                try:
+                    output = invokeModel(agentName, modelName, model, promptValue, timeout, lease)
+                    message, result = parser.parse(output) if native else (output, parser.invoke(output))
+                except Exception:
+                    agentErrors.inc(agent=agentName)
+                    agentDuration.observe(time.perf_counter() - startedAt, agent=agentName, promptCache="error")
+                    raise
+
+                elapsed = time.perf_counter() - startedAt
+        except Exception as e:
+            # Client timeouts and slot waits that ran into the request deadline surface as one error type.
+
+            if isinstance(e, DeadlineExceeded) or deadlineExpired():
+                deadlineExceeded.inc(stage=agentName)
+                if not isinstance(e, DeadlineExceeded):
+                    raise DeadlineExceeded(f"Request deadline exceeded during {agentName}") from e
+            raise
+
+        agentLatency.observe(elapsed, agentName, modelName)
+
+        tokens = recordTokenUsage(agentName, promptValue, message, modelName)
+
+        agentDuration.observe(elapsed, agent=agentName, promptCache=tokens["promptCache"])
+
+        span.setAttributes(
+            queueWaitMs=round((startedAt - queuedAt) * 1000, 3),
+            timeoutSeconds=round(timeout, 3),
+            promptTokens=tokens["prompt"],
+            completionTokens=tokens["completion"],
+            cachedTokens=tokens["cached"],
+            promptCache=tokens["promptCache"],
+        )
+
+    return result
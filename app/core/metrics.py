@@ -0,0 +1,302 @@
+"""In-process metrics with Prometheus text exposition."""
+
+import math
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+COUNT_BUCKETS = (0, 1, 5, 10, 30, 100, 300, 1000, 3000, 10000, 100000)
+
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+BYTE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000, 20_000_000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatLabels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels) + "}"
+
+
+def _formatValue(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelNames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelNames = tuple(labelNames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelNames)
+
+    def _labelPairs(self, key: Tuple[str, ...]) -> List[Tuple[str, str]]:
+        return list(zip(self.labelNames, key))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelNames: Sequence[str] = ()):
+        super().__init__(name, help, labelNames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_formatLabels(self._labelPairs(k))} {_formatValue(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelNames: Sequence[str] = ()):
+        super().__init__(name, help, labelNames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_formatLabels(self._labelPairs(k))} {_formatValue(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelNames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelNames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[idx] += 1
+                    break
+
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        startedAt = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - startedAt, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s, n)) for k, (c, s, n) in self._values.items())
+
+        lines = []
+
+        for key, (counts, total, count) in items:
+            labels = self._labelPairs(key)
+            cumulative = 0
+
+            for bound, bucketCount in zip(self.buckets, counts):
+                cumulative += bucketCount
+                lines.append(f"{self.name}_bucket{_formatLabels(labels + [('le', _formatValue(bound))])} {cumulative}")
+
+            lines.append(f"{self.name}_bucket{_formatLabels(labels + [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_formatLabels(labels)} {_formatValue(total)}")
+            lines.append(f"{self.name}_count{_formatLabels(labels)} {count}")
+
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+agentDuration = registry.register(Histogram(
+    "procurement_agent_duration_seconds",
+    "LLM agent call duration (model and parsing), excluding queue wait, by provider prompt-cache outcome.",
+    ["agent", "promptCache"],
+))
+
+agentQueueWait = registry.register(Histogram(
+    "procurement_agent_queue_wait_seconds",
+    "Time spent waiting for an LLM concurrency slot.",
+    ["agent"],
+))
+
+agentTokens = registry.register(Histogram(
+    "procurement_agent_tokens",
+    "Tokens per agent call.",
+    ["agent", "kind"],
+    buckets=TOKEN_BUCKETS,
+))
+
+promptTokensSaved = registry.register(Histogram(
+    "procurement_prompt_tokens_saved",
+    "Estimated prompt tokens saved by sending a result digest instead of raw rows.",
+    ["agent"],
+    buckets=TOKEN_BUCKETS,
+))
+
+agentErrors = registry.register(Counter(
+    "procurement_agent_errors_total",
+    "Agent calls that raised.",
+    ["agent"],
+))
+
+agentModelSelections = registry.register(Counter(
+    "procurement_agent_model_selections_total",
+    "Model chosen per agent call (degraded = switched to the fast model by the latency budget).",
+    ["agent", "model", "degraded"],
+))
+
+agentHedges = registry.register(Counter(
+    "procurement_agent_hedges_total",
+    "Hedged LLM requests (issued, won, lost, skipped when no slot was free).",
+    ["agent", "outcome"],
+))
+
+deadlineExceeded = registry.register(Counter(
+    "procurement_deadline_exceeded_total",
+    "Operations aborted because the request deadline passed.",
+    ["stage"],
+))
+
+pipelinePolicyEvents = registry.register(Counter(
+    "procurement_pipeline_policy_events_total",
+    "Generated pipelines rejected or rewritten by the pipeline policy, by rule.",
+    ["rule", "action"],
+))
+
+aggregationDuration = registry.register(Histogram(
+    "procurement_aggregation_duration_seconds",
+    "MongoDB aggregation duration including result decoding.",
+))
+
+mongoPoolCheckoutWait = registry.register(Histogram(
+    "procurement_mongo_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled MongoDB connection, by client (serving, ingest).",
+    ["client"],
+    buckets=WAIT_BUCKETS,
+))
+
+mongoPoolEvents = registry.register(Counter(
+    "procurement_mongo_pool_events_total",
+    "MongoDB connection pool events (created, closed, checkoutFailed:<reason>, cleared).",
+    ["client", "event"],
+))
+
+aggregationRows = registry.register(Histogram(
+    "procurement_aggregation_rows",
+    "Rows returned per aggregation.",
+    buckets=COUNT_BUCKETS,
+))
+
+refinementIterations = registry.register(Histogram(
+    "procurement_refinement_iterations",
+    "Query builder iterations beyond the first, per answered request.",
+    buckets=(0, 1, 2, 3),
+))
+
+requestDuration = registry.register(Histogram(
+    "procurement_request_duration_seconds",
+    "runProcurementAssistant duration by outcome.",
+    ["status"],
+))
+
+requestOutcomes = registry.register(Counter(
+    "procurement_requests_total",
+    "Assistant requests by outcome status.",
+    ["status"],
+))
+
+serializationDuration = registry.register(Histogram(
+    "procurement_serialization_duration_seconds",
+    "Response body encoding duration.",
+))
+
+responseBytes = registry.register(Histogram(
+    "procurement_response_bytes",
+    "Encoded response body size.",
+    buckets=BYTE_BUCKETS,
+))
+
+exportRows = registry.register(Counter(
+    "procurement_export_rows_total",
+    "Rows streamed by full-result exports.",
+    ["format"],
+))
+
+cacheEvents = registry.register(Counter(
+    "procurement_cache_events_total",
+    "Cache and shortcut outcomes (hit = expensive work avoided).",
+    ["cache", "result"],
+))
+
+runtimeGauges = registry.register(Gauge(
+    "procurement_runtime",
+    "Point-in-time runtime state (queues, in-flight work, pool sizes).",
+    ["component", "state"],
+))
+
+
+def renderMetrics() -> str:
+    return registry.render()
@@ -0,0 +1,197 @@
+"""Opt-in sampling profiler for individual requests."""
+
+import json
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+Frame = Tuple[str, str, int]
+
+Stack = Tuple[Frame, ...]
+
+_CWD = os.getcwd()
+
+_STDLIB = sysconfig.get_paths()["stdlib"]
+
+
+def _shortPath(filename: str) -> str:
+    # Keep paths readable: relative to site-packages, the stdlib or the repo.
+
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    if filename.startswith(_STDLIB):
+        return os.path.relpath(filename, _STDLIB)
+    if filename.startswith(_CWD):
+        return os.path.relpath(filename, _CWD)
+    return filename
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's stack on a background thread.
+
+    Only the profiled request pays for sampling; the target thread runs
+    unmodified (no sys.setprofile hooks), so timings stay representative.
+    """
+
+    def __init__(self, threadId: Optional[int] = None, interval: float = 0.005):
+        self.threadId = threadId if threadId is not None else threading.get_ident()
+        self.interval = interval
+        self.counts: Dict[Stack, int] = defaultdict(int)
+        self.weights: Dict[Stack, float] = defaultdict(float)
+        self.startedAt = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "SamplingProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self.startedAt = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.startedAt
+
+    def _run(self) -> None:
+        lastSample = time.perf_counter()
+
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.threadId)
+            now = time.perf_counter()
+
+            if frame is not None:
+                stack = self._stack(frame)
+                self.counts[stack] += 1
+                self.weights[stack] += now - lastSample
+
+            lastSample = now
+
+    @staticmethod
+    def _stack(frame: Any) -> Stack:
+        frames: List[Frame] = []
+
+        while frame is not None:
+            code = frame.f_code
+            frames.append((code.co_name, _shortPath(code.co_filename), code.co_firstlineno))
+            frame = frame.f_back
+
+        frames.reverse()
+
+        return tuple(frames)
+
+    @property
+    def sampleCount(self) -> int:
+        return sum(self.counts.values())
+
+    def collapsed(self) -> str:
+        """Brendan Gregg collapsed stacks ("a;b;c count" per line), for flamegraph.pl / speedscope."""
+        lines = []
+
+        for stack, count in sorted(self.counts.items()):
+            names = ";".join(f"{name} ({path}:{line})" for name, path, line in stack)
+            lines.append(f"{names} {count}")
+
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str) -> Dict[str, Any]:
+        """Speedscope file-format document with one sampled profile (weights in seconds)."""
+        frameIndex: Dict[Frame, int] = {}
+        frames: List[Dict[str, Any]] = []
+        samples: List[List[int]] = []
+        weights: List[float] = []
+
+        for stack, weight in self.weights.items():
+            indices = []
+
+            for frame in stack:
+                if frame not in frameIndex:
+                    frameIndex[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indices.append(frameIndex[frame])
+
+            samples.append(indices)
+            weights.append(round(weight, 6))
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "procurement-ai-backend",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": round(sum(weights), 6),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+    def render(self, profileFormat: str, name: str) -> Any:
+        if profileFormat == "collapsed":
+            return self.collapsed()
+        return self.speedscope(name)
+
+
+_requestCounter = 0
+
+_requestCounterLock = threading.Lock()
+
+
+def shouldProfileSampledRequest() -> bool:
+    """True for every Nth request when PROFILING_EVERY_N is set."""
+    global _requestCounter
+
+    if settings.profilingEveryN <= 0:
+        return False
+
+    with _requestCounterLock:
+        _requestCounter += 1
+        return _requestCounter % settings.profilingEveryN == 0
+
+
+def saveProfile(profiler: SamplingProfiler, name: str, profileFormat: str = "speedscope") -> Path:
+    """
+    Write a profile to the profiling directory, keeping only the newest files.
+
+    Returns:
+        Path of the written profile
+    """
+    directory = Path(settings.profilingDir)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    suffix = "collapsed.txt" if profileFormat == "collapsed" else "speedscope.json"
+    path = directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{name}.{suffix}"
+
+    rendered = profiler.render(profileFormat, name)
+    path.write_text(rendered if isinstance(rendered, str) else json.dumps(rendered), encoding="utf-8")
+
+    # Important: rotate so an always-on sampling rate can't fill the disk.
+
+    profiles = sorted(directory.glob("*.*"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in profiles[settings.profilingMaxFiles:]:
+        old.unlink(missing_ok=True)
+
+    return path
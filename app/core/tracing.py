@@ -0,0 +1,280 @@
+"""Per-request tracing spans with JSONL and OTLP/HTTP exporters."""
+
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+from app.core.config import settings
+
+
+SERVICE_NAME = "procurement-ai-backend"
+
+
+class _Trace:
+    """Finished spans of one trace, exported together when the root span ends."""
+
+    def __init__(self) -> None:
+        self.traceId = secrets.token_hex(16)
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Dict[str, Any]) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+
+class Span:
+    def __init__(self, name: str, trace: _Trace, parentId: Optional[str]):
+        self.name = name
+        self.traceId = trace.traceId
+        self.spanId = secrets.token_hex(8)
+        self.parentId = parentId
+        self.startTime = time.time_ns()
+        self.endTime: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self._trace = trace
+
+    def setAttributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        self.endTime = time.time_ns()
+        self._trace.add(self.toDict())
+
+    def toDict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.traceId,
+            "spanId": self.spanId,
+            "parentId": self.parentId,
+            "name": self.name,
+            "startTime": self.startTime,
+            "endTime": self.endTime,
+            "durationMs": round(((self.endTime or time.time_ns()) - self.startTime) / 1e6, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": dict(self.attributes),
+        }
+
+
+_currentSpan: ContextVar[Optional[Span]] = ContextVar("currentSpan", default=None)
+
+
+@contextmanager
+def startSpan(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Open a span as a child of the current one (or as a new trace root).
+
+    The span follows contextvars, so work handed to executors through
+    contextvars.copy_context() still nests under the request's trace.
+    """
+    parent = _currentSpan.get()
+    trace = parent._trace if parent is not None else _Trace()
+
+    span = Span(name, trace, parent.spanId if parent is not None else None)
+    span.setAttributes(**attributes)
+
+    token = _currentSpan.set(span)
+
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "error"
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _currentSpan.reset(token)
+        span.end()
+
+        if parent is None:
+            _exportTrace(trace)
+
+
+def currentSpan() -> Optional[Span]:
+    return _currentSpan.get()
+
+
+def currentTraceId() -> Optional[str]:
+    span = _currentSpan.get()
+    return span.traceId if span is not None else None
+
+
+def setSpanAttributes(**attributes: Any) -> None:
+    """Add attributes to the current span; no-op outside a trace."""
+    span = _currentSpan.get()
+
+    if span is not None:
+        span.setAttributes(**attributes)
+
+
+class SpanExporter(ABC):
+    """Destination for finished traces."""
+
+    @abstractmethod
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        ...
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends one JSON object per span to a local file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        lines = "".join(json.dumps(span, default=str) + "\n" for span in spans)
+
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def _otlpValue(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlpAttributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlpValue(value)} for key, value in attributes.items() if value is not None]
+
+
+def toOtlpPayload(spans: List[Dict[str, Any]], serviceName: str = SERVICE_NAME) -> Dict[str, Any]:
+    """Convert spans to an OTLP/JSON ExportTraceServiceRequest."""
+    otlpSpans = []
+
+    for span in spans:
+        otlpSpan = {
+            "traceId": span["traceId"],
+            "spanId": span["spanId"],
+            "name": span["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(span["startTime"]),
+            "endTimeUnixNano": str(span["endTime"]),
+            "attributes": _otlpAttributes(span["attributes"]),
+            "status": {"code": 2, "message": span["error"]} if span["status"] == "error" else {"code": 1},
+        }
+
+        if span["parentId"]:
+            otlpSpan["parentSpanId"] = span["parentId"]
+
+        otlpSpans.append(otlpSpan)
+
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _otlpAttributes({"service.name": serviceName})},
+                "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": otlpSpans}],
+            }
+        ]
+    }
+
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """Posts traces as OTLP/JSON to a collector (e.g. http://localhost:4318/v1/traces)."""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.endpoint = endpoint
+        self._client = httpx.Client(timeout=timeout)
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        response = self._client.post(self.endpoint, json=toOtlpPayload(spans))
+        response.raise_for_status()
+
+
+class _ExportWorker:
+    """
+    Exports traces on a background thread so requests never wait on I/O.
+
+    Traces are dropped (and counted) when the queue is full.
+    """
+
+    def __init__(self, exporter: SpanExporter, maxQueue: int = 1000):
+        self.exporter = exporter
+        self._queue: "queue.Queue[List[Dict[str, Any]]]" = queue.Queue(maxsize=maxQueue)
+        self.dropped = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, spans: List[Dict[str, Any]]) -> None:
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            spans = self._queue.get()
+
+            try:
+                self.exporter.export(spans)
+            except Exception:
+                self.failed += 1
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        self._queue.join()
+
+
+def buildSpanExporter() -> Optional[SpanExporter]:
+    if settings.traceExporter == "jsonl":
+        return JsonlSpanExporter(settings.traceJsonlPath)
+
+    if settings.traceExporter == "otlp":
+        return OtlpHttpSpanExporter(settings.traceOtlpEndpoint)
+
+    return None
+
+
+_exportWorker: Optional[_ExportWorker] = None
+
+_exportWorkerLock = threading.Lock()
+
+
+def _getExportWorker() -> Optional[_ExportWorker]:
+    global _exportWorker
+
+    if settings.traceExporter == "none":
+        return None
+
+    with _exportWorkerLock:
+        if _exportWorker is None:
+            exporter = buildSpanExporter()
+            if exporter is None:
+                return None
+            _exportWorker = _ExportWorker(exporter)
+
+    return _exportWorker
+
+
+def _exportTrace(trace: _Trace) -> None:
+    worker = _getExportWorker()
+
+    if worker is not None:
+        worker.submit(list(trace.spans))
+
+
+def flushTraces() -> None:
+    """Block until queued traces are exported (tests and shutdown)."""
+    if _exportWorker is not None:
+        _exportWorker.flush()
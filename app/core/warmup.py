@@ -0,0 +1,245 @@
+"""Startup warmup: pay cold-start costs before the pod takes traffic."""
+
+import importlib
+import time
+from pathlib import Path
+from threading import Event, Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+AGENTS_DIR = Path(__file__).parent.parent / "agents"
+
+# Heavy modules the first request would otherwise import.
+WARMUP_MODULES = [
+    "langchain_openai",
+    "langchain_core.prompts",
+    "langchain_core.output_parsers",
+    "pymongo",
+    "app.agents.orchestrator",
+]
+
+# Longest wait between retries of failed required steps.
+MAX_RETRY_SECONDS = 60
+
+# (name, step, required)
+WarmupStep = Tuple[str, Callable[[], None], bool]
+
+
+class WarmupState:
+    """Progress of the warmup steps; ready once every required step succeeded."""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.started = False
+        self.completed = False
+
+    def record(self, name: str, required: bool, seconds: float, error: Optional[str]) -> None:
+        with self._lock:
+            attempts = self.steps.get(name, {}).get("attempts", 0)
+            self.steps[name] = {
+                "status": "error" if error else "ok",
+                "required": required,
+                "seconds": round(seconds, 3),
+                "error": error,
+                "attempts": attempts + 1,
+            }
+
+    def failedSteps(self, required: bool) -> List[str]:
+        with self._lock:
+            return [
+                name for name, step in self.steps.items()
+                if step["status"] == "error" and step["required"] == required
+            ]
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return self.completed and all(
+                step["status"] == "ok" for step in self.steps.values() if step["required"]
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        ready = self.ready
+
+        with self._lock:
+            return {
+                "ready": ready,
+                "started": self.started,
+                "completed": self.completed,
+                "steps": {name: dict(step) for name, step in self.steps.items()},
+            }
+
+
+warmupState = WarmupState()
+
+_stopRequested = Event()
+
+
+def _importModules() -> None:
+    for module in WARMUP_MODULES:
+        importlib.import_module(module)
+
+
+def _loadPromptsAndCatalog() -> None:
+    from app.utils.data_overview import loadDataOverview
+    from app.utils.field_catalog import loadFieldCatalog
+    from app.utils.prompt_loader import loadPrompt
+
+    for promptPath in sorted(AGENTS_DIR.glob("*/*.txt")):
+        loadPrompt(promptPath.parent, promptPath.name)
+
+    loadFieldCatalog()
+    loadDataOverview()
+
+
+def _pingMongo() -> None:
+    from app.db.mongo import getMongoClient
+
+    getMongoClient().admin.command("ping")
+
+
+def _loadTokenizer() -> None:
+    from app.utils.tokens import getEncoding
+
+    if getEncoding(settings.openaiModel) is None:
+        raise RuntimeError("tiktoken encoding unavailable; token counts will be estimated")
+
+
+def _buildEntityIndex() -> None:
+    from app.db.entity_index import refreshEntityIndex
+
+    if settings.entityResolutionEnabled:
+        refreshEntityIndex()
+
+
+def _loadPipelineStats() -> None:
+    from app.agents.mongo_query_validator.heuristics import ENTITY_FIELDS
+    from app.db.pipeline_policy import collectionCardinality
+
+    # Distinct counts for fields commonly grouped on, so the pipeline policy doesn't sample them mid-request.
+
+    collectionCardinality.documents()
+
+    for field in ENTITY_FIELDS + ["purchase_order_number"]:
+        collectionCardinality.distinct(field)
+
+
+def _loadSuggestionBank() -> None:
+    from app.agents.suggested_questions import getSuggestionBank
+
+    bank = getSuggestionBank()
+
+    # Seed learned suggestions from questions that returned data in stored sessions.
+
+    if settings.sessionBackend == "mongo":
+        from app.db.mongo import getMongoClient
+
+        sessions = getMongoClient()[settings.mongodbDb][settings.sessionCollection]
+        cursor = sessions.find({}, {"_id": 0, "turns.normalizedQuery": 1, "turns.resultCount": 1})
+
+        for doc in cursor.limit(settings.suggestionBankMaxLearned):
+            for turn in doc.get("turns", []):
+                if turn.get("normalizedQuery") and turn.get("resultCount"):
+                    bank.learn(turn["normalizedQuery"])
+
+    bank.suggest("Total spend by fiscal year")
+
+
+def _openLlmConnection() -> None:
+    from app.core.llm import getChatModel
+
+    # Important: ChatOpenAI instances share one pooled HTTP client, so this keeps a TLS connection open.
+
+    getChatModel().root_client.models.retrieve(settings.openaiModel)
+
+
+def _askWarmupQuestions() -> None:
+    from app.agents.orchestrator import runProcurementAssistant
+
+    for question in settings.warmupQuestions:
+        runProcurementAssistant(message=question, history=[], collectionName=settings.mongodbCollection)
+
+
+def _runStep(name: str, step: Callable[[], None], required: bool) -> None:
+    startedAt = time.perf_counter()
+    error = None
+
+    try:
+        step()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    warmupState.record(name, required, time.perf_counter() - startedAt, error)
+
+
+def warmupSteps() -> List[WarmupStep]:
+    """Warmup steps in order; required steps (imports, prompts, MongoDB) gate readiness."""
+    steps: List[WarmupStep] = [
+        ("imports", _importModules, True),
+        ("prompts", _loadPromptsAndCatalog, True),
+        ("mongo", _pingMongo, True),
+        ("tokenizer", _loadTokenizer, False),
+        ("entityIndex", _buildEntityIndex, False),
+        ("suggestionBank", _loadSuggestionBank, False),
+        ("pipelineStats", _loadPipelineStats, False),
+    ]
+
+    if settings.warmupLlmConnection:
+        steps.append(("llmConnection", _openLlmConnection, False))
+
+    if settings.warmupQuestions:
+        steps.append(("warmupQuestions", _askWarmupQuestions, False))
+
+    return steps
+
+
+def runWarmup(steps: Optional[List[WarmupStep]] = None) -> WarmupState:
+    """
+    Run all warmup steps in order (blocking).
+
+    Required steps gate readiness; the rest only make the first requests
+    faster, so their failures are recorded but don't keep the pod out of
+    rotation. Failed required steps (e.g. MongoDB down at boot) are retried
+    with backoff until they pass or stopWarmup() is called; after a
+    recovery, failed optional steps get one more try since they usually
+    failed for the same reason.
+    """
+    warmupState.started = True
+    steps = warmupSteps() if steps is None else steps
+
+    for name, step, required in steps:
+        _runStep(name, step, required)
+
+    warmupState.completed = True
+
+    delay = settings.warmupRetrySeconds
+    retried = False
+
+    while warmupState.failedSteps(required=True) and delay > 0:
+        if _stopRequested.wait(delay):
+            return warmupState
+
+        failed = set(warmupState.failedSteps(required=True))
+        retried = True
+        delay = min(delay * 2, MAX_RETRY_SECONDS)
+
+        for name, step, required in steps:
+            if name in failed:
+                _runStep(name, step, required)
+
+    if retried and not warmupState.failedSteps(required=True):
+        failed = set(warmupState.failedSteps(required=False))
+
+        for name, step, required in steps:
+            if name in failed:
+                _runStep(name, step, required)
+
+    return warmupState
+
+
+def stopWarmup() -> None:
+    """Stop retrying failed warmup steps (on shutdown)."""
+    _stopRequested.set()
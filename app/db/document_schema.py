@@ -0,0 +1,271 @@
+"""
+Versioned description of the stored procurement documents.
+
+app/core/document_schema.json lists every field with its catalog metadata
+(type, description, enums, synonyms, notes), how the CSV value is parsed
+at ingest, and per-layout overrides. field_catalog.json is generated from
+it (scripts/generate_field_catalog.py) and ingest builds documents from it,
+so the prompts describe the data as it is actually stored.
+"""
+
+import json
+import re
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import bson
+
+
+DOCUMENT_SCHEMA_PATH = Path(__file__).parent.parent / "core" / "document_schema.json"
+
+LAYOUTS = ("flat", "compact")
+
+# Schema-only keys that never reach the field catalog.
+SCHEMA_KEYS = ("ingest", "layouts")
+
+# Lists longer than this (as one line) are written one item per line in the catalog.
+CATALOG_LINE_WIDTH = 80
+
+# Whole doubles beyond this lose precision as int64 round-trips; keep them as doubles.
+MAX_EXACT_INT = 2 ** 53
+
+# Number format whose whole values the compact layout stores as ints.
+COMPACT_INT_FORMAT = "int_or_float"
+
+_FLAG_SEPARATORS = re.compile(r"[\s,;|]+")
+
+
+@lru_cache(maxsize=1)
+def loadDocumentSchema() -> Dict[str, Any]:
+    """Load the document schema (cached; treat the result as read-only)."""
+    return json.loads(DOCUMENT_SCHEMA_PATH.read_text(encoding="utf-8"))
+
+
+def _checkLayout(layout: str) -> None:
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout {layout!r}; expected one of {', '.join(LAYOUTS)}")
+
+
+def fieldSpecs(layout: str = "flat") -> Dict[str, Dict[str, Any]]:
+    """
+    Field definitions for a layout, with that layout's overrides applied.
+
+    An override value of null removes the key (e.g. enums of a field that
+    becomes a boolean).
+    """
+    _checkLayout(layout)
+
+    specs: Dict[str, Dict[str, Any]] = {}
+
+    for name, spec in loadDocumentSchema()["fields"].items():
+        merged = {key: value for key, value in spec.items() if key != "layouts"}
+
+        for key, value in (spec.get("layouts") or {}).get(layout, {}).items():
+            if value is None:
+                merged.pop(key, None)
+            else:
+                merged[key] = value
+
+        specs[name] = merged
+
+    return specs
+
+
+def fieldCatalogFor(layout: str = "flat") -> Dict[str, Dict[str, Any]]:
+    """The field catalog the prompts should use for documents stored in this layout."""
+    return {
+        name: {key: value for key, value in spec.items() if key not in SCHEMA_KEYS}
+        for name, spec in fieldSpecs(layout).items()
+    }
+
+
+def _renderValue(key: str, value: Any) -> str:
+    line = f'    "{key}": {json.dumps(value, ensure_ascii=False)}'
+
+    if not isinstance(value, list) or len(line) + 1 <= CATALOG_LINE_WIDTH:
+        return line
+
+    items = ",\n".join(f"      {json.dumps(item, ensure_ascii=False)}" for item in value)
+
+    return f'    "{key}": [\n{items}\n    ]'
+
+
+def renderFieldCatalog(catalog: Dict[str, Dict[str, Any]]) -> str:
+    """Render a catalog in field_catalog.json's hand-edited style (blank line between fields)."""
+    entries = []
+
+    for name, spec in catalog.items():
+        body = ",\n".join(_renderValue(key, value) for key, value in spec.items())
+        entries.append(f'  "{name}": {{\n{body}\n  }}')
+
+    return "{\n" + ",\n\n".join(entries) + "\n}\n"
+
+
+def normalizeKey(key: str) -> str:
+    return key.strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def parseUsDate(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+
+    s = str(value).strip()
+
+    if not s:
+        return None
+
+    for fmt in ("%m/%d/%Y", "%m/%d/%y"):
+        try:
+            return datetime.strptime(s, fmt)
+        except Exception:
+            continue
+
+    return None
+
+
+def parseCurrency(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+
+    s = str(value).strip()
+
+    if not s:
+        return None
+
+    s = s.replace("$", "").replace(",", "").strip()
+
+    try:
+        return float(s)
+    except Exception:
+        return None
+
+
+def parseNumber(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+
+    s = str(value).strip()
+
+    if not s:
+        return None
+
+    s2 = s.replace(",", "")
+
+    try:
+        return float(s2)
+    except Exception:
+        return None
+
+
+def parseText(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+
+    s = str(value).strip()
+
+    return s or None
+
+
+def parseFlags(value: Any) -> Optional[List[str]]:
+    flags = [flag for flag in _FLAG_SEPARATORS.split(parseText(value) or "") if flag]
+    return list(dict.fromkeys(flags)) or None
+
+
+def parseYesNo(value: Any) -> Optional[bool]:
+    s = (parseText(value) or "").upper()
+    return {"YES": True, "Y": True, "NO": False, "N": False}.get(s)
+
+
+PARSERS = {
+    "date": parseUsDate,
+    "currency": parseCurrency,
+    "number": parseNumber,
+    "text": parseText,
+    "flags": parseFlags,
+    "yesno": parseYesNo,
+}
+
+
+def computeDateFields(doc: Dict[str, Any], dateField: str) -> None:
+    dt = doc.get(dateField)
+
+    if not isinstance(dt, datetime):
+        return
+
+    doc["calendar_year"] = dt.year
+
+    doc["calendar_month"] = dt.month
+
+    doc["calendar_quarter"] = int(((dt.month - 1) / 3) + 1)
+
+    fiscalYearStart = dt.year if dt.month >= 7 else dt.year - 1
+
+    doc["fiscal_year_start"] = fiscalYearStart
+
+    fiscalMonth = ((dt.month - 7) % 12) + 1
+
+    doc["fiscal_quarter"] = int(((fiscalMonth - 1) / 3) + 1)
+
+
+def _compactNumber(value: Any) -> Any:
+    if isinstance(value, float) and value.is_integer() and abs(value) < MAX_EXACT_INT:
+        return int(value)
+    return value
+
+
+class DocumentBuilder:
+    """Turns CSV rows into documents for one layout."""
+
+    def __init__(self, headers: Iterable[str], layout: str = "flat"):
+        specs = fieldSpecs(layout)
+
+        self.layout = layout
+        self.headers = [(header, normalizeKey(header)) for header in headers]
+        self.parsers = {
+            key: PARSERS.get((specs.get(key) or {}).get("ingest", "text"), parseText)
+            for _, key in self.headers
+        }
+
+        # Important: only fields whose spec says so become ints; prices stay doubles as the catalog states.
+
+        self.intFields = {key for key, spec in specs.items() if spec.get("format") == COMPACT_INT_FORMAT}
+
+    def build(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        doc: Dict[str, Any] = {}
+
+        for header, key in self.headers:
+            doc[key] = self.parsers[key](row.get(header))
+
+        computeDateFields(doc, "creation_date")
+
+        if self.layout == "compact":
+            doc = {
+                key: _compactNumber(value) if key in self.intFields else value
+                for key, value in doc.items() if value is not None
+            }
+
+        return doc
+
+
+def layoutSizeReport(rows: Iterable[Dict[str, Any]], headers: Iterable[str]) -> Dict[str, Dict[str, int]]:
+    """
+    BSON size of the same rows in every layout, without a database.
+
+    Returns:
+        {layout: {"documents", "bytes", "avgBytes"}}
+    """
+    headers = list(headers)
+    builders = {layout: DocumentBuilder(headers, layout) for layout in LAYOUTS}
+    report = {layout: {"documents": 0, "bytes": 0} for layout in LAYOUTS}
+
+    for row in rows:
+        for layout, builder in builders.items():
+            report[layout]["documents"] += 1
+            report[layout]["bytes"] += len(bson.encode(builder.build(row)))
+
+    for stats in report.values():
+        stats["avgBytes"] = stats["bytes"] // max(1, stats["documents"])
+
+    return report
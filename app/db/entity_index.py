@@ -0,0 +1,371 @@
+"""In-memory index of canonical entity names for resolving user mentions."""
+
+import logging
+import re
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock, Thread
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.db.mongo import getCollection
+
+
+logger = logging.getLogger(__name__)
+
+ENTITY_FIELDS = ["department_name", "supplier_name", "commodity_title", "acquisition_method"]
+
+# Words that carry no identity in entity names ("Health Care Services, Department of").
+NAME_STOPWORDS = {
+    "a", "an", "and", "the", "of", "for", "in", "on", "at", "to", "by", "&",
+    "department", "dept", "inc", "llc", "ltd", "co", "corp", "corporation", "company",
+    "l", "p", "lp", "llp",
+}
+
+# Question words that should never start or end a mention on their own.
+QUERY_STOPWORDS = NAME_STOPWORDS | {
+    "what", "which", "who", "how", "much", "many", "show", "list", "give", "me",
+    "total", "spend", "spending", "spent", "top", "by", "per", "from", "with",
+    "year", "fiscal", "quarter", "month", "supplier", "suppliers", "vendor", "vendors",
+    "purchases", "purchase", "orders", "did", "does", "is", "was", "were", "are",
+    "it", "all", "most", "least", "highest", "lowest", "largest", "during", "between",
+    "over", "under", "than", "more", "less",
+}
+
+MAX_MENTION_WORDS = 6
+
+MIN_SCORE = 0.75
+
+# Mention tokens matched only by prefix or typo expansion count for less than exact ones.
+EXPANDED_TOKEN_WEIGHT = 0.9
+
+# Share of the score that rewards entries without extra words; the rest is mention coverage.
+ENTRY_PRECISION_WEIGHT = 0.25
+
+# Longest wait between rebuild attempts while MongoDB keeps failing.
+MAX_RETRY_SECONDS = 900
+
+# A lone word shared by this many names ("services", "supply") is not a mention.
+GENERIC_TOKEN_ENTRIES = 25
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class EntityMatch(BaseModel):
+    field: str
+
+    mention: str
+
+    value: str
+
+    score: float
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _contentTokens(text: str) -> FrozenSet[str]:
+    return frozenset(t for t in _tokenize(text) if t not in NAME_STOPWORDS)
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+class EntityIndex:
+    """
+    Token/trigram index over distinct entity values.
+
+    Mentions are matched on their content tokens, so word order and filler
+    words ("Department of ...") don't matter. Unknown tokens are expanded by
+    prefix ("corr" -> "corrections") or trigram similarity (typos).
+    """
+
+    def __init__(self, values: Dict[str, Iterable[str]]):
+        self._entries: List[Tuple[str, str, FrozenSet[str]]] = []
+        self._tokenEntries: Dict[str, Set[int]] = defaultdict(set)
+        self._trigramTokens: Dict[str, Set[str]] = defaultdict(set)
+
+        for field, fieldValues in values.items():
+            for value in fieldValues:
+                if not isinstance(value, str) or not value.strip():
+                    continue
+
+                tokens = _contentTokens(value)
+                if not tokens:
+                    continue
+
+                entryId = len(self._entries)
+                self._entries.append((field, value, tokens))
+
+                for token in tokens:
+                    self._tokenEntries[token].add(entryId)
+
+        for token in self._tokenEntries:
+            for gram in _trigrams(token):
+                self._trigramTokens[gram].add(token)
+
+        self._sortedTokens = sorted(self._tokenEntries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expandToken(self, token: str) -> Set[str]:
+        if token in self._tokenEntries:
+            return {token}
+
+        expanded: Set[str] = set()
+
+        if len(token) >= 4:
+            start = bisect_left(self._sortedTokens, token)
+            for candidate in self._sortedTokens[start:start + 50]:
+                if not candidate.startswith(token):
+                    break
+                expanded.add(candidate)
+
+        if not expanded and len(token) >= 5:
+            grams = _trigrams(token)
+            candidates: Set[str] = set()
+            for gram in grams:
+                candidates |= self._trigramTokens.get(gram, set())
+            expanded = {c for c in candidates if _dice(grams, _trigrams(c)) >= 0.7}
+
+        return expanded
+
+    def lookup(self, mention: str, field: Optional[str] = None, limit: int = 3) -> List[EntityMatch]:
+        """Return the best canonical values for a single mention."""
+        mentionTokens = _contentTokens(mention)
+
+        if not mentionTokens:
+            return []
+
+        if len(mentionTokens) == 1:
+            token = next(iter(mentionTokens))
+            if len(self._tokenEntries.get(token, ())) > GENERIC_TOKEN_ENTRIES:
+                return []
+
+        candidateIds: Optional[Set[int]] = None
+        matchedTokens: Dict[str, Set[str]] = {}
+
+        # Important: every mention token must resolve, otherwise it's not this entity.
+
+        for token in mentionTokens:
+            expansions = self._expandToken(token)
+            if not expansions:
+                return []
+
+            matchedTokens[token] = expansions
+            ids: Set[int] = set()
+            for expansion in expansions:
+                ids |= self._tokenEntries[expansion]
+
+            candidateIds = ids if candidateIds is None else candidateIds & ids
+            if not candidateIds:
+                return []
+
+        matches: List[EntityMatch] = []
+
+        for entryId in candidateIds or set():
+            entryField, value, entryTokens = self._entries[entryId]
+
+            if field and entryField != field:
+                continue
+
+            # Coverage of the mention decides the match; extra entry words ("Marketing")
+            # only lower the score a little, so partial names still resolve.
+
+            coverage = 0.0
+            for token, expansions in matchedTokens.items():
+                if token in entryTokens:
+                    coverage += 1
+                elif expansions & entryTokens:
+                    coverage += EXPANDED_TOKEN_WEIGHT
+            coverage /= len(mentionTokens)
+
+            precision = len({t for e in matchedTokens.values() for t in e} & entryTokens) / len(entryTokens)
+            score = coverage * (1 - ENTRY_PRECISION_WEIGHT + ENTRY_PRECISION_WEIGHT * min(1.0, precision))
+
+            if score >= MIN_SCORE:
+                matches.append(EntityMatch(field=entryField, mention=mention, value=value, score=round(score, 3)))
+
+        matches.sort(key=lambda m: (-m.score, m.value))
+
+        return matches[:limit]
+
+    def resolve(self, text: str, limit: int = 5) -> List[EntityMatch]:
+        """
+        Find entity mentions in free text and resolve them to canonical values.
+
+        Args:
+            text: User question (normalized query)
+            limit: Maximum number of distinct mentions to return
+
+        Returns:
+            List of matches, best first, with non-overlapping mentions
+        """
+        words = text.split()
+        cleaned = [" ".join(_tokenize(w)) for w in words]
+        spans: List[Tuple[float, int, int, List[EntityMatch]]] = []
+
+        for start in range(len(words)):
+            if not cleaned[start] or cleaned[start] in QUERY_STOPWORDS:
+                continue
+
+            for end in range(start + 1, min(start + MAX_MENTION_WORDS, len(words)) + 1):
+                if not cleaned[end - 1] or cleaned[end - 1] in QUERY_STOPWORDS:
+                    continue
+
+                mention = " ".join(words[start:end]).strip(" ,.?!;:'\"")
+                found = self.lookup(mention)
+
+                if found:
+                    spans.append((found[0].score, end - start, start, found))
+
+        # Prefer confident, longer mentions; drop anything overlapping them.
+
+        spans.sort(key=lambda s: (-s[0], -s[1], s[2]))
+        taken: Set[int] = set()
+        resolved: List[EntityMatch] = []
+
+        for _, length, start, found in spans:
+            positions = set(range(start, start + length))
+            if positions & taken:
+                continue
+
+            taken |= positions
+            resolved.extend(found)
+
+            if len({m.mention for m in resolved}) >= limit:
+                break
+
+        return resolved
+
+
+_entityIndex: Optional[EntityIndex] = None
+
+_entityIndexLock = Lock()
+
+_buildLock = Lock()
+
+_entityIndexStats: Dict[str, Any] = {}
+
+_failures = 0
+
+_nextAttemptAt = 0.0
+
+
+def buildEntityIndex() -> EntityIndex:
+    """Build the index from distinct values in the procurement collection."""
+    global _entityIndex, _failures, _nextAttemptAt
+
+    startedAt = time.perf_counter()
+    collection = getCollection()
+
+    values = {field: collection.distinct(field) for field in ENTITY_FIELDS}
+
+    index = EntityIndex(values)
+
+    with _entityIndexLock:
+        _entityIndex = index
+        _failures = 0
+        _nextAttemptAt = 0.0
+        _entityIndexStats.update(
+            {
+                "entries": len(index),
+                "buildSeconds": round(time.perf_counter() - startedAt, 3),
+                "builtAt": time.time(),
+                "failures": 0,
+                "lastError": None,
+            }
+        )
+
+    return index
+
+
+def refreshEntityIndex() -> EntityIndex:
+    """
+    Rebuild the index now (blocking), e.g. after an ingest.
+
+    On failure the previous index stays in use, the next background attempt
+    is backed off exponentially and the error is re-raised.
+    """
+    global _failures, _nextAttemptAt
+
+    with _buildLock:
+        try:
+            return buildEntityIndex()
+        except Exception as e:
+            with _entityIndexLock:
+                _failures += 1
+                delay = min(settings.entityIndexRetrySeconds * 2 ** (_failures - 1), MAX_RETRY_SECONDS)
+                _nextAttemptAt = time.time() + delay
+                _entityIndexStats.update({"failures": _failures, "lastError": f"{type(e).__name__}: {e}"})
+            raise
+
+
+def _refreshInBackground() -> None:
+    try:
+        refreshEntityIndex()
+    except Exception:
+        logger.warning("Entity index rebuild failed", exc_info=True)
+
+
+def getEntityIndex() -> Optional[EntityIndex]:
+    """
+    Current index, or None before the first successful build.
+
+    Never builds in the caller: warmup builds it, and a missing or stale
+    index (ENTITY_INDEX_REFRESH_SECONDS) is rebuilt on a background thread,
+    at most once per retry interval.
+    """
+    global _nextAttemptAt
+
+    now = time.time()
+
+    with _entityIndexLock:
+        index = _entityIndex
+        stale = index is None or (
+            settings.entityIndexRefreshSeconds > 0
+            and now - _entityIndexStats.get("builtAt", 0) >= settings.entityIndexRefreshSeconds
+        )
+        due = stale and now >= _nextAttemptAt and not _buildLock.locked()
+
+        if due:
+            _nextAttemptAt = now + settings.entityIndexRetrySeconds
+
+    if due:
+        Thread(target=_refreshInBackground, name="entity-index-refresh", daemon=True).start()
+
+    return index
+
+
+def resolveEntities(text: str) -> List[EntityMatch]:
+    """Resolve entity mentions in a question; returns [] if the index is unavailable."""
+    if not settings.entityResolutionEnabled:
+        return []
+
+    index = getEntityIndex()
+
+    if index is None:
+        return []
+
+    try:
+        return index.resolve(text)
+    except Exception:
+        return []
+
+
+def getEntityIndexStats() -> Dict[str, Any]:
+    with _entityIndexLock:
+        return dict(_entityIndexStats)
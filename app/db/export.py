@@ -0,0 +1,179 @@
+"""
+Streaming export of full aggregation results.
+
+Rows go from MongoDB raw batches straight to NDJSON or CSV chunks, so
+memory stays at one cursor batch regardless of result size.
+"""
+
+import csv
+import io
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import zstandard
+from bson import decode_all
+
+from app.core.config import settings
+from app.core.metrics import exportRows
+from app.db.mongo import RESULT_CODEC_OPTIONS, getCollection
+from app.utils.serialization import dumpsJson
+
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+
+# Stages that keep the order a $sort produced, so a later $limit is still a "top N".
+ORDER_PRESERVING_STAGES = {"$match", "$project", "$addFields", "$set", "$unset", "$skip", "$replaceRoot", "$replaceWith"}
+
+# Flush encoded rows to the client in chunks of roughly this size.
+CHUNK_BYTES = 64 * 1024
+
+
+def stripRowLimits(pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Drop the $limit stages that only keep the LLM view small.
+
+    A $limit after a $sort (with only order-preserving stages in between)
+    is a "top N" the user asked for and stays, whatever its value: a
+    "top 30" looks the same as the builder's default cap for records.
+    """
+    stripped: List[Dict[str, Any]] = []
+    ordered = False
+
+    for stage in pipeline:
+        name = next(iter(stage), None)
+
+        if name == "$limit":
+            if not ordered:
+                continue
+        elif name == "$sort":
+            ordered = True
+        elif name not in ORDER_PRESERVING_STAGES:
+            ordered = False
+
+        stripped.append(stage)
+
+    return stripped
+
+
+def openExportCursor(pipeline: List[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Start the aggregation and return an iterator of decoded row batches.
+
+    The aggregate command runs here, so connection and pipeline errors
+    surface before the response starts streaming.
+    """
+    cursor = getCollection().aggregate_raw_batches(
+        pipeline,
+        allowDiskUse=True,
+        batchSize=settings.exportBatchSize,
+        maxTimeMS=settings.exportMaxTimeMs,
+    )
+
+    def batches() -> Iterator[List[Dict[str, Any]]]:
+        with cursor:
+            for batch in cursor:
+                yield decode_all(batch, RESULT_CODEC_OPTIONS)
+
+    return batches()
+
+
+def _columnNames(columns: List[Dict[str, Any]], firstRow: Dict[str, Any]) -> List[str]:
+    names = [column["name"] for column in columns if column.get("name")]
+    return names or list(firstRow)
+
+
+def encodeNdjson(batches: Iterable[List[Dict[str, Any]]], columns: List[Dict[str, Any]]) -> Iterator[bytes]:
+    buffer = bytearray()
+
+    for rows in batches:
+        for row in rows:
+            buffer += dumpsJson(row)
+            buffer += b"\n"
+
+        exportRows.inc(len(rows), format="ndjson")
+
+        if len(buffer) >= CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+
+    if buffer:
+        yield bytes(buffer)
+
+
+def _csvValue(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return dumpsJson(value).decode()
+    if isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+def encodeCsv(batches: Iterable[List[Dict[str, Any]]], columns: List[Dict[str, Any]]) -> Iterator[bytes]:
+    """CSV with columns in the declared order; undeclared fields are left out."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    names: Optional[List[str]] = None
+
+    for rows in batches:
+        if not rows:
+            continue
+
+        if names is None:
+            names = _columnNames(columns, rows[0])
+            writer.writerow(names)
+
+        for row in rows:
+            writer.writerow([_csvValue(row.get(name)) for name in names])
+
+        exportRows.inc(len(rows), format="csv")
+
+        if output.tell() >= CHUNK_BYTES:
+            yield output.getvalue().encode("utf-8")
+            output.seek(0)
+            output.truncate()
+
+    if names is None and columns:
+        writer.writerow(_columnNames(columns, {}))
+
+    if output.tell():
+        yield output.getvalue().encode("utf-8")
+
+
+ENCODERS: Dict[str, Callable[[Iterable[List[Dict[str, Any]]], List[Dict[str, Any]]], Iterator[bytes]]] = {
+    "ndjson": encodeNdjson,
+    "csv": encodeCsv,
+}
+
+
+def compressZstd(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress a chunk stream as one zstd frame, flushing a block per chunk so the client sees progress."""
+    compressor = zstandard.ZstdCompressor(level=settings.exportZstdLevel).compressobj()
+
+    for chunk in chunks:
+        compressed = compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
+
+
+def exportRowsStream(
+    pipeline: List[Dict[str, Any]],
+    columns: List[Dict[str, Any]],
+    exportFormat: str,
+    compress: bool = False,
+) -> Iterator[bytes]:
+    """
+    Run a pipeline and return the encoded (optionally zstd-compressed) byte stream.
+    """
+    chunks = ENCODERS[exportFormat](openExportCursor(pipeline), columns)
+
+    return compressZstd(chunks) if compress else chunks
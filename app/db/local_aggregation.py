@@ -0,0 +1,490 @@
+"""In-process evaluation of simple aggregation pipelines over cached result rows."""
+
+import copy
+import re
+from datetime import datetime
+from functools import cmp_to_key
+from typing import Any, Callable, Dict, List, Optional
+
+
+class UnsupportedPipelineError(ValueError):
+    """Raised when a pipeline uses stages or operators the local evaluator cannot run."""
+
+
+_MISSING = object()
+
+
+def _getPath(doc: Any, path: str) -> Any:
+    value = doc
+
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return _MISSING
+
+    return value
+
+
+def _setPath(doc: Dict[str, Any], path: str, value: Any) -> None:
+    parts = path.split(".")
+    target = doc
+
+    for part in parts[:-1]:
+        target = target.setdefault(part, {})
+
+    target[parts[-1]] = value
+
+
+def _typeRank(value: Any) -> int:
+    # Mirrors MongoDB's BSON comparison order for the types found in results.
+    if value is None or value is _MISSING:
+        return 0
+    if isinstance(value, bool):
+        return 5
+    if isinstance(value, (int, float)):
+        return 1
+    if isinstance(value, str):
+        return 2
+    if isinstance(value, dict):
+        return 3
+    if isinstance(value, list):
+        return 4
+    if isinstance(value, datetime):
+        return 6
+    return 7
+
+
+def _typeAliases(value: Any) -> List[str]:
+    """$type aliases a value matches."""
+    if value is None:
+        return ["null"]
+    if isinstance(value, bool):
+        return ["bool"]
+    if isinstance(value, int):
+        return ["int", "long", "number"]
+    if isinstance(value, float):
+        return ["double", "number"]
+    if isinstance(value, str):
+        return ["string"]
+    if isinstance(value, dict):
+        return ["object"]
+    if isinstance(value, list):
+        return ["array"]
+    if isinstance(value, datetime):
+        return ["date"]
+    return []
+
+
+def _compare(a: Any, b: Any) -> int:
+    rankA, rankB = _typeRank(a), _typeRank(b)
+
+    if rankA != rankB:
+        return -1 if rankA < rankB else 1
+    if rankA == 0:
+        return 0
+
+    try:
+        return (a > b) - (a < b)
+    except TypeError:
+        return (str(a) > str(b)) - (str(a) < str(b))
+
+
+def evaluateExpression(expr: Any, doc: Dict[str, Any]) -> Any:
+    """Evaluate an aggregation expression (field paths, literals, basic arithmetic)."""
+    if isinstance(expr, str):
+        if expr.startswith("$$"):
+            raise UnsupportedPipelineError(f"Variables are not supported locally: {expr}")
+        if expr.startswith("$"):
+            value = _getPath(doc, expr[1:])
+            return None if value is _MISSING else value
+        return expr
+
+    if isinstance(expr, list):
+        return [evaluateExpression(item, doc) for item in expr]
+
+    if not isinstance(expr, dict):
+        return expr
+
+    if len(expr) == 1:
+        operator, args = next(iter(expr.items()))
+
+        if operator.startswith("$"):
+            return _evaluateOperator(operator, args, doc)
+
+    return {key: evaluateExpression(value, doc) for key, value in expr.items()}
+
+
+def _operatorArgs(args: Any, doc: Dict[str, Any]) -> List[Any]:
+    return evaluateExpression(args if isinstance(args, list) else [args], doc)
+
+
+_COMPARISONS = {
+    "$eq": lambda c: c == 0,
+    "$ne": lambda c: c != 0,
+    "$gt": lambda c: c > 0,
+    "$gte": lambda c: c >= 0,
+    "$lt": lambda c: c < 0,
+    "$lte": lambda c: c <= 0,
+}
+
+_DATE_PARTS = {"$year": "year", "$month": "month", "$dayOfMonth": "day"}
+
+
+def _evaluateOperator(operator: str, args: Any, doc: Dict[str, Any]) -> Any:
+    if operator == "$literal":
+        return args
+
+    # Only the chosen branch is evaluated (e.g. a guarded $divide).
+
+    if operator == "$cond":
+        branches = [args.get("if"), args.get("then"), args.get("else")] if isinstance(args, dict) else args
+        if not isinstance(branches, list) or len(branches) != 3:
+            raise UnsupportedPipelineError("$cond requires if, then and else")
+        condition = evaluateExpression(branches[0], doc)
+        truthy = condition not in (None, False, 0)
+        return evaluateExpression(branches[1] if truthy else branches[2], doc)
+
+    if operator in _DATE_PARTS:
+        if isinstance(args, dict) and set(args) != {"date"}:
+            raise UnsupportedPipelineError(f"{operator} with a timezone is not supported locally")
+        value = evaluateExpression(args["date"] if isinstance(args, dict) else args, doc)
+        return getattr(value, _DATE_PARTS[operator]) if isinstance(value, datetime) else None
+
+    values = _operatorArgs(args, doc)
+
+    if operator in _COMPARISONS:
+        if len(values) != 2:
+            raise UnsupportedPipelineError(f"{operator} requires exactly 2 arguments")
+        return _COMPARISONS[operator](_compare(values[0], values[1]))
+
+    if operator in ("$add", "$multiply"):
+        if any(v is None for v in values):
+            return None
+        result = 0 if operator == "$add" else 1
+        for v in values:
+            result = result + v if operator == "$add" else result * v
+        return result
+
+    if operator in ("$subtract", "$divide"):
+        if len(values) != 2:
+            raise UnsupportedPipelineError(f"{operator} requires exactly 2 arguments")
+        left, right = values
+        if left is None or right is None:
+            return None
+        if operator == "$subtract":
+            return left - right
+        if right == 0:
+            raise UnsupportedPipelineError("Division by zero")
+        return left / right
+
+    if operator == "$round":
+        number = values[0]
+        places = values[1] if len(values) > 1 else 0
+        return None if number is None else round(number, places)
+
+    if operator in ("$toLower", "$toUpper"):
+        text = values[0]
+        if text is None:
+            return ""
+        return str(text).lower() if operator == "$toLower" else str(text).upper()
+
+    if operator == "$concat":
+        if any(v is None for v in values):
+            return None
+        return "".join(str(v) for v in values)
+
+    if operator == "$ifNull":
+        for v in values:
+            if v is not None:
+                return v
+        return None
+
+    raise UnsupportedPipelineError(f"Operator {operator} is not supported locally")
+
+
+def _matchesCondition(value: Any, condition: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        options = condition.get("$options", "")
+
+        for operator, operand in condition.items():
+            if operator == "$options":
+                continue
+            if not _matchesOperator(value, operator, operand, options):
+                return False
+
+        return True
+
+    if hasattr(condition, "pattern"):
+        return _matchesOperator(value, "$regex", condition, "")
+
+    if isinstance(value, list) and not isinstance(condition, list):
+        return any(_compare(item, condition) == 0 for item in value)
+
+    return _compare(None if value is _MISSING else value, condition) == 0
+
+
+def _matchesOperator(value: Any, operator: str, operand: Any, options: str) -> bool:
+    present = None if value is _MISSING else value
+
+    if operator == "$eq":
+        return _compare(present, operand) == 0
+    if operator == "$ne":
+        return _compare(present, operand) != 0
+    if operator in ("$gt", "$gte", "$lt", "$lte"):
+        if present is None or _typeRank(present) != _typeRank(operand):
+            return False
+        result = _compare(present, operand)
+        return {"$gt": result > 0, "$gte": result >= 0, "$lt": result < 0, "$lte": result <= 0}[operator]
+    if operator == "$in":
+        return any(_matchesCondition(value, item) for item in operand)
+    if operator == "$nin":
+        return not any(_matchesCondition(value, item) for item in operand)
+    if operator == "$type":
+        if value is _MISSING:
+            return False
+        aliases = operand if isinstance(operand, list) else [operand]
+        return bool(set(aliases) & set(_typeAliases(value)))
+    if operator == "$exists":
+        return (value is not _MISSING) == bool(operand)
+    if operator == "$regex":
+        if not isinstance(present, str):
+            return False
+        pattern = getattr(operand, "pattern", operand)
+        flags = re.IGNORECASE if "i" in options or "i" in str(getattr(operand, "flags", "")) else 0
+        return re.search(pattern, present, flags) is not None
+    if operator == "$not":
+        return not _matchesCondition(value, operand)
+
+    raise UnsupportedPipelineError(f"Query operator {operator} is not supported locally")
+
+
+def matchesFilter(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    """Evaluate a $match query document against a single row."""
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matchesFilter(doc, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matchesFilter(doc, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(matchesFilter(doc, sub) for sub in condition):
+                return False
+        elif key.startswith("$"):
+            raise UnsupportedPipelineError(f"Query operator {key} is not supported locally")
+        elif not _matchesCondition(_getPath(doc, key), condition):
+            return False
+
+    return True
+
+
+def _accumulate(operator: str, operand: Any, docs: List[Dict[str, Any]]) -> Any:
+    values = [evaluateExpression(operand, doc) for doc in docs]
+
+    if operator == "$sum":
+        return sum(v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool))
+    if operator == "$avg":
+        numbers = [v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+        return sum(numbers) / len(numbers) if numbers else None
+    if operator in ("$min", "$max"):
+        present = [v for v in values if v is not None]
+        if not present:
+            return None
+        ordered = sorted(present, key=cmp_to_key(_compare))
+        return ordered[0] if operator == "$min" else ordered[-1]
+    if operator == "$first":
+        return values[0] if values else None
+    if operator == "$last":
+        return values[-1] if values else None
+    if operator == "$push":
+        return values
+    if operator == "$addToSet":
+        unique: List[Any] = []
+        for v in values:
+            if v not in unique:
+                unique.append(v)
+        return unique
+    if operator == "$count":
+        return len(docs)
+
+    raise UnsupportedPipelineError(f"Accumulator {operator} is not supported locally")
+
+
+def _groupKey(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple((k, _groupKey(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_groupKey(v) for v in value)
+    return value
+
+
+def _stageGroup(rows: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    groups: Dict[Any, List[Dict[str, Any]]] = {}
+    keys: Dict[Any, Any] = {}
+
+    for row in rows:
+        keyValue = evaluateExpression(spec.get("_id"), row)
+        key = _groupKey(keyValue)
+        if key not in groups:
+            groups[key] = []
+            keys[key] = keyValue
+        groups[key].append(row)
+
+    output = []
+
+    for key, members in groups.items():
+        out: Dict[str, Any] = {"_id": keys[key]}
+
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            if not isinstance(accumulator, dict) or len(accumulator) != 1:
+                raise UnsupportedPipelineError(f"Invalid accumulator for {field}")
+            operator, operand = next(iter(accumulator.items()))
+            out[field] = _accumulate(operator, operand, members)
+
+        output.append(out)
+
+    return output
+
+
+def _stageSort(rows: List[Dict[str, Any]], spec: Dict[str, int]) -> List[Dict[str, Any]]:
+    def compareRows(a: Dict[str, Any], b: Dict[str, Any]) -> int:
+        for field, direction in spec.items():
+            result = _compare(_getPath(a, field), _getPath(b, field))
+            if result:
+                return result if direction >= 0 else -result
+        return 0
+
+    return sorted(rows, key=cmp_to_key(compareRows))
+
+
+def _isInclusion(value: Any) -> bool:
+    return value is True or (isinstance(value, (int, float)) and not isinstance(value, bool) and value != 0)
+
+
+def _stageProject(rows: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    exclusions = [field for field, value in spec.items() if value in (0, False)]
+    computed = {field: value for field, value in spec.items() if field not in exclusions}
+
+    if exclusions and any(field != "_id" for field in exclusions) and computed:
+        raise UnsupportedPipelineError("Cannot mix inclusion and exclusion in $project")
+
+    output = []
+
+    for row in rows:
+        if computed:
+            out: Dict[str, Any] = {}
+            if "_id" not in exclusions and "_id" in row and "_id" not in computed:
+                out["_id"] = row["_id"]
+            for field, value in computed.items():
+                if _isInclusion(value):
+                    current = _getPath(row, field)
+                    if current is not _MISSING:
+                        _setPath(out, field, current)
+                else:
+                    _setPath(out, field, evaluateExpression(value, row))
+        else:
+            out = copy.deepcopy(row)
+            for field in exclusions:
+                parts = field.split(".")
+                target = out
+                for part in parts[:-1]:
+                    target = target.get(part, {}) if isinstance(target, dict) else {}
+                if isinstance(target, dict):
+                    target.pop(parts[-1], None)
+        output.append(out)
+
+    return output
+
+
+def _stageAddFields(rows: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    output = []
+
+    for row in rows:
+        out = copy.deepcopy(row)
+        for field, value in spec.items():
+            _setPath(out, field, evaluateExpression(value, row))
+        output.append(out)
+
+    return output
+
+
+def _stageUnwind(rows: List[Dict[str, Any]], spec: Any) -> List[Dict[str, Any]]:
+    path = spec if isinstance(spec, str) else spec.get("path", "")
+    preserve = isinstance(spec, dict) and spec.get("preserveNullAndEmptyArrays", False)
+    field = path.lstrip("$")
+    output = []
+
+    for row in rows:
+        value = _getPath(row, field)
+        if isinstance(value, list) and value:
+            for item in value:
+                out = copy.deepcopy(row)
+                _setPath(out, field, item)
+                output.append(out)
+        elif isinstance(value, list) or value is _MISSING or value is None:
+            if preserve:
+                output.append(copy.deepcopy(row))
+        else:
+            output.append(copy.deepcopy(row))
+
+    return output
+
+
+_STAGES: Dict[str, Callable[[List[Dict[str, Any]], Any], List[Dict[str, Any]]]] = {
+    "$match": lambda rows, spec: [row for row in rows if matchesFilter(row, spec)],
+    "$group": _stageGroup,
+    "$sort": _stageSort,
+    "$limit": lambda rows, spec: rows[: int(spec)],
+    "$skip": lambda rows, spec: rows[int(spec):],
+    "$project": _stageProject,
+    "$addFields": _stageAddFields,
+    "$set": _stageAddFields,
+    "$unset": lambda rows, spec: _stageProject(rows, {f: 0 for f in ([spec] if isinstance(spec, str) else spec)}),
+    "$unwind": _stageUnwind,
+    "$count": lambda rows, spec: [{spec: len(rows)}] if rows else [],
+}
+
+
+def runLocalAggregation(
+    rows: List[Dict[str, Any]],
+    pipeline: List[Dict[str, Any]],
+    maxRows: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run an aggregation pipeline against in-memory rows.
+
+    Only the common reshaping stages are supported ($match, $group, $sort,
+    $limit, $skip, $project, $addFields/$set, $unset, $unwind, $count).
+
+    Args:
+        rows: Input documents (left untouched)
+        pipeline: Aggregation pipeline to apply
+        maxRows: Optional cap on the number of rows returned
+
+    Returns:
+        Result documents
+
+    Raises:
+        UnsupportedPipelineError: If the pipeline uses anything not supported locally
+    """
+    current = rows
+
+    for idx, stage in enumerate(pipeline):
+        if not isinstance(stage, dict) or len(stage) != 1:
+            raise UnsupportedPipelineError(f"Stage {idx} must contain exactly one operator")
+
+        operator, spec = next(iter(stage.items()))
+        handler = _STAGES.get(operator)
+
+        if handler is None:
+            raise UnsupportedPipelineError(f"Stage {idx} ({operator}) is not supported locally")
+
+        current = handler(current, spec)
+
+    if current is rows:
+        current = list(rows)
+
+    return current[:maxRows] if maxRows is not None else current
@@ -1,11 +1,147 @@
+import xxhash
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
 from pymongo import MongoClient
-from typing import Any, Dict, List, Optional
+from pymongo.errors import ExecutionTimeout
+from pymongo.monitoring import ConnectionPoolListener
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
+from bson import decode_all
+from bson.codec_options import CodecOptions
+from typing import Any, Dict, Iterator, List, Optional
 
 from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, deadlineExpired, timeoutFor
+from app.core.metrics import (
+    aggregationDuration,
+    aggregationRows,
+    cacheEvents,
+    deadlineExceeded,
+    mongoPoolCheckoutWait,
+    mongoPoolEvents,
+)
+from app.core.tracing import startSpan
+from app.db.time_buckets import TimeBucketRewriter, parseDateFilters, parseDimensions
+from app.utils.serialization import dumpsJson
+
+
+# Same decoding as a regular cursor (plain dicts, naive datetimes).
+RESULT_CODEC_OPTIONS = CodecOptions(document_class=dict, tz_aware=False)
 
 
 _mongoClient: Optional[MongoClient] = None
 
+_mongoIngestClient: Optional[MongoClient] = None
+
+# Results shared by every question of one batch, keyed by pipeline hash and columns.
+_sharedResults: ContextVar[Optional[Dict[str, List[Dict[str, Any]]]]] = ContextVar("sharedResults", default=None)
+
+
+class PoolMetricsListener(ConnectionPoolListener):
+    """Tracks open and checked-out connections and checkout waits for one client."""
+
+    def __init__(self, clientName: str):
+        self.clientName = clientName
+        self._lock = Lock()
+        self._open = 0
+        self._checkedOut = 0
+
+    def _event(self, event: str) -> None:
+        mongoPoolEvents.inc(client=self.clientName, event=event)
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        self._event("cleared")
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self._open += 1
+        self._event("created")
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self._open = max(0, self._open - 1)
+        self._event("closed")
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        if event.duration is not None:
+            mongoPoolCheckoutWait.observe(event.duration, client=self.clientName)
+        self._event(f"checkoutFailed:{event.reason}")
+
+    def connection_checked_out(self, event) -> None:
+        with self._lock:
+            self._checkedOut += 1
+        if event.duration is not None:
+            mongoPoolCheckoutWait.observe(event.duration, client=self.clientName)
+
+    def connection_checked_in(self, event) -> None:
+        with self._lock:
+            self._checkedOut = max(0, self._checkedOut - 1)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"open": self._open, "checkedOut": self._checkedOut}
+
+
+poolListeners = {
+    "serving": PoolMetricsListener("serving"),
+    "ingest": PoolMetricsListener("ingest"),
+}
+
+
+def _compressorAvailable(name: str) -> bool:
+    # pymongo 4.16 does zstd through backports.zstd (compression.zstd on 3.14+), not zstandard.
+
+    modules = {"zstd": ["backports.zstd", "compression.zstd"], "snappy": ["snappy"], "zlib": ["zlib"]}
+
+    for module in modules.get(name, []):
+        try:
+            __import__(module)
+            return True
+        except ImportError:
+            continue
+
+    return False
+
+
+def mongoClientOptions(clientName: str = "serving") -> Dict[str, Any]:
+    """
+    MongoClient keyword arguments for a connection profile.
+
+    Args:
+        clientName: "serving" (API requests) or "ingest" (bulk loads)
+    """
+    requested = [c.strip() for c in settings.mongoCompressors.split(",") if c.strip()]
+    compressors = [c for c in requested if _compressorAvailable(c)]
+
+    options: Dict[str, Any] = {
+        "appname": f"{settings.mongoAppName}-{clientName}",
+        "maxPoolSize": settings.mongoIngestMaxPoolSize if clientName == "ingest" else settings.mongoMaxPoolSize,
+        "minPoolSize": 0 if clientName == "ingest" else settings.mongoMinPoolSize,
+        "maxIdleTimeMS": settings.mongoMaxIdleTimeMs or None,
+        "waitQueueTimeoutMS": settings.mongoWaitQueueTimeoutMs or None,
+        "event_listeners": [poolListeners[clientName]],
+    }
+
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+
+    return options
+
 
 def getMongoClient() -> MongoClient:
     global _mongoClient
@@ -13,29 +149,216 @@ def getMongoClient() -> MongoClient:
     # Important: create one client and reuse it (connection pooling).
     
     if not _mongoClient:
-        _mongoClient = MongoClient(settings.mongodbUri)
+        _mongoClient = MongoClient(settings.mongodbUri, **mongoClientOptions("serving"))
 
     return _mongoClient
 
 
-def getCollection():
+def getMongoIngestClient() -> MongoClient:
+    """Client for bulk loads, with its own small pool so ingest can't exhaust the serving pool."""
+    global _mongoIngestClient
+
+    if not _mongoIngestClient:
+        uri = settings.mongoIngestUri or settings.mongodbUri
+        _mongoIngestClient = MongoClient(uri, **mongoClientOptions("ingest"))
+
+    return _mongoIngestClient
+
+
+def analyticsReadPreference():
+    """Read preference for procurement queries (e.g. secondaryPreferred to keep analytics off the primary)."""
+    mode = read_pref_mode_from_name(settings.mongoAnalyticsReadPreference)
+
+    if mode == 0:
+        return make_read_preference(mode, None)
+
+    return make_read_preference(mode, None, max_staleness=settings.mongoMaxStalenessSeconds)
+
+
+def mongoPoolStats() -> Dict[str, Dict[str, int]]:
+    return {name: listener.stats() for name, listener in poolListeners.items()}
+
+
+def getCollection(name: Optional[str] = None):
     client = getMongoClient()
 
     db = client[settings.mongodbDb]
 
-    collection = db[settings.mongodbCollection]
+    collection = db.get_collection(name or settings.mongodbCollection, read_preference=analyticsReadPreference())
 
     return collection
 
 
-def runAggregation(pipeline: List[Dict[str, Any]], limit: int = 30) -> List[Dict[str, Any]]:
-    collection = getCollection()
+_timeBucketRewriter: Optional[TimeBucketRewriter] = None
+
+
+def timeBucketRewrite(pipeline: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    """The pipeline rewritten for the time-bucket collection, or None (disabled or not answerable from buckets)."""
+    global _timeBucketRewriter
+
+    if not settings.timeBucketCollection:
+        return None
+
+    if _timeBucketRewriter is None:
+        _timeBucketRewriter = TimeBucketRewriter(
+            settings.timeBucketGrain,
+            parseDimensions(settings.timeBucketDimensions),
+        )
+
+    return _timeBucketRewriter.rewrite(pipeline)
+
+
+def pipelineHash(pipeline: List[Dict[str, Any]]) -> str:
+    """Stable short id for a pipeline (stage and key order are significant)."""
+    return xxhash.xxh3_64_hexdigest(dumpsJson(pipeline))
+
+
+def buildColumnProjection(pipeline: List[Dict[str, Any]], columns: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Build a final $project keeping only the declared columns.
+
+    Dotted columns ("_id.year") keep their whole top-level field, so nested
+    values survive. `_id` is kept when a $group produced it (it is the group
+    key) and dropped for raw documents unless declared.
+    """
+    fields = list(dict.fromkeys(c.split(".")[0] for c in columns if c and not c.startswith("$")))
+    fields = [field for field in fields if field]
+
+    if not fields:
+        return None
+
+    projection: Dict[str, Any] = {field: 1 for field in fields}
+
+    grouped = any("$group" in stage for stage in pipeline)
+
+    if "_id" not in projection and not grouped:
+        projection["_id"] = 0
+
+    return projection
+
+
+@contextmanager
+def sharedAggregationResults(results: Dict[str, List[Dict[str, Any]]]) -> Iterator[None]:
+    """
+    Reuse aggregation results across calls made inside this block.
+
+    Batch requests pass the same dict to every question, so questions the
+    builder turns into the same pipeline hit MongoDB once.
+    """
+    token = _sharedResults.set(results)
+    try:
+        yield
+    finally:
+        _sharedResults.reset(token)
+
+
+def runAggregation(
+    pipeline: List[Dict[str, Any]],
+    columns: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    shared = _sharedResults.get()
+
+    if shared is None:
+        return _runAggregation(pipeline, columns)
+
+    key = f"{pipelineHash(pipeline)}:{','.join(columns or [])}"
+
+    if key in shared:
+        cacheEvents.inc(cache="batch_results", result="hit")
+        return list(shared[key])
+
+    cacheEvents.inc(cache="batch_results", result="miss")
+    results = _runAggregation(pipeline, columns)
+    shared[key] = results
+
+    return list(results)
+
+
+def _runAggregation(pipeline: List[Dict[str, Any]], columns: Optional[List[str]]) -> List[Dict[str, Any]]:
+    with startSpan(
+        "aggregation",
+        pipelineHash=pipelineHash(pipeline),
+        stages=len(pipeline),
+        mode=settings.aggregationMode,
+    ) as span:
+        # Important: generated date bounds are JSON strings or {"$date": ...}; compare them as dates.
+
+        pipeline = parseDateFilters(pipeline)
+
+        # Time-grouped pipelines run on the pre-summed buckets when they give the same answer.
+
+        bucketPipeline = timeBucketRewrite(pipeline)
+
+        if settings.timeBucketCollection:
+            cacheEvents.inc(cache="time_buckets", result="miss" if bucketPipeline is None else "hit")
+            span.setAttributes(timeBuckets=bucketPipeline is not None)
+
+        with aggregationDuration.time():
+            if bucketPipeline is not None:
+                results = _aggregate(bucketPipeline, columns, settings.timeBucketCollection)
+            else:
+                results = _aggregate(pipeline, columns)
+
+        span.setAttributes(resultCount=len(results))
+
+    aggregationRows.observe(len(results))
+
+    return results
+
+
+def aggregationMaxTimeMs() -> int:
+    """Server-side time limit for the next aggregation, clamped to the request deadline."""
+    try:
+        seconds = timeoutFor(settings.mongoMaxTimeMs / 1000)
+    except DeadlineExceeded:
+        deadlineExceeded.inc(stage="aggregation")
+        raise
+
+    return max(1, int(seconds * 1000))
+
+
+def _aggregate(
+    pipeline: List[Dict[str, Any]],
+    columns: Optional[List[str]],
+    collectionName: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    try:
+        return _runCursor(pipeline, columns, aggregationMaxTimeMs(), collectionName)
+    except ExecutionTimeout as e:
+        if deadlineExpired():
+            deadlineExceeded.inc(stage="aggregation")
+            raise DeadlineExceeded("Request deadline exceeded during aggregation") from e
+        raise
+
+
+def _runCursor(
+    pipeline: List[Dict[str, Any]],
+    columns: Optional[List[str]],
+    maxTimeMs: int,
+    collectionName: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    collection = getCollection(collectionName)
+
+    # Pushdown mode: project only declared columns server-side and decode raw
+    # BSON batches in one pass instead of materializing every field per document.
+
+    if columns and settings.aggregationMode == "pushdown":
+        projection = buildColumnProjection(pipeline, columns)
+
+        if projection:
+            pushedPipeline = pipeline + [{"$project": projection}]
+
+            results: List[Dict[str, Any]] = []
+            for batch in collection.aggregate_raw_batches(pushedPipeline, allowDiskUse=True, maxTimeMS=maxTimeMs):
+                results.extend(decode_all(batch, RESULT_CODEC_OPTIONS))
+
+            return results
 
-    # Important: allowDiskUse helps when aggregations are heavy.
+    # Important: allowDiskUse helps when aggregations are heavy; maxTimeMS keeps them bounded.
     
-    results = list(collection.aggregate(pipeline, allowDiskUse=True))
+    results = list(collection.aggregate(pipeline, allowDiskUse=True, maxTimeMS=maxTimeMs))
 
     # Note: BSON types may appear depending on dataset (ObjectId, datetime).
-    # We'll handle JSON serialization later in utils if needed.
+    # They are handled by the response encoder (app.utils.serialization.dumpsJson).
 
     return results
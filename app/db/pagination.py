@@ -0,0 +1,397 @@
+"""
+Paging of large chat result sets.
+
+The chat response carries the first page, in the order MongoDB returned
+it, and an opaque continuation token (pipeline hash, offset, sort keys and
+the last row's key values). Later pages come from the cached result set
+while it is still held, otherwise from a keyset query: the pipeline plus a
+$sort on the same keys and a $match for rows after the last one, so no
+$skip is ever needed. Keyset queries are only possible when the pipeline's
+final $sort keys survive into the output; other result sets page from the
+cache only.
+"""
+
+import base64
+import binascii
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import Decimal128, ObjectId, json_util
+from bson.json_util import CANONICAL_JSON_OPTIONS
+
+from app.core.config import settings
+from app.core.metrics import cacheEvents
+from app.db.mongo import runAggregation
+
+
+SortSpec = List[Tuple[str, int]]
+
+TOKEN_VERSION = 1
+
+# MongoDB rejects $sort with more keys than this.
+MAX_SORT_KEYS = 32
+
+# Stages that can follow the final $sort without changing the order of its output.
+ORDER_PRESERVING_STAGES = {"$match", "$project", "$addFields", "$set", "$unset", "$skip", "$limit"}
+
+# $type aliases in MongoDB's cross-type sort order (null < numbers < strings < ... < dates).
+TYPE_BRACKETS = [
+    ["null"],
+    ["number"],
+    ["string"],
+    ["object"],
+    ["array"],
+    ["binData"],
+    ["objectId"],
+    ["bool"],
+    ["date"],
+    ["timestamp"],
+    ["regex"],
+]
+
+
+class InvalidPageToken(ValueError):
+    """Raised for tokens that can't be decoded."""
+
+
+class PageExpired(Exception):
+    """Raised when neither the cached rows nor the pipeline behind a token are available."""
+
+
+def _bsonOrder(value: Any) -> Tuple[int, Any]:
+    # MongoDB's cross-type sort order, so local sorting matches a server-side $sort.
+
+    if value is None:
+        return (1, 0)
+    if isinstance(value, bool):
+        return (8, value)
+    if isinstance(value, (int, float, Decimal)):
+        return (2, value)
+    if isinstance(value, Decimal128):
+        return (2, value.to_decimal())
+    if isinstance(value, str):
+        return (3, value)
+    if isinstance(value, ObjectId):
+        return (7, value)
+    if isinstance(value, datetime):
+        return (9, value)
+    return (4, str(value))
+
+
+def _typeBracket(value: Any) -> int:
+    """Index of the value's type in TYPE_BRACKETS."""
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 7
+    if isinstance(value, (int, float, Decimal, Decimal128)):
+        return 1
+    if isinstance(value, str):
+        return 2
+    if isinstance(value, ObjectId):
+        return 6
+    if isinstance(value, datetime):
+        return 8
+    return 3
+
+
+def _isKeyValue(value: Any) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool, datetime, ObjectId, Decimal128))
+
+
+def _redefines(stage: Dict[str, Any], field: str) -> bool:
+    spec = next(iter(stage.values()))
+
+    if not isinstance(spec, dict) or field not in spec:
+        return False
+
+    return spec[field] not in (1, True, f"${field}")
+
+
+def _finalSort(pipeline: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The last $sort, if its keys still order the pipeline's output."""
+    later: List[Dict[str, Any]] = []
+
+    for stage in reversed(pipeline):
+        if "$sort" in stage:
+            sort = stage["$sort"]
+            if any(_redefines(laterStage, field) for laterStage in later for field in sort):
+                return None
+            return sort
+
+        if not set(stage) <= ORDER_PRESERVING_STAGES:
+            return None
+
+        later.append(stage)
+
+    return None
+
+
+def keysetSortSpec(pipeline: List[Dict[str, Any]], firstRow: Dict[str, Any]) -> SortSpec:
+    """
+    Total order over result rows: the pipeline's final $sort keys, then every
+    other scalar output field as a tiebreaker.
+
+    Returns:
+        [(field, direction)], empty when the pipeline has no final $sort whose
+        keys all reach the output unchanged (keyset paging would then return
+        rows in a different order than the first page)
+    """
+    sort = _finalSort(pipeline)
+
+    if not sort or not all(field in firstRow and _isKeyValue(firstRow[field]) for field in sort):
+        return []
+
+    spec: SortSpec = [(field, -1 if direction == -1 else 1) for field, direction in sort.items()]
+    seen = {field for field, _ in spec}
+
+    for field, value in firstRow.items():
+        if field not in seen and _isKeyValue(value):
+            spec.append((field, 1))
+
+    return spec[:MAX_SORT_KEYS]
+
+
+def sortRows(rows: List[Dict[str, Any]], spec: SortSpec) -> List[Dict[str, Any]]:
+    """Stable multi-key sort in the same order MongoDB would produce for spec."""
+    ordered = list(rows)
+
+    for field, direction in reversed(spec):
+        ordered.sort(key=lambda row: _bsonOrder(row.get(field)), reverse=direction == -1)
+
+    return ordered
+
+
+def keysetPipeline(
+    pipeline: List[Dict[str, Any]],
+    spec: SortSpec,
+    lastKey: List[Any],
+    pageSize: int,
+) -> List[Dict[str, Any]]:
+    """Pipeline for the page after lastKey: sort by spec, keep rows strictly after it, limit."""
+    branches = []
+
+    for index, (field, direction) in enumerate(spec):
+        after = _afterCondition(field, direction, lastKey[index])
+
+        if after is None:
+            continue
+
+        # Equality on None also matches missing fields, which $sort orders as null.
+        branch: Dict[str, Any] = {prior: lastKey[i] for i, (prior, _) in enumerate(spec[:index])}
+        branches.append({"$and": [branch, after]} if branch else after)
+
+    return pipeline + [
+        {"$sort": {field: direction for field, direction in spec}},
+        {"$match": {"$or": branches}},
+        {"$limit": pageSize},
+    ]
+
+
+def _afterCondition(field: str, direction: int, value: Any) -> Optional[Dict[str, Any]]:
+    """
+    Rows whose field sorts strictly after value, or None when none can.
+
+    $gt/$lt only match values of the same type, so rows of the types MongoDB
+    sorts after (ascending) or before (descending) are matched with $type;
+    null and missing sort first.
+    """
+    bracket = _typeBracket(value)
+
+    if direction == 1:
+        if value is None:
+            return {field: {"$ne": None}}
+
+        laterTypes = [alias for aliases in TYPE_BRACKETS[bracket + 1:] for alias in aliases]
+
+        return {"$or": [{field: {"$gt": value}}, {field: {"$type": laterTypes}}]}
+
+    if value is None:
+        return None
+
+    conditions: List[Dict[str, Any]] = [{field: {"$lt": value}}, {field: None}]
+    earlierTypes = [alias for aliases in TYPE_BRACKETS[1:bracket] for alias in aliases]
+
+    if earlierTypes:
+        conditions.append({field: {"$type": earlierTypes}})
+
+    return {"$or": conditions}
+
+
+def encodePageToken(payload: Dict[str, Any]) -> str:
+    # Canonical extended JSON keeps dates, ObjectIds and decimals typed for the keyset $match.
+
+    raw = json_util.dumps({"v": TOKEN_VERSION, **payload}, json_options=CANONICAL_JSON_OPTIONS)
+
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodePageToken(token: str) -> Dict[str, Any]:
+    """
+    Raises:
+        InvalidPageToken: If the token is malformed or from another version
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json_util.loads(raw.decode("utf-8"))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidPageToken("Malformed page token") from e
+
+    if not isinstance(payload, dict) or payload.get("v") != TOKEN_VERSION:
+        raise InvalidPageToken("Unsupported page token")
+
+    spec = payload.get("s") or []
+    lastKey = payload.get("k")
+
+    if not isinstance(payload.get("h"), str) or not isinstance(payload.get("o"), int):
+        raise InvalidPageToken("Malformed page token")
+
+    if lastKey is not None and (len(lastKey) != len(spec) or not all(_isKeyValue(v) for v in lastKey)):
+        raise InvalidPageToken("Malformed page token")
+
+    payload["s"] = [(str(field), -1 if direction == -1 else 1) for field, direction in spec]
+
+    return payload
+
+
+class ResultSetCache:
+    """LRU of sorted result sets by pipeline hash, bounded by total rows held."""
+
+    def __init__(self, maxRows: int):
+        self.maxRows = maxRows
+        self._entries: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._rows = 0
+        self._lock = Lock()
+
+    def put(self, key: str, rows: List[Dict[str, Any]]) -> None:
+        if len(rows) > self.maxRows:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._rows -= len(previous)
+
+            self._entries[key] = rows
+            self._rows += len(rows)
+
+            while self._rows > self.maxRows:
+                _, evicted = self._entries.popitem(last=False)
+                self._rows -= len(evicted)
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            rows = self._entries.get(key)
+
+            if rows is not None:
+                self._entries.move_to_end(key)
+
+            return rows
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"resultSets": len(self._entries), "rows": self._rows, "maxRows": self.maxRows}
+
+
+resultSetCache = ResultSetCache(maxRows=settings.resultCacheMaxRows)
+
+
+def _pageInfo(
+    key: str,
+    spec: SortSpec,
+    rows: List[Dict[str, Any]],
+    offset: int,
+    totalRows: int,
+) -> Dict[str, Any]:
+    nextOffset = offset + len(rows)
+    nextToken = None
+
+    if nextOffset < totalRows and rows:
+        nextToken = encodePageToken({
+            "h": key,
+            "o": nextOffset,
+            "n": totalRows,
+            "s": [list(item) for item in spec],
+            "k": [rows[-1].get(field) for field, _ in spec] if spec else None,
+        })
+
+    return {"offset": offset, "size": len(rows), "totalRows": totalRows, "nextToken": nextToken}
+
+
+def firstPage(
+    key: str,
+    pipeline: List[Dict[str, Any]],
+    results: List[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Cut a result set down to its first page.
+
+    Returns:
+        (rows for the response, page info or None when everything fits on one page)
+    """
+    pageSize = settings.resultPageSize
+
+    if pageSize <= 0 or len(results) <= pageSize:
+        return results, None
+
+    spec = keysetSortSpec(pipeline, results[0])
+    ordered = results
+
+    # Important: the server's order is kept; with a usable spec only ties on the
+    # $sort keys are reordered (by the tiebreakers), which keyset pages rely on.
+
+    if spec:
+        ordered = sortRows(results, spec)
+        keys = {tuple(_bsonOrder(row.get(field)) for field, _ in spec) for row in ordered}
+
+        # Duplicate keys would make "strictly after the last row" skip rows.
+        if len(keys) < len(ordered):
+            spec = []
+
+    resultSetCache.put(key, ordered)
+
+    page = ordered[:pageSize]
+
+    return page, _pageInfo(key, spec, page, 0, len(ordered))
+
+
+def nextPage(
+    token: str,
+    pipeline: Optional[List[Dict[str, Any]]],
+    columns: Optional[List[str]] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Serve the page a continuation token points at.
+
+    Args:
+        token: Token from a previous page
+        pipeline: The registered pipeline for the token's hash, if still known
+        columns: Declared output columns, so keyset pages have the same shape as the first
+
+    Raises:
+        InvalidPageToken: If the token is malformed
+        PageExpired: If the rows are no longer cached and the pipeline is unknown
+    """
+    payload = decodePageToken(token)
+    key, offset, spec, lastKey = payload["h"], payload["o"], payload["s"], payload.get("k")
+    totalRows = int(payload.get("n") or 0)
+    pageSize = max(1, settings.resultPageSize)
+
+    cached = resultSetCache.get(key)
+
+    if cached is not None:
+        cacheEvents.inc(cache="result_pages", result="hit")
+        rows = cached[offset:offset + pageSize]
+        return rows, _pageInfo(key, spec, rows, offset, len(cached))
+
+    cacheEvents.inc(cache="result_pages", result="miss")
+
+    if pipeline is None or not spec or lastKey is None:
+        raise PageExpired("This result set has expired; ask the question again")
+
+    rows = runAggregation(keysetPipeline(pipeline, spec, lastKey, pageSize), columns=columns)
+
+    return rows, _pageInfo(key, spec, rows, offset, max(totalRows, offset + len(rows)))
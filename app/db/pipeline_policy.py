@@ -0,0 +1,368 @@
+"""
+Safety and resource policy for generated aggregation pipelines.
+
+Every pipeline the query builder produces is checked before it reaches
+MongoDB: stages must be on an allowlist, operators that write, join or run
+JavaScript are refused, $limit values are capped, and $group (or
+$sortByCount) stages whose estimated number of groups is too large must be
+followed by a $limit.
+Violations raise PipelinePolicyError with wording meant to be handed back
+to the query builder as refinement guidance.
+"""
+
+import math
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.metrics import pipelinePolicyEvents
+from app.db.mongo import getCollection
+from app.utils.field_catalog import loadFieldCatalog
+
+
+ALLOWED_STAGES = {
+    "$match", "$group", "$sort", "$limit", "$skip", "$project", "$addFields", "$set", "$unset",
+    "$unwind", "$count", "$sortByCount", "$bucket", "$bucketAuto", "$facet", "$replaceRoot",
+    "$replaceWith",
+}
+
+# Refused anywhere in a pipeline, including inside $facet and expressions.
+FORBIDDEN_OPERATORS = {
+    "$out": "writes to a collection",
+    "$merge": "writes to a collection",
+    "$lookup": "joins another collection; all data is in the one procurement collection",
+    "$graphLookup": "joins another collection; all data is in the one procurement collection",
+    "$unionWith": "reads another collection; all data is in the one procurement collection",
+    "$function": "runs server-side JavaScript; use aggregation expressions instead",
+    "$accumulator": "runs server-side JavaScript; use $sum, $avg, $min, $max or $push instead",
+    "$where": "runs server-side JavaScript; use $expr with aggregation operators instead",
+}
+
+# Stages after which field names no longer refer to raw document fields.
+RESHAPING_STAGES = {
+    "$group", "$sortByCount", "$count", "$project", "$unwind", "$replaceRoot", "$replaceWith", "$bucket",
+    "$bucketAuto", "$facet",
+}
+
+CardinalityEstimator = Callable[[str], Optional[int]]
+
+# (rule, actionable message)
+Violation = Tuple[str, str]
+
+
+class PipelinePolicyError(ValueError):
+    """A pipeline was refused; the message says how to fix it."""
+
+    def __init__(self, violations: List[str]):
+        super().__init__("Pipeline rejected by policy: " + " ".join(violations))
+        self.violations = violations
+
+
+def _collectOperators(value: Any, found: Set[str]) -> None:
+    if isinstance(value, dict):
+        for key, nested in value.items():
+            if isinstance(key, str) and key.startswith("$"):
+                found.add(key)
+            _collectOperators(nested, found)
+    elif isinstance(value, list):
+        for item in value:
+            _collectOperators(item, found)
+
+
+def _groupKeyFields(groupId: Any) -> List[str]:
+    """
+    Raw fields a $group key is built from, including those inside expressions.
+
+    An expression over a field ({"$year": "$creation_date"}) has at most as
+    many distinct values as the field itself, so the field's count bounds it.
+    """
+    fields: List[str] = []
+
+    def collect(value: Any) -> None:
+        if isinstance(value, str):
+            if value.startswith("$") and not value.startswith("$$") and value[1:] not in fields:
+                fields.append(value[1:])
+        elif isinstance(value, dict):
+            for key, nested in value.items():
+                if key != "$literal":
+                    collect(nested)
+        elif isinstance(value, list):
+            for item in value:
+                collect(item)
+
+    collect(groupId)
+
+    return fields
+
+
+class PipelinePolicy:
+    """
+    Checks and rewrites pipelines against the policy.
+
+    Group sizes are estimated from per-field distinct counts (catalog enums
+    or collection statistics) and the collection size, scaled down by
+    equality $match filters on fields with known cardinality.
+    """
+
+    def __init__(
+        self,
+        maxLimit: int,
+        maxGroups: int,
+        cardinality: CardinalityEstimator,
+        documentCount: Callable[[], Optional[int]],
+    ):
+        self.maxLimit = maxLimit
+        self.maxGroups = maxGroups
+        self.cardinality = cardinality
+        self.documentCount = documentCount
+
+    def enforce(
+        self,
+        pipeline: List[Dict[str, Any]],
+        capLimits: bool = True,
+        checkGroups: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        Validate a pipeline and return it with $limit values capped.
+
+        Args:
+            pipeline: Pipeline to check
+            capLimits: Clamp $limit to the configured maximum (off for exports)
+            checkGroups: Refuse unbounded high-cardinality $group stages (off for exports)
+
+        Raises:
+            PipelinePolicyError: With actionable refinement text
+        """
+        violations = self._stageViolations(pipeline)
+
+        if checkGroups and not violations:
+            violations.extend(self._groupViolations(pipeline))
+
+        if violations:
+            for rule, _ in violations:
+                pipelinePolicyEvents.inc(rule=rule, action="rejected")
+            raise PipelinePolicyError([message for _, message in violations])
+
+        return self._capLimits(pipeline) if capLimits else pipeline
+
+    def _stageViolations(self, pipeline: List[Dict[str, Any]]) -> List[Violation]:
+        violations: List[Violation] = []
+
+        for index, stage in enumerate(pipeline):
+            if not isinstance(stage, dict) or len(stage) != 1:
+                violations.append(("shape", f"Stage {index} must be an object with exactly one $-operator."))
+                continue
+
+            name, spec = next(iter(stage.items()))
+
+            operators: Set[str] = {name}
+            _collectOperators(spec, operators)
+
+            for operator in sorted(operators & set(FORBIDDEN_OPERATORS)):
+                violations.append(("forbidden", f"{operator} is not allowed: it {FORBIDDEN_OPERATORS[operator]}."))
+
+            if name in FORBIDDEN_OPERATORS:
+                continue
+
+            if name not in ALLOWED_STAGES:
+                violations.append(
+                    ("stage", f"{name} is not allowed; use only {', '.join(sorted(ALLOWED_STAGES))}.")
+                )
+            elif name == "$facet" and isinstance(spec, dict):
+                for branch in spec.values():
+                    if isinstance(branch, list):
+                        violations.extend(self._stageViolations(branch))
+
+        return violations
+
+    def _groupViolations(self, pipeline: List[Dict[str, Any]]) -> List[Violation]:
+        violations: List[Violation] = []
+        matchedFields: Dict[str, Any] = {}
+
+        for index, stage in enumerate(pipeline):
+            name, spec = next(iter(stage.items()))
+
+            if name == "$match" and isinstance(spec, dict):
+                matchedFields.update({
+                    field: value for field, value in spec.items()
+                    if not field.startswith("$") and not isinstance(value, dict)
+                })
+
+            # $sortByCount is a $group on its expression followed by a $sort.
+
+            groupId = spec.get("_id") if name == "$group" and isinstance(spec, dict) else spec
+
+            if name in ("$group", "$sortByCount"):
+                estimate = self._estimateGroups(groupId, matchedFields)
+                bounded = any("$limit" in later for later in pipeline[index + 1:])
+
+                if estimate is not None and estimate > self.maxGroups and not bounded:
+                    fields = ", ".join(_groupKeyFields(groupId))
+                    violations.append((
+                        "groups",
+                        f"Grouping by {fields} yields about {estimate:,} groups (limit {self.maxGroups:,}). "
+                        "Group by a coarser field, filter with $match first, or add $sort and $limit for a top N.",
+                    ))
+
+            if name in RESHAPING_STAGES:
+                break
+
+        return violations
+
+    def _estimateGroups(self, groupId: Any, matchedFields: Dict[str, Any]) -> Optional[int]:
+        fields = _groupKeyFields(groupId)
+
+        if not fields:
+            return None
+
+        estimate = 1
+        for field in fields:
+            distinct = self.cardinality(field)
+            if distinct is None:
+                return None
+            estimate *= distinct
+
+        documents = self.documentCount()
+
+        if documents is None:
+            return estimate
+
+        # Equality filters shrink the rows being grouped (uniform-distribution estimate).
+
+        selectivity = 1.0
+        for field in matchedFields:
+            distinct = self.cardinality(field)
+            if distinct:
+                selectivity /= distinct
+
+        return int(min(estimate, documents * selectivity))
+
+    def _capLimits(self, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        capped = []
+
+        for stage in pipeline:
+            limit = stage.get("$limit")
+
+            if isinstance(limit, (int, float)) and not isinstance(limit, bool) and limit > self.maxLimit:
+                pipelinePolicyEvents.inc(rule="limit", action="rewritten")
+                stage = {"$limit": self.maxLimit}
+
+            capped.append(stage)
+
+        return capped
+
+
+class CollectionCardinality:
+    """
+    Distinct-value counts per field: catalog enums when listed, otherwise an
+    estimate from a bounded $sample, cached for the process once it succeeds.
+    """
+
+    def __init__(self, timeoutMs: int, sampleSize: int):
+        self.timeoutMs = timeoutMs
+        self.sampleSize = sampleSize
+        self._distinct: Dict[str, Optional[int]] = {}
+        self._documents: Optional[int] = None
+        self._lock = Lock()
+
+    def distinct(self, field: str) -> Optional[int]:
+        with self._lock:
+            if field in self._distinct:
+                return self._distinct[field]
+
+        spec = loadFieldCatalog().get(field)
+
+        if not isinstance(spec, dict):
+            value = None
+        elif spec.get("enums"):
+            value = len(spec["enums"])
+        else:
+            value = self._estimateDistinct(field)
+
+            # Important: a failed or timed-out estimate is retried on the next call rather than
+            # cached, otherwise one slow moment would turn the group guard off for the field.
+
+            if value is None:
+                return None
+
+        with self._lock:
+            self._distinct[field] = value
+
+        return value
+
+    def _estimateDistinct(self, field: str) -> Optional[int]:
+        try:
+            cursor = getCollection().aggregate(
+                [
+                    {"$sample": {"size": self.sampleSize}},
+                    {"$group": {"_id": f"${field}", "n": {"$sum": 1}}},
+                    {"$group": {
+                        "_id": None,
+                        "rows": {"$sum": "$n"},
+                        "distinct": {"$sum": 1},
+                        "singletons": {"$sum": {"$cond": [{"$eq": ["$n", 1]}, 1, 0]}},
+                    }},
+                ],
+                maxTimeMS=self.timeoutMs,
+            )
+            docs = list(cursor)
+        except Exception:
+            return None
+
+        if not docs:
+            return 0
+
+        return estimateDistinct(docs[0]["rows"], docs[0]["distinct"], docs[0]["singletons"], self.documents())
+
+    def documents(self) -> Optional[int]:
+        if self._documents is None:
+            try:
+                self._documents = getCollection().estimated_document_count(maxTimeMS=self.timeoutMs)
+            except Exception:
+                return None
+
+        return self._documents
+
+
+def estimateDistinct(rows: int, distinct: int, singletons: int, documents: Optional[int]) -> int:
+    """
+    Scale a sample's distinct count up to the collection (GEE estimator).
+
+    Values seen more than once are assumed to be all there is of them; values
+    seen once stand for sqrt(documents / rows) values each. A sample that
+    covers the whole collection is exact.
+
+    Args:
+        rows: Sampled documents
+        distinct: Distinct values in the sample
+        singletons: Values that occurred exactly once in the sample
+        documents: Collection size, if known
+    """
+    if not documents or rows <= 0 or documents <= rows:
+        return distinct
+
+    estimate = (distinct - singletons) + singletons * math.sqrt(documents / rows)
+
+    return int(min(documents, round(estimate)))
+
+
+collectionCardinality = CollectionCardinality(
+    timeoutMs=settings.pipelineStatsTimeoutMs,
+    sampleSize=settings.pipelineStatsSampleSize,
+)
+
+pipelinePolicy = PipelinePolicy(
+    maxLimit=settings.pipelineMaxLimit,
+    maxGroups=settings.pipelineMaxGroups,
+    cardinality=collectionCardinality.distinct,
+    documentCount=collectionCardinality.documents,
+)
+
+
+def enforcePipelinePolicy(
+    pipeline: List[Dict[str, Any]],
+    capLimits: bool = True,
+    checkGroups: bool = True,
+) -> List[Dict[str, Any]]:
+    """Check a pipeline against the shared policy; see PipelinePolicy.enforce."""
+    return pipelinePolicy.enforce(pipeline, capLimits=capLimits, checkGroups=checkGroups)
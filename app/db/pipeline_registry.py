@@ -0,0 +1,68 @@
+"""Recently answered pipelines, addressable by hash for exports and follow-up reads."""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+from app.db.mongo import pipelineHash
+
+
+class RegisteredPipeline(BaseModel):
+    pipeline: List[Dict[str, Any]]
+
+    columns: List[Dict[str, Any]] = Field(default_factory=list)
+
+
+class PipelineRegistry:
+    """LRU map of pipeline hash -> pipeline and column metadata."""
+
+    def __init__(self, maxEntries: int):
+        self.maxEntries = maxEntries
+        self._entries: "OrderedDict[str, RegisteredPipeline]" = OrderedDict()
+        self._lock = Lock()
+
+    def register(self, pipeline: List[Dict[str, Any]], columns: List[Dict[str, Any]]) -> str:
+        """
+        Remember a pipeline and its columns.
+
+        Returns:
+            The pipeline hash clients use to refer to it
+        """
+        key = pipelineHash(pipeline)
+
+        with self._lock:
+            self._entries[key] = RegisteredPipeline(pipeline=pipeline, columns=columns)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxEntries:
+                self._entries.popitem(last=False)
+
+        return key
+
+    def get(self, key: str) -> Optional[RegisteredPipeline]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+            return entry
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"pipelines": len(self._entries), "maxEntries": self.maxEntries}
+
+
+_pipelineRegistry: Optional[PipelineRegistry] = None
+
+
+def getPipelineRegistry() -> PipelineRegistry:
+    global _pipelineRegistry
+
+    if _pipelineRegistry is None:
+        _pipelineRegistry = PipelineRegistry(maxEntries=settings.pipelineRegistrySize)
+
+    return _pipelineRegistry
@@ -0,0 +1,195 @@
+"""Server-side conversation sessions with cached result sets."""
+
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+import bson
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+from app.core.metrics import cacheEvents
+from app.db.mongo import getMongoClient
+
+
+logger = logging.getLogger(__name__)
+
+# BSON documents are limited to 16 MB; leave headroom for field names and the envelope.
+MAX_SESSION_DOCUMENT_BYTES = 15 * 1024 * 1024
+
+
+class SessionTurn(BaseModel):
+    message: str
+
+    normalizedQuery: str
+
+    pipeline: List[Dict[str, Any]] = Field(default_factory=list)
+
+    columns: List[Dict[str, Any]] = Field(default_factory=list)
+
+    # None when the result set was too large to keep; follow-ups then re-query.
+    results: Optional[List[Dict[str, Any]]] = None
+
+    resultCount: int = 0
+
+    answer: str = ""
+
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class Session(BaseModel):
+    sessionId: str
+
+    turns: List[SessionTurn] = Field(default_factory=list)
+
+    def lastResultTurn(self) -> Optional[SessionTurn]:
+        """Most recent turn that ran a query (clarification turns have no pipeline)."""
+        for turn in reversed(self.turns):
+            if turn.pipeline:
+                return turn
+
+        return None
+
+    def toHistory(self) -> List[Dict[str, Any]]:
+        """Rebuild chat history from stored turns (same shape as the API history)."""
+        history: List[Dict[str, Any]] = []
+
+        for turn in self.turns:
+            history.append({"role": "user", "content": turn.message})
+
+            if turn.answer:
+                history.append({"role": "assistant", "content": turn.answer})
+
+        return history
+
+
+class SessionBackend(ABC):
+    """Persistent storage behind the in-memory session cache."""
+
+    @abstractmethod
+    def load(self, sessionId: str) -> Optional[Session]:
+        ...
+
+    @abstractmethod
+    def save(self, session: Session) -> None:
+        ...
+
+
+class MongoSessionBackend(SessionBackend):
+    """Stores sessions as documents in a MongoDB collection."""
+
+    def __init__(self, collectionName: str):
+        self.collectionName = collectionName
+
+    def _collection(self):
+        return getMongoClient()[settings.mongodbDb][self.collectionName]
+
+    def load(self, sessionId: str) -> Optional[Session]:
+        doc = self._collection().find_one({"_id": sessionId})
+
+        if not doc:
+            return None
+
+        doc.pop("_id", None)
+
+        return Session(sessionId=sessionId, **doc)
+
+    def save(self, session: Session) -> None:
+        doc = session.model_dump(exclude={"sessionId"})
+
+        # Important: drop cached rows, oldest turn first, until the document fits.
+        # Turns without rows re-query on follow-ups, so only speed is lost.
+
+        for turn in doc["turns"]:
+            if len(bson.encode(doc)) <= MAX_SESSION_DOCUMENT_BYTES:
+                break
+            turn["results"] = None
+
+        self._collection().replace_one({"_id": session.sessionId}, doc, upsert=True)
+
+
+class SessionStore:
+    """
+    LRU cache of sessions, optionally backed by a persistent backend.
+
+    Reads fall through to the backend on a miss; writes go to both.
+    """
+
+    def __init__(self, maxSessions: int, backend: Optional[SessionBackend] = None):
+        self.maxSessions = maxSessions
+        self.backend = backend
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, sessionId: str) -> Optional[Session]:
+        with self._lock:
+            session = self._sessions.get(sessionId)
+
+            if session is not None:
+                self._sessions.move_to_end(sessionId)
+                return session
+
+        if self.backend is None:
+            return None
+
+        session = self.backend.load(sessionId)
+
+        if session is not None:
+            self._put(session)
+
+        return session
+
+    def getOrCreate(self, sessionId: str) -> Session:
+        return self.get(sessionId) or Session(sessionId=sessionId)
+
+    def appendTurn(self, session: Session, turn: SessionTurn) -> None:
+        session.turns.append(turn)
+
+        # Important: keep only the most recent turns to bound memory.
+
+        session.turns = session.turns[-settings.sessionMaxTurns:]
+
+        self._put(session)
+
+        if self.backend is None:
+            return
+
+        # The answer is already computed; a failed save only costs persistence.
+
+        try:
+            self.backend.save(session)
+        except Exception:
+            logger.warning("Failed to save session %s", session.sessionId, exc_info=True)
+            cacheEvents.inc(cache="sessions", result="save_failed")
+
+    def _put(self, session: Session) -> None:
+        with self._lock:
+            self._sessions[session.sessionId] = session
+            self._sessions.move_to_end(session.sessionId)
+
+            while len(self._sessions) > self.maxSessions:
+                self._sessions.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"sessions": len(self._sessions), "maxSessions": self.maxSessions}
+
+
+_sessionStore: Optional[SessionStore] = None
+
+
+def getSessionStore() -> SessionStore:
+    global _sessionStore
+
+    if _sessionStore is None:
+        backend = None
+
+        if settings.sessionBackend == "mongo":
+            backend = MongoSessionBackend(settings.sessionCollection)
+
+        _sessionStore = SessionStore(maxSessions=settings.sessionMaxSessions, backend=backend)
+
+    return _sessionStore
@@ -0,0 +1,381 @@
+"""
+Time-bucketed layout of the procurement collection.
+
+Ingest can also write one document per period (day or month of
+creation_date) and combination of a few low-cardinality dimensions,
+holding the number of lines and pre-summed measures. Time-grouped
+questions ("spend by month for Corrections") are then answered from a few
+thousand buckets instead of every line item: TimeBucketRewriter turns a
+pipeline into the equivalent one over the bucket collection, or returns
+None when it can't be answered exactly from buckets.
+
+Bucket documents keep the flat field names, so time expressions and
+dimension filters run unchanged; only accumulators are rewritten.
+"""
+
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+GRAINS = ("day", "month")
+
+# Fields that are a function of the period (creation_date is the period start).
+TIME_FIELDS = (
+    "calendar_year", "calendar_month", "calendar_quarter",
+    "fiscal_year", "fiscal_year_start", "fiscal_quarter",
+)
+
+DATE_FIELD = "creation_date"
+
+MEASURES = ("total_price", "quantity", "unit_price")
+
+LINES_FIELD = "lines"
+
+# Date expressions that give the same answer on a period start as on any date inside it.
+DATE_PART_GRAINS = {"$year": "month", "$month": "month", "$dayOfMonth": "day"}
+
+DATE_TRUNC_UNITS = {"year": "month", "quarter": "month", "month": "month", "week": "day", "day": "day"}
+
+DATE_FORMAT_SPECIFIERS = {"%Y": "month", "%m": "month", "%d": "day", "%j": "day", "%%": "month"}
+
+_FORMAT_SPECIFIER = re.compile(r"%.")
+
+# Query operators whose operand(s) are compared against creation_date.
+DATE_COMPARISONS = ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin")
+
+BucketKey = Tuple[Any, ...]
+
+
+def _periodStart(value: Any, grain: str) -> Any:
+    if not isinstance(value, datetime):
+        return None
+    if grain == "month":
+        return datetime(value.year, value.month, 1)
+    return datetime(value.year, value.month, value.day)
+
+
+def parseDate(value: Any) -> Any:
+    """
+    The datetime an ISO-8601 string or extended-JSON {"$date": ...} value
+    stands for (naive UTC, as stored); anything else is returned unchanged.
+
+    Generated pipelines are parsed JSON, so their date bounds arrive in
+    these forms rather than as datetimes.
+    """
+    if isinstance(value, dict) and set(value) == {"$date"}:
+        value = value["$date"]
+
+        # Canonical form is milliseconds since the epoch, possibly wrapped in $numberLong.
+
+        if isinstance(value, dict) and set(value) == {"$numberLong"}:
+            value = int(value["$numberLong"])
+
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = datetime.fromtimestamp(value / 1000, timezone.utc)
+
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return value
+
+
+def _parseDateCondition(condition: Any) -> Any:
+    if not isinstance(condition, dict) or set(condition) == {"$date"}:
+        return parseDate(condition)
+
+    parsed = {}
+
+    for op, value in condition.items():
+        if op not in DATE_COMPARISONS:
+            parsed[op] = value
+        elif isinstance(value, list):
+            parsed[op] = [parseDate(item) for item in value]
+        else:
+            parsed[op] = parseDate(value)
+
+    return parsed
+
+
+def _parseDateFilter(query: Any) -> Any:
+    if not isinstance(query, dict):
+        return query
+
+    parsed = {}
+
+    for field, condition in query.items():
+        if field in ("$and", "$or", "$nor") and isinstance(condition, list):
+            parsed[field] = [_parseDateFilter(part) for part in condition]
+        elif field == DATE_FIELD:
+            parsed[field] = _parseDateCondition(condition)
+        else:
+            parsed[field] = condition
+
+    return parsed
+
+
+def parseDateFilters(pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    The pipeline with creation_date bounds in its $match stages turned into
+    datetimes, so they compare against the stored dates (a string never
+    matches a Date in MongoDB).
+    """
+    parsed = []
+
+    for stage in pipeline:
+        if isinstance(stage, dict) and set(stage) == {"$match"}:
+            stage = {"$match": _parseDateFilter(stage["$match"])}
+
+        parsed.append(stage)
+
+    return parsed
+
+
+def _grainCovers(required: str, grain: str) -> bool:
+    """True when buckets of `grain` are fine enough for an expression needing `required`."""
+    return grain == "day" or required == "month"
+
+
+class TimeBucketBuilder:
+    """Accumulates line-item documents into bucket documents."""
+
+    def __init__(self, grain: str, dimensions: Iterable[str]):
+        if grain not in GRAINS:
+            raise ValueError(f"Unknown time bucket grain {grain!r}; expected one of {', '.join(GRAINS)}")
+
+        self.grain = grain
+        self.dimensions = list(dimensions)
+        self.keyFields = [DATE_FIELD, *TIME_FIELDS, *self.dimensions]
+        self._buckets: Dict[BucketKey, Dict[str, Any]] = {}
+        self.lines = 0
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        key = (_periodStart(doc.get(DATE_FIELD), self.grain),) + tuple(doc.get(f) for f in self.keyFields[1:])
+        bucket = self._buckets.get(key)
+
+        if bucket is None:
+            bucket = {field: value for field, value in zip(self.keyFields, key) if value is not None}
+            bucket[LINES_FIELD] = 0
+
+            for measure in MEASURES:
+                bucket[measure] = 0
+                bucket[f"{measure}_count"] = 0
+
+            self._buckets[key] = bucket
+
+        bucket[LINES_FIELD] += 1
+        self.lines += 1
+
+        for measure in MEASURES:
+            value = doc.get(measure)
+
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+
+            bucket[measure] += value
+            bucket[f"{measure}_count"] += 1
+
+            for suffix, pick in (("_min", min), ("_max", max)):
+                current = bucket.get(measure + suffix)
+                bucket[measure + suffix] = value if current is None else pick(current, value)
+
+    def documents(self) -> List[Dict[str, Any]]:
+        return list(self._buckets.values())
+
+    def updates(self) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        (filter, update) pairs that add this run's buckets to a bucket
+        collection with upserts, so buckets accumulate in step with line
+        items appended to the flat collection.
+        """
+        updates = []
+
+        for bucket in self._buckets.values():
+            # Important: {"$exists": False} rather than None, so upserts don't store the missing fields as null.
+
+            query = {field: bucket.get(field, {"$exists": False}) for field in self.keyFields}
+            update: Dict[str, Dict[str, Any]] = {"$inc": {LINES_FIELD: bucket[LINES_FIELD]}}
+
+            for measure in MEASURES:
+                update["$inc"][measure] = bucket[measure]
+                update["$inc"][f"{measure}_count"] = bucket[f"{measure}_count"]
+
+                for suffix, operator in (("_min", "$min"), ("_max", "$max")):
+                    if measure + suffix in bucket:
+                        update.setdefault(operator, {})[measure + suffix] = bucket[measure + suffix]
+
+            updates.append((query, update))
+
+        return updates
+
+
+class TimeBucketRewriter:
+    """
+    Rewrites pipelines of the form [$match..., $group, anything...] to run on
+    the bucket collection.
+
+    Everything before the $group may only filter on bucket fields (period
+    boundaries on creation_date must be aligned to the grain); the $group key
+    may only use bucket fields and grain-safe date expressions; accumulators
+    must be counts, sums/averages/min/max of a measure, or dimension
+    min/max/addToSet. Stages after the $group are untouched.
+    """
+
+    def __init__(self, grain: str, dimensions: Iterable[str]):
+        if grain not in GRAINS:
+            raise ValueError(f"Unknown time bucket grain {grain!r}; expected one of {', '.join(GRAINS)}")
+
+        self.grain = grain
+        self.dimensions: Set[str] = set(dimensions)
+        self.keyFields: Set[str] = set(TIME_FIELDS) | self.dimensions
+
+    def rewrite(self, pipeline: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        pipeline = parseDateFilters(pipeline)
+        groupIndex = next((i for i, stage in enumerate(pipeline) if "$group" in stage), None)
+
+        if groupIndex is None:
+            return None
+
+        for stage in pipeline[:groupIndex]:
+            if set(stage) != {"$match"} or not self._filterOk(stage["$match"]):
+                return None
+
+        group = pipeline[groupIndex]["$group"]
+
+        if not isinstance(group, dict) or not self._keyOk(group.get("_id")):
+            return None
+
+        rewritten = self._rewriteGroup(group)
+
+        if rewritten is None:
+            return None
+
+        bucketGroup, finishing = rewritten
+
+        return pipeline[:groupIndex] + [{"$group": bucketGroup}] + finishing + pipeline[groupIndex + 1:]
+
+    def _filterOk(self, query: Any) -> bool:
+        if not isinstance(query, dict):
+            return False
+
+        for field, condition in query.items():
+            if field in ("$and", "$or", "$nor"):
+                if not isinstance(condition, list) or not all(self._filterOk(part) for part in condition):
+                    return False
+            elif field.startswith("$"):
+                return False
+            elif field == DATE_FIELD:
+                if not self._dateConditionOk(condition):
+                    return False
+            elif field not in self.keyFields:
+                return False
+
+        return True
+
+    def _aligned(self, value: Any) -> bool:
+        return isinstance(value, datetime) and value == _periodStart(value, self.grain)
+
+    def _dateConditionOk(self, condition: Any) -> bool:
+        # Only half-open ranges on period boundaries select whole buckets.
+
+        if not isinstance(condition, dict) or not condition:
+            return False
+
+        return all(op in ("$gte", "$lt") and self._aligned(value) for op, value in condition.items())
+
+    def _keyOk(self, expr: Any) -> bool:
+        if isinstance(expr, str):
+            return not expr.startswith("$") or expr[1:] in self.keyFields
+
+        if isinstance(expr, list):
+            return all(self._keyOk(item) for item in expr)
+
+        if not isinstance(expr, dict):
+            return True
+
+        if len(expr) == 1:
+            operator, args = next(iter(expr.items()))
+
+            if operator.startswith("$"):
+                return self._dateExpressionOk(operator, args)
+
+        return all(self._keyOk(value) for value in expr.values())
+
+    def _dateExpressionOk(self, operator: str, args: Any) -> bool:
+        if operator in DATE_PART_GRAINS:
+            date = args.get("date") if isinstance(args, dict) and set(args) == {"date"} else args
+            return date == f"${DATE_FIELD}" and _grainCovers(DATE_PART_GRAINS[operator], self.grain)
+
+        if operator == "$dateTrunc" and isinstance(args, dict):
+            unit = args.get("unit")
+            return (
+                args.get("date") == f"${DATE_FIELD}"
+                and set(args) <= {"date", "unit", "binSize", "startOfWeek"}
+                and args.get("binSize", 1) == 1
+                and unit in DATE_TRUNC_UNITS
+                and _grainCovers(DATE_TRUNC_UNITS[unit], self.grain)
+            )
+
+        if operator == "$dateToString" and isinstance(args, dict):
+            specifiers = _FORMAT_SPECIFIER.findall(str(args.get("format", "")))
+            return (
+                args.get("date") == f"${DATE_FIELD}"
+                and set(args) <= {"date", "format"}
+                and all(
+                    spec in DATE_FORMAT_SPECIFIERS and _grainCovers(DATE_FORMAT_SPECIFIERS[spec], self.grain)
+                    for spec in specifiers
+                )
+            )
+
+        return False
+
+    def _rewriteGroup(self, group: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        bucketGroup: Dict[str, Any] = {"_id": group.get("_id")}
+        averages: Dict[str, Any] = {}
+        temporary: List[str] = []
+
+        for field, accumulator in group.items():
+            if field == "_id":
+                continue
+
+            if not isinstance(accumulator, dict) or len(accumulator) != 1:
+                return None
+
+            operator, operand = next(iter(accumulator.items()))
+            measure = operand[1:] if isinstance(operand, str) and operand.startswith("$") else None
+
+            if (operator == "$sum" and operand == 1) or (operator == "$count" and operand == {}):
+                bucketGroup[field] = {"$sum": f"${LINES_FIELD}"}
+            elif operator == "$sum" and measure in MEASURES:
+                bucketGroup[field] = {"$sum": operand}
+            elif operator in ("$min", "$max") and measure in MEASURES:
+                bucketGroup[field] = {operator: f"${measure}_{operator[1:]}"}
+            elif operator == "$avg" and measure in MEASURES:
+                total, count = f"__{field}_sum", f"__{field}_count"
+                bucketGroup[total] = {"$sum": operand}
+                bucketGroup[count] = {"$sum": f"${measure}_count"}
+                averages[field] = {
+                    "$cond": [{"$gt": [f"${count}", 0]}, {"$divide": [f"${total}", f"${count}"]}, None]
+                }
+                temporary.extend([total, count])
+            elif operator in ("$min", "$max", "$addToSet") and measure in self.keyFields:
+                bucketGroup[field] = accumulator
+            else:
+                return None
+
+        finishing: List[Dict[str, Any]] = []
+
+        if averages:
+            finishing = [{"$set": averages}, {"$unset": temporary}]
+
+        return bucketGroup, finishing
+
+
+def parseDimensions(text: str) -> List[str]:
+    return [field.strip() for field in text.split(",") if field.strip()]
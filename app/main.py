@@ -1,10 +1,41 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes.chat import router as chatRouter
+from app.api.routes.export import router as exportRouter
+from app.api.routes.metrics import router as metricsRouter
+from app.api.routes.readiness import router as readinessRouter
+from app.api.routes.results import router as resultsRouter
+from app.core.config import settings
+from app.core.warmup import runWarmup, stopWarmup, warmupState
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Important: warm up in the background so /api/health answers while /ready stays 503.
+    
+    warmupTask = None
+
+    if settings.warmupEnabled:
+        warmupTask = asyncio.create_task(asyncio.to_thread(runWarmup))
+    else:
+        warmupState.completed = True
+
+    yield
+
+    # Important: the warmup thread may be waiting to retry a failed step; let it exit.
+
+    stopWarmup()
+
+    if warmupTask is not None and not warmupTask.done():
+        warmupTask.cancel()
 
 
 def createApp() -> FastAPI:
-    app = FastAPI(title="Procurement AI Assistant API")
+    app = FastAPI(title="Procurement AI Assistant API", lifespan=lifespan)
 
     # Enable CORS for local development (HTML file -> API)
     app.add_middleware(
@@ -17,6 +48,14 @@ def createApp() -> FastAPI:
 
     app.include_router(chatRouter, prefix="/api")
 
+    app.include_router(exportRouter, prefix="/api")
+
+    app.include_router(resultsRouter, prefix="/api")
+
+    app.include_router(metricsRouter)
+
+    app.include_router(readinessRouter)
+
     return app
 
 
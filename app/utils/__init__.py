@@ -1,16 +1,18 @@
 """Utilities module."""
 
-from .prompt_loader import loadPrompt
-from .serialization import convertObjectIds
-from .json_utils import safe_json_loads, safe_json_dumps
-from .field_catalog import loadFieldCatalog
-from .data_overview import loadDataOverview
+from app.utils.lazy import lazyExports
 
-__all__ = [
-    "loadPrompt",
-    "convertObjectIds",
-    "safe_json_loads",
-    "safe_json_dumps",
-    "loadFieldCatalog",
-    "loadDataOverview",
-]
+
+__getattr__, __dir__, __all__ = lazyExports(__name__, {
+    "loadPrompt": ".prompt_loader",
+    "buildAgentPrompt": ".prompt_builder",
+    "convertObjectIds": ".serialization",
+    "dumpsJson": ".serialization",
+    "dumpsJsonText": ".serialization",
+    "safe_json_loads": ".json_utils",
+    "safe_json_dumps": ".json_utils",
+    "loadFieldCatalog": ".field_catalog",
+    "loadDataOverview": ".data_overview",
+    "buildResultDigest": ".result_digest",
+    "resultsForPrompt": ".result_digest",
+})
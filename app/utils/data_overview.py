@@ -1,11 +1,13 @@
 """Data overview context loader."""
 
+from functools import lru_cache
 from pathlib import Path
 
 
 DATA_OVERVIEW_PATH = Path(__file__).parent.parent / "core" / "data_overview.txt"
 
 
+@lru_cache(maxsize=1)
 def loadDataOverview() -> str:
     """
     Load the data overview context text.
@@ -1,6 +1,7 @@
 """Field catalog utilities."""
 
 import json
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any
 
@@ -8,9 +9,10 @@ from typing import Dict, Any
 FIELD_CATALOG_PATH = Path(__file__).parent.parent / "core" / "field_catalog.json"
 
 
+@lru_cache(maxsize=1)
 def loadFieldCatalog() -> Dict[str, Any]:
     """
-    Load the field catalog JSON directly.
+    Load the field catalog JSON directly (cached; treat the result as read-only).
     
     Returns:
         Dictionary containing field definitions and metadata
@@ -0,0 +1,48 @@
+"""Lazy package exports, so importing one module doesn't load its siblings."""
+
+import importlib
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+
+def lazyExports(
+    moduleName: str,
+    attributes: Dict[str, str],
+    submodules: Iterable[str] = (),
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]], List[str]]:
+    """
+    Build a package's module-level __getattr__, __dir__ and __all__.
+
+    Exports resolve on first access and are then cached on the package, so
+    later lookups don't go through __getattr__ again.
+
+    Args:
+        moduleName: The package's __name__
+        attributes: Exported name -> relative module defining it (".schemas")
+        submodules: Submodule names exposed as attributes (app.agents.orchestrator)
+
+    Returns:
+        (__getattr__, __dir__, __all__)
+
+    Example:
+        __getattr__, __dir__, __all__ = lazyExports(__name__, {"ValidatorOutput": ".schemas"})
+    """
+    submodules = list(submodules)
+    exported = list(attributes) + submodules
+
+    def __getattr__(name: str) -> Any:
+        if name in attributes:
+            value = getattr(importlib.import_module(attributes[name], moduleName), name)
+        elif name in submodules:
+            value = importlib.import_module(f".{name}", moduleName)
+        else:
+            raise AttributeError(f"module {moduleName!r} has no attribute {name!r}")
+
+        setattr(sys.modules[moduleName], name, value)
+
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[moduleName])) | set(exported))
+
+    return __getattr__, __dir__, exported
@@ -0,0 +1,71 @@
+"""Agent prompt assembly with a byte-identical static prefix."""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Tuple, Type, Union
+
+from langchain_core.messages import SystemMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel
+
+from app.core.llm import NativeStructuredOutput
+from app.utils.data_overview import loadDataOverview
+from app.utils.field_catalog import loadFieldCatalog
+from app.utils.prompt_loader import loadPrompt
+
+
+@lru_cache(maxsize=1)
+def renderFieldCatalog() -> str:
+    """Field catalog as deterministic JSON (sorted keys, fixed separators)."""
+    return json.dumps(loadFieldCatalog(), sort_keys=True, indent=2, ensure_ascii=False)
+
+
+@lru_cache(maxsize=None)
+def buildAgentPrompt(
+    promptsDir: Path,
+    systemFile: str,
+    userFile: str,
+    outputModel: Type[BaseModel],
+    native: bool = False,
+) -> Tuple[ChatPromptTemplate, Union[PydanticOutputParser, NativeStructuredOutput]]:
+    """
+    Build (and cache) an agent's prompt template and output parser.
+
+    Everything that doesn't change between requests (system text, data
+    overview, field catalog, format instructions) is rendered once into a
+    fixed system message, so every call starts with the same bytes and the
+    provider's prompt cache can reuse it. Only the user message is
+    templated with per-request values.
+
+    Args:
+        promptsDir: Directory containing the prompt files
+        systemFile: System prompt file; may use {dataOverview} and {fieldCatalog}
+        userFile: User prompt template with the per-request placeholders
+        outputModel: Pydantic model the agent returns
+        native: Bind the schema natively (no format instructions in the prompt)
+
+    Returns:
+        (prompt template, output parser or NativeStructuredOutput)
+    """
+    systemText = loadPrompt(promptsDir, systemFile).format(
+        dataOverview=loadDataOverview(),
+        fieldCatalog=renderFieldCatalog(),
+    )
+
+    if native:
+        parser = NativeStructuredOutput(outputModel)
+        staticPrefix = systemText.rstrip()
+    else:
+        parser = PydanticOutputParser(pydantic_object=outputModel)
+        staticPrefix = systemText.rstrip() + "\n\n" + parser.get_format_instructions()
+
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            SystemMessage(content=staticPrefix),
+            ("human", loadPrompt(promptsDir, userFile)),
+        ]
+    )
+
+    return prompt, parser
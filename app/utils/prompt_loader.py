@@ -1,11 +1,13 @@
 """Utility for loading prompt files."""
 
+from functools import lru_cache
 from pathlib import Path
 
 
+@lru_cache(maxsize=None)
 def loadPrompt(promptsDir: Path, fileName: str) -> str:
     """
-    Load a prompt file from the specified directory.
+    Load a prompt file from the specified directory (cached for the process lifetime).
     
     Args:
         promptsDir: Directory containing the prompt file
@@ -0,0 +1,208 @@
+"""Compact statistical digest of a result set, computed locally for LLM prompts."""
+
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import Decimal128
+
+from app.core.config import settings
+from app.core.metrics import promptTokensSaved
+from app.core.tracing import setSpanAttributes
+from app.utils.serialization import dumpsJsonText
+from app.utils.tokens import countTokens
+
+
+MEASURE_TYPES = ("MONEY", "NUMERIC", "PERCENTAGE")
+
+# Measures where adding rows up is meaningful (percentages aren't).
+ADDITIVE_TYPES = ("MONEY", "NUMERIC")
+
+PERIOD_TYPES = ("YEAR", "QUARTER", "MONTH")
+
+MONTHS = [
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december",
+]
+
+MAX_PERIODS = 24
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, (Decimal, Decimal128)):
+        return float(str(value))
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _round(value: float) -> float:
+    return round(value, 2)
+
+
+def _periodOrder(value: Any) -> Tuple[int, Any]:
+    # Month names sort by calendar; everything else ("2013-2014", "Q1", 2014) sorts naturally.
+
+    if isinstance(value, str) and value.strip().lower() in MONTHS:
+        return (0, MONTHS.index(value.strip().lower()))
+    if isinstance(value, (int, float)):
+        return (0, value)
+    if isinstance(value, (datetime, date)):
+        return (1, value.isoformat())
+    return (1, str(value))
+
+
+def _measureStats(values: List[float], fieldType: str) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {
+        "type": fieldType,
+        "count": len(values),
+        "min": _round(min(values)),
+        "max": _round(max(values)),
+        "mean": _round(sum(values) / len(values)),
+    }
+
+    if fieldType in ADDITIVE_TYPES:
+        stats["total"] = _round(sum(values))
+
+    return stats
+
+
+def _periodDeltas(
+    results: List[Dict[str, Any]],
+    periodColumn: str,
+    measure: str,
+) -> List[Dict[str, Any]]:
+    totals: Dict[Any, float] = defaultdict(float)
+
+    for row in results:
+        period, value = row.get(periodColumn), _number(row.get(measure))
+        if period is not None and value is not None:
+            totals[period] += value
+
+    series: List[Dict[str, Any]] = []
+    previous: Optional[float] = None
+
+    for period in sorted(totals, key=_periodOrder)[-MAX_PERIODS:]:
+        total = totals[period]
+        point: Dict[str, Any] = {"period": period, "total": _round(total)}
+
+        if previous is not None:
+            point["delta"] = _round(total - previous)
+            point["deltaPct"] = _round((total - previous) / abs(previous) * 100) if previous else None
+
+        series.append(point)
+        previous = total
+
+    return series
+
+
+def buildResultDigest(
+    results: List[Dict[str, Any]],
+    columns: List[Dict[str, Any]],
+    topK: int = 5,
+    sampleSize: int = 5,
+) -> Dict[str, Any]:
+    """
+    Summarize a result set using the declared column types.
+
+    Args:
+        results: Query result rows
+        columns: Column metadata ({"name", "type"}) from the query builder
+        topK: Rows to keep at each end when ranking by the primary measure
+        sampleSize: Leading rows to include as-is
+
+    Returns:
+        Row count, per-measure totals/min/max/mean, distinct counts for
+        dimensions, top/bottom rows with the top rows' share of the total,
+        period-over-period deltas when a period column exists, and a sample
+    """
+    types = {
+        column["name"]: str(getattr(column.get("type"), "value", column.get("type") or "TEXT"))
+        for column in columns
+        if column.get("name")
+    }
+    measures = [name for name, fieldType in types.items() if fieldType in MEASURE_TYPES]
+
+    digest: Dict[str, Any] = {"rowCount": len(results), "measures": {}, "dimensions": {}}
+
+    for name in measures:
+        values = [number for number in (_number(row.get(name)) for row in results) if number is not None]
+        if values:
+            digest["measures"][name] = _measureStats(values, types[name])
+
+    for name, fieldType in types.items():
+        if fieldType not in MEASURE_TYPES:
+            distinct = {str(row.get(name)) for row in results if row.get(name) is not None}
+            digest["dimensions"][name] = {"type": fieldType, "distinct": len(distinct)}
+
+    primary = next((name for name in measures if types[name] in ADDITIVE_TYPES and name in digest["measures"]), None)
+    primary = primary or next((name for name in measures if name in digest["measures"]), None)
+
+    if primary:
+        ranked = sorted(
+            (row for row in results if _number(row.get(primary)) is not None),
+            key=lambda row: _number(row.get(primary)),
+            reverse=True,
+        )
+
+        digest["rankedBy"] = primary
+        digest["topRows"] = ranked[:topK]
+        digest["bottomRows"] = ranked[-topK:][::-1] if len(ranked) > topK else []
+
+        total = digest["measures"][primary].get("total")
+
+        if total and all(_number(row.get(primary)) >= 0 for row in ranked):
+            topTotal = sum(_number(row.get(primary)) for row in ranked[:topK])
+            digest["topShare"] = _round(topTotal / total * 100)
+
+        period = next((name for name, fieldType in types.items() if fieldType in PERIOD_TYPES), None)
+
+        if period and types[primary] in ADDITIVE_TYPES:
+            digest["periods"] = {"column": period, "series": _periodDeltas(results, period, primary)}
+
+    digest["sample"] = results[:sampleSize]
+
+    return digest
+
+
+def resultsForPrompt(
+    agentName: str,
+    results: List[Dict[str, Any]],
+    columns: Optional[List[Dict[str, Any]]],
+) -> str:
+    """
+    Render results for an agent prompt: raw JSON for small results, the digest above
+    RESULT_DIGEST_MIN_ROWS. Raw JSON never carries more than RESULT_PROMPT_MAX_ROWS rows.
+    Prompt tokens saved are recorded per agent.
+    """
+    minRows = settings.resultDigestMinRows
+    maxRows = settings.resultPromptMaxRows
+    rawRows = results[:maxRows] if maxRows > 0 else results
+
+    if minRows <= 0 or len(results) <= minRows or not columns:
+        return dumpsJsonText(rawRows)
+
+    rawText = dumpsJsonText(rawRows)
+    text = dumpsJsonText(buildResultDigest(results, columns))
+
+    if len(text) >= len(rawText):
+        return rawText
+
+    digestTokens = countTokens(text, settings.agentModels.get(agentName, settings.openaiModel))
+
+    # Important: tokenizing the raw dump would cost what the digest saves; estimate it from the
+    # digest's own characters-per-token ratio instead.
+
+    rawTokens = int(len(rawText) * digestTokens / max(1, len(text)))
+    saved = max(0, rawTokens - digestTokens)
+
+    promptTokensSaved.observe(saved, agent=agentName)
+    setSpanAttributes(resultDigest=True, digestTokens=digestTokens, tokensSaved=saved)
+
+    return text
@@ -1,7 +1,14 @@
 """Serialization utilities for handling MongoDB and other data types."""
 
+from decimal import Decimal
 from typing import Any
-from bson import ObjectId
+
+import orjson
+from bson import Decimal128, ObjectId
+
+
+# Non-string keys show up in $group results keyed by numbers (e.g. years).
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
 
 
 def convertObjectIds(data: Any) -> Any:
@@ -27,3 +34,45 @@ def convertObjectIds(data: Any) -> Any:
     elif isinstance(data, list):
         return [convertObjectIds(item) for item in data]
     return data
+
+
+def _encodeDefault(value: Any) -> Any:
+    """Fallback for types orjson doesn't know (BSON and friends)."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        value = value.to_decimal()
+    if isinstance(value, Decimal):
+        if not value.is_finite():
+            return None
+        # Same as jsonable_encoder: whole decimals stay integers.
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+def dumpsJson(data: Any, indent: bool = False) -> bytes:
+    """
+    Serialize data to JSON bytes in a single pass.
+
+    Handles ObjectId, datetime, Decimal128 and NaN/Infinity (as null) natively,
+    so results can go straight from MongoDB to the response or prompt.
+
+    Args:
+        data: Data to serialize
+        indent: Pretty-print with 2-space indentation
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    options = ORJSON_OPTIONS | orjson.OPT_INDENT_2 if indent else ORJSON_OPTIONS
+
+    return orjson.dumps(data, default=_encodeDefault, option=options)
+
+
+def dumpsJsonText(data: Any, indent: bool = False) -> str:
+    """Same as dumpsJson but returns a str (for prompts)."""
+    return dumpsJson(data, indent=indent).decode("utf-8")
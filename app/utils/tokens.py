@@ -0,0 +1,47 @@
+"""Token counting utilities."""
+
+from functools import lru_cache
+from typing import Any, Optional
+
+import tiktoken
+
+
+FALLBACK_ENCODING = "o200k_base"
+
+# Rough characters-per-token ratio used when no encoding can be loaded.
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=8)
+def getEncoding(model: str) -> Optional[Any]:
+    """
+    Get the tiktoken encoding for a model (cached).
+
+    Unknown model names fall back to the o200k_base encoding used by
+    current OpenAI chat models. Returns None if the encoding files can't be
+    loaded (e.g. no network access to download them).
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception:
+        return None
+
+    try:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception:
+        return None
+
+
+def countTokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Count tokens in text for the given model (approximate if no encoding is available)."""
+    if not text:
+        return 0
+
+    encoding = getEncoding(model)
+
+    if encoding is None:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,69 @@
+"""
+Benchmark aggregation execution modes on wide "list the purchases" queries.
+
+Runs the same pipelines against the configured MongoDB collection with the
+standard cursor path and with column pushdown + raw BSON batch decoding,
+including response encoding, and prints timings and payload sizes.
+
+Usage:
+    python scripts/benchmark_aggregation.py [limit ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings
+from app.db.mongo import runAggregation
+from app.utils.serialization import dumpsJson
+
+
+COLUMNS = ["creation_date", "department_name", "supplier_name", "item_name", "quantity", "total_price"]
+
+
+def listPurchases(limit: int) -> List[Dict[str, Any]]:
+    return [
+        {"$match": {"fiscal_year": "2014-2015"}},
+        {"$sort": {"total_price": -1}},
+        {"$limit": limit},
+    ]
+
+
+def timeMode(mode: str, pipeline: List[Dict[str, Any]], repeat: int = 3) -> Dict[str, float]:
+    settings.aggregationMode = mode
+    best = float("inf")
+    size = 0
+
+    for _ in range(repeat):
+        startedAt = time.perf_counter()
+        rows = runAggregation(pipeline, columns=COLUMNS)
+        body = dumpsJson({"data": rows})
+        best = min(best, time.perf_counter() - startedAt)
+        size = len(body)
+
+    return {"seconds": best, "bytes": size, "rows": len(rows)}
+
+
+def main() -> None:
+    limits = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000]
+
+    print(f"Collection: {settings.mongodbDb}.{settings.mongodbCollection}")
+
+    for limit in limits:
+        pipeline = listPurchases(limit)
+        standard = timeMode("standard", pipeline)
+        pushdown = timeMode("pushdown", pipeline)
+
+        print(
+            f"limit={limit:>6}  rows={standard['rows']:>6}  "
+            f"standard {standard['seconds'] * 1000:8.1f} ms ({standard['bytes'] / 1_048_576:5.1f} MiB)  "
+            f"pushdown {pushdown['seconds'] * 1000:8.1f} ms ({pushdown['bytes'] / 1_048_576:5.1f} MiB)  "
+            f"speedup {standard['seconds'] / pushdown['seconds']:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark cold import time of the app's entry points.
+
+Each target is imported in a fresh interpreter with `python -X importtime`;
+the script reports the median cumulative time over several runs, how many
+modules were loaded, and which heavy dependencies came along.
+
+Usage:
+    python scripts/benchmark_import_time.py [runs] [module ...]
+"""
+
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_TARGETS = [
+    "app.main",
+    "app.agents",
+    "app.agents.orchestrator",
+    "app.agents.result_summarizer.schemas",
+    "app.utils",
+    "app.utils.field_catalog",
+    "app.db.local_aggregation",
+    "app.core.llm",
+]
+
+HEAVY_MODULES = ["langchain_openai", "openai", "langchain_core", "pymongo", "bson", "fastapi", "tiktoken"]
+
+
+def importOnce(module: str) -> Tuple[float, List[str]]:
+    """Import a module in a fresh interpreter; returns (cumulative ms, loaded module names)."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    loaded: List[str] = []
+    cumulativeUs: Dict[str, int] = {}
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        loaded.append(name)
+        cumulativeUs[name] = int(cumulative)
+
+    return cumulativeUs.get(module, 0) / 1000, loaded
+
+
+def benchmark(module: str, runs: int) -> Dict[str, object]:
+    timings = []
+    loaded: List[str] = []
+
+    for _ in range(runs):
+        elapsedMs, loaded = importOnce(module)
+        timings.append(elapsedMs)
+
+    heavy = [name for name in HEAVY_MODULES if name in loaded]
+
+    return {
+        "module": module,
+        "medianMs": statistics.median(timings),
+        "modules": len(loaded),
+        "heavy": heavy,
+    }
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    targets = sys.argv[2:] or DEFAULT_TARGETS
+
+    print(f"{'module':<40} {'median ms':>10} {'modules':>8}  heavy dependencies")
+
+    for module in targets:
+        result = benchmark(module, runs)
+        print(
+            f"{result['module']:<40} {result['medianMs']:>10.1f} {result['modules']:>8}  "
+            f"{', '.join(result['heavy']) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
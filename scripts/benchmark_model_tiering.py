@@ -0,0 +1,164 @@
+"""
+Benchmark per-agent model tiering and latency budgets with a fake LLM.
+
+Every agent call goes through the real runAgentChain (prompts, parsers,
+concurrency limits, model selection) but the chat model is replaced by a
+stand-in that sleeps for a simulated latency depending on agent and model
+and returns a canned answer. MongoDB and entity resolution are stubbed.
+
+Simulated seconds are scaled by SCALE so a full run takes a few seconds;
+reported numbers are converted back to simulated seconds.
+
+Usage:
+    python scripts/benchmark_model_tiering.py [requests-per-profile]
+"""
+
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage
+
+import app.core.llm as llm
+from app.agents.orchestrator import orchestrator
+from app.core.config import settings
+from app.core.latency import LatencyTracker
+from app.core.metrics import agentModelSelections
+
+
+SCALE = 0.01
+
+PRIMARY_MODEL = "gpt-5.1"
+
+FAST_MODEL = "gpt-4.1-mini"
+
+# Simulated seconds per agent on the primary model.
+AGENT_LATENCY = {
+    "user_query_validator": 1.5,
+    "mongo_query_builder": 4.0,
+    "mongo_query_validator": 2.5,
+    "result_summarizer": 3.0,
+    "suggested_questions": 1.5,
+}
+
+MODEL_SPEED = {PRIMARY_MODEL: 1.0, FAST_MODEL: 0.35}
+
+CANNED_OUTPUTS = {
+    "user_query_validator": {"isValid": True, "normalizedQuery": "Total spend by supplier in fiscal year 2013-2014"},
+    "mongo_query_builder": {
+        "pipeline": [
+            {"$match": {"fiscal_year": "2013-2014"}},
+            {"$group": {"_id": "$supplier_name", "totalSpend": {"$sum": "$total_price"}}},
+            {"$sort": {"totalSpend": -1}},
+            {"$limit": 10},
+            {"$project": {"_id": 0, "supplier_name": "$_id", "totalSpend": 1}},
+        ],
+        "columns": [{"name": "supplier_name", "type": "TEXT"}, {"name": "totalSpend", "type": "MONEY"}],
+    },
+    "mongo_query_validator": {"isValid": True},
+    "result_summarizer": {"answer": "Acme Corp led spending in fiscal year 2013-2014."},
+    "suggested_questions": {"suggestedQuestions": ["What about 2014-2015?", "Top departments?", "Spend by quarter?"]},
+}
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "single-model": {"agentModels": {}, "latencyBudgetSeconds": 0},
+    "tiered": {
+        "agentModels": {
+            "user_query_validator": FAST_MODEL,
+            "suggested_questions": FAST_MODEL,
+            "result_summarizer": FAST_MODEL,
+        },
+        "latencyBudgetSeconds": 0,
+    },
+    "budget-12s": {"agentModels": {}, "latencyBudgetSeconds": 12},
+    "tiered+budget-8s": {
+        "agentModels": {"user_query_validator": FAST_MODEL, "suggested_questions": FAST_MODEL},
+        "latencyBudgetSeconds": 8,
+    },
+}
+
+
+class FakeChatModel:
+    def __init__(self, agentName: str, model: str):
+        self.agentName = agentName
+        self.model = model
+
+    def invoke(self, promptValue: Any) -> AIMessage:
+        seconds = AGENT_LATENCY[self.agentName] * MODEL_SPEED[self.model] * random.uniform(0.8, 1.3)
+        time.sleep(seconds * SCALE)
+
+        return AIMessage(content=json.dumps(CANNED_OUTPUTS[self.agentName]))
+
+
+def fakeChatModel(
+    agentName: Optional[str] = None,
+    model: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> FakeChatModel:
+    return FakeChatModel(agentName or "", model or settings.agentModels.get(agentName or "", settings.openaiModel))
+
+
+def fakeAggregation(pipeline: List[Dict[str, Any]], *args: Any, **kwargs: Any) -> List[Dict[str, Any]]:
+    return [{"supplier_name": f"Supplier {i}", "totalSpend": 1000.0 * (10 - i)} for i in range(10)]
+
+
+def runProfile(name: str, overrides: Dict[str, Any], requests: int) -> Dict[str, Any]:
+    settings.openaiModel = PRIMARY_MODEL
+    settings.fastModel = FAST_MODEL
+    settings.latencyBudgetReserveSeconds = 5 * SCALE
+    settings.agentModels = overrides["agentModels"]
+    settings.latencyBudgetSeconds = overrides["latencyBudgetSeconds"] * SCALE
+
+    llm.agentLatency = LatencyTracker()
+    agentModelSelections._values.clear()
+
+    timings = []
+
+    for i in range(requests):
+        startedAt = time.perf_counter()
+        orchestrator.runProcurementAssistant(f"Total spend by supplier #{i}", [], settings.mongodbCollection)
+        timings.append((time.perf_counter() - startedAt) / SCALE)
+
+    degraded = int(sum(count for key, count in agentModelSelections._values.items() if key[2] == "true"))
+
+    timings.sort()
+
+    return {
+        "profile": name,
+        "mean": statistics.mean(timings),
+        "p50": timings[len(timings) // 2],
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "degradedCalls": degraded,
+    }
+
+
+def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+
+    random.seed(7)
+
+    llm.getChatModel = fakeChatModel
+    orchestrator.runAggregation = fakeAggregation
+    orchestrator.resolveEntities = lambda text: []
+    settings.singleFlightEnabled = False
+    settings.suggestionsMode = "llm"
+
+    print(f"{requests} requests per profile; simulated seconds (primary={PRIMARY_MODEL}, fast={FAST_MODEL})")
+    print(f"{'profile':<20} {'mean':>7} {'p50':>7} {'p95':>7} {'degraded calls':>15}")
+
+    for name, overrides in PROFILES.items():
+        result = runProfile(name, overrides, requests)
+        print(
+            f"{result['profile']:<20} {result['mean']:>7.2f} {result['p50']:>7.2f} "
+            f"{result['p95']:>7.2f} {result['degradedCalls']:>15}"
+        )
+
+
+if __name__ == "__main__":
+    main()
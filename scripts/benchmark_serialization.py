@@ -0,0 +1,95 @@
+"""
+Benchmark response serialization of large result sets.
+
+Compares the previous path (convertObjectIds -> jsonable_encoder -> json)
+with the single-pass orjson encoder used by the chat routes.
+
+Usage:
+    python scripts/benchmark_serialization.py [rows]
+"""
+
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from app.utils.serialization import convertObjectIds, dumpsJson
+
+
+def makeRows(count: int) -> List[Dict[str, Any]]:
+    random.seed(42)
+    start = datetime(2012, 7, 1)
+    rows = []
+
+    for i in range(count):
+        created = start + timedelta(days=random.randint(0, 1095))
+        rows.append(
+            {
+                "_id": ObjectId(),
+                "creation_date": created,
+                "purchase_date": created - timedelta(days=random.randint(0, 30)),
+                "fiscal_year": "2014-2015",
+                "department_name": random.choice(["Corrections and Rehabilitation, Department of", "Water Resources, Department of"]),
+                "supplier_name": f"Supplier {random.randint(1, 5000)}",
+                "item_name": f"Item {i}",
+                "quantity": float(random.randint(1, 100)),
+                "unit_price": round(random.uniform(1, 5000), 2),
+                "total_price": round(random.uniform(1, 500000), 2),
+                "calendar_year": created.year,
+            }
+        )
+
+    return rows
+
+
+def previousPath(rows: List[Dict[str, Any]]) -> bytes:
+    payload = {"status": "ok", "data": convertObjectIds(rows)}
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def currentPath(rows: List[Dict[str, Any]]) -> bytes:
+    return dumpsJson({"status": "ok", "data": rows})
+
+
+def measure(name: str, fn: Callable[[List[Dict[str, Any]]], bytes], rows: List[Dict[str, Any]], repeat: int = 5) -> float:
+    timings = []
+
+    for _ in range(repeat):
+        startedAt = time.perf_counter()
+        body = fn(rows)
+        timings.append(time.perf_counter() - startedAt)
+
+    tracemalloc.start()
+    fn(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(timings)
+    print(f"{name:<10} best {best * 1000:8.1f} ms   peak {peak / 1_048_576:7.1f} MiB   size {len(body) / 1_048_576:6.1f} MiB")
+
+    return best
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rows = makeRows(count)
+
+    print(f"Serializing {count:,} rows")
+
+    before = measure("previous", previousPath, rows)
+    after = measure("orjson", currentPath, rows)
+
+    print(f"Speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark parser-mode vs. native structured output for every agent.
+
+For each agent prints the system prompt size in tokens with and without
+the PydanticOutputParser format instructions, and the time to turn a
+typical reply into the agent's model: PydanticOutputParser on the reply
+text (parser mode) vs. model_validate_json on the provider's JSON
+(native mode).
+
+Usage:
+    python scripts/benchmark_structured_output.py [runs]
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage
+from pydantic import BaseModel
+
+from app.agents.mongo_query_builder.schemas import MongoQueryOutput
+from app.agents.mongo_query_validator.schemas import MongoQueryValidatorOutput
+from app.agents.result_summarizer.schemas import SummarizerOutput
+from app.agents.suggested_questions.schemas import SuggestionsOutput
+from app.agents.user_query_validator.schemas import ValidatorOutput
+from app.utils.prompt_builder import buildAgentPrompt
+from app.utils.tokens import countTokens
+
+
+AGENTS_DIR = Path(__file__).resolve().parent.parent / "app" / "agents"
+
+# agent: (prompt directory, system file, user file, output model, typical reply)
+AGENTS: Dict[str, Tuple[str, str, str, Type[BaseModel], Dict[str, Any]]] = {
+    "user_query_validator": (
+        "user_query_validator", "validator_system.txt", "validator_user.txt", ValidatorOutput,
+        {"isValid": True, "clarifyingQuestion": "", "normalizedQuery": "Total spend by department in fiscal year 2013-2014"},
+    ),
+    "mongo_query_builder": (
+        "mongo_query_builder", "query_builder_system.txt", "query_builder_user.txt", MongoQueryOutput,
+        {
+            "pipeline": [
+                {"$match": {"fiscal_year": "2013-2014"}},
+                {"$group": {"_id": "$department_name", "totalSpend": {"$sum": "$total_price"}}},
+                {"$sort": {"totalSpend": -1}},
+                {"$limit": 10},
+            ],
+            "explanation": "Top 10 departments by total spend in FY 2013-2014.",
+            "columns": [{"name": "_id", "type": "TEXT"}, {"name": "totalSpend", "type": "MONEY"}],
+            "applyToPrevious": False,
+        },
+    ),
+    "mongo_query_validator": (
+        "mongo_query_validator", "validator_system.txt", "validator_user.txt", MongoQueryValidatorOutput,
+        {"isValid": True, "refinement": None, "context": "Matched department names exactly."},
+    ),
+    "result_summarizer": (
+        "result_summarizer", "summarizer_system.txt", "summarizer_user.txt", SummarizerOutput,
+        {"answer": "Corrections and Rehabilitation spent the most in FY 2013-2014, about $1.2B."},
+    ),
+    "suggested_questions": (
+        "suggested_questions", "suggestions_system.txt", "suggestions_user.txt", SuggestionsOutput,
+        {"suggestedQuestions": [
+            "How did this change from the previous fiscal year?",
+            "Which suppliers received the most from Corrections?",
+            "What share of spend went to IT Goods?",
+        ]},
+    ),
+}
+
+
+def medianUs(fn: Callable[[], Any], runs: int) -> float:
+    timings = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1_000_000)
+
+    return statistics.median(timings)
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    totals: List[int] = [0, 0]
+
+    print(f"{'agent':<24}{'parser tok':>11}{'native tok':>11}{'saved':>7}{'parser us':>11}{'native us':>11}")
+
+    for agent, (directory, systemFile, userFile, outputModel, reply) in AGENTS.items():
+        promptsDir = AGENTS_DIR / directory
+        sizes = []
+
+        for native in (False, True):
+            prompt, _ = buildAgentPrompt(promptsDir, systemFile, userFile, outputModel, native=native)
+            sizes.append(countTokens(prompt.messages[0].content))
+
+        _, parser = buildAgentPrompt(promptsDir, systemFile, userFile, outputModel)
+        text = outputModel.model_validate(reply).model_dump_json()
+        message = AIMessage(content=text)
+
+        parserUs = medianUs(lambda: parser.invoke(message), runs)
+        nativeUs = medianUs(lambda: outputModel.model_validate_json(text), runs)
+
+        totals[0] += sizes[0]
+        totals[1] += sizes[1]
+
+        print(
+            f"{agent:<24}{sizes[0]:>11,}{sizes[1]:>11,}{sizes[0] - sizes[1]:>7,}"
+            f"{parserUs:>11.1f}{nativeUs:>11.1f}"
+        )
+
+    print(f"{'total':<24}{totals[0]:>11,}{totals[1]:>11,}{totals[0] - totals[1]:>7,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark month-over-month trend queries on the flat collection vs. time buckets.
+
+Against MongoDB (TIME_BUCKET_COLLECTION must have been written by the
+ingest script) each pipeline runs on both collections and the median time
+is printed. With --local the same comparison runs in process on synthetic
+line items, which shows the effect of scanning buckets instead of lines
+without a database.
+
+Usage:
+    python scripts/benchmark_time_buckets.py [runs] [--local [lines]]
+"""
+
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings
+from app.db.document_schema import computeDateFields
+from app.db.local_aggregation import runLocalAggregation
+from app.db.time_buckets import TimeBucketBuilder, TimeBucketRewriter, parseDimensions
+
+
+PIPELINES: Dict[str, List[Dict[str, Any]]] = {
+    "spend by month": [
+        {"$group": {"_id": {"year": "$calendar_year", "month": "$calendar_month"}, "totalSpend": {"$sum": "$total_price"}}},
+        {"$sort": {"_id.year": 1, "_id.month": 1}},
+    ],
+    "department by month": [
+        {"$match": {"department_name": "Corrections and Rehabilitation"}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m", "date": "$creation_date"}},
+            "totalSpend": {"$sum": "$total_price"},
+            "orders": {"$sum": 1},
+        }},
+        {"$sort": {"_id": 1}},
+    ],
+    "fiscal quarters": [
+        {"$match": {"fiscal_year": {"$in": ["2013-2014", "2014-2015"]}}},
+        {"$group": {
+            "_id": {"fy": "$fiscal_year", "q": "$fiscal_quarter"},
+            "avgPrice": {"$avg": "$total_price"},
+            "totalSpend": {"$sum": "$total_price"},
+        }},
+        {"$sort": {"_id.fy": 1, "_id.q": 1}},
+    ],
+}
+
+
+def syntheticLines(count: int) -> List[Dict[str, Any]]:
+    rng = random.Random(42)
+    departments = [f"Department {i}" for i in range(120)] + ["Corrections and Rehabilitation"]
+    lines = []
+
+    for _ in range(count):
+        doc = {
+            "creation_date": datetime(2012 + rng.randint(0, 2), rng.randint(1, 12), rng.randint(1, 28)),
+            # Spend is concentrated in a few departments, as in the real data.
+            "department_name": departments[min(int(rng.paretovariate(1.2)) - 1, len(departments) - 1)],
+            "acquisition_type": rng.choice(["IT Goods", "IT Services", "NON-IT Goods", "NON-IT Services"]),
+            "acquisition_method": rng.choice(["Statewide Contract", "Informal Competitive", "WSCA/Coop", "NCB"]),
+            "calcard": rng.choice(["YES", "NO"]),
+            "total_price": round(rng.lognormvariate(7, 2), 2),
+            "quantity": float(rng.randint(1, 50)),
+        }
+        computeDateFields(doc, "creation_date")
+        doc["fiscal_year"] = f"{doc['fiscal_year_start']}-{doc['fiscal_year_start'] + 1}"
+        lines.append(doc)
+
+    return lines
+
+
+def medianMs(fn: Callable[[], Any], runs: int) -> float:
+    timings = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings)
+
+
+def report(name: str, flatMs: float, bucketMs: float) -> None:
+    print(f"{name:<22} flat {flatMs:9.1f} ms   buckets {bucketMs:8.1f} ms   {flatMs / max(bucketMs, 1e-6):6.1f}x")
+
+
+def main() -> None:
+    numbers = [int(arg) for arg in sys.argv[1:] if arg.isdigit()]
+    runs = numbers[0] if numbers else 5
+    grain = settings.timeBucketGrain
+    dimensions = parseDimensions(settings.timeBucketDimensions)
+    rewriter = TimeBucketRewriter(grain, dimensions)
+
+    if "--local" in sys.argv:
+        lines = syntheticLines(numbers[1] if len(numbers) > 1 else 100_000)
+        builder = TimeBucketBuilder(grain, dimensions)
+        for line in lines:
+            builder.add(line)
+        buckets = builder.documents()
+
+        print(f"{len(lines):,} lines -> {len(buckets):,} {grain} buckets ({dimensions})")
+
+        for name, pipeline in PIPELINES.items():
+            rewritten = rewriter.rewrite(pipeline)
+            if rewritten is None or "$dateToString" in str(pipeline):
+                print(f"{name:<22} not run locally")
+                continue
+            report(
+                name,
+                medianMs(lambda: runLocalAggregation(lines, pipeline), runs),
+                medianMs(lambda: runLocalAggregation(buckets, rewritten), runs),
+            )
+        return
+
+    if not settings.timeBucketCollection:
+        raise SystemExit("Set TIME_BUCKET_COLLECTION (and ingest it) or pass --local")
+
+    from app.db.mongo import getCollection
+
+    flat, bucketed = getCollection(), getCollection(settings.timeBucketCollection)
+
+    print(f"{flat.estimated_document_count():,} lines -> {bucketed.estimated_document_count():,} {grain} buckets")
+
+    for name, pipeline in PIPELINES.items():
+        rewritten = rewriter.rewrite(pipeline)
+        if rewritten is None:
+            print(f"{name:<22} not answerable from buckets")
+            continue
+        report(
+            name,
+            medianMs(lambda: list(flat.aggregate(pipeline, allowDiskUse=True)), runs),
+            medianMs(lambda: list(bucketed.aggregate(rewritten, allowDiskUse=True)), runs),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Check that agent prompts share a byte-identical static prefix.
+
+Offline (default): renders every agent prompt for two different requests
+and reports the shared prefix length in characters and tokens. Providers
+only cache prompts whose first ~1024 tokens repeat exactly, so the shared
+prefix should cover the whole system message.
+
+Live (--live, needs OPENAI_API_KEY): sends the same agent prompt several
+times and reports latency and cached prompt tokens per call, to verify
+cache hits and the latency reduction they bring.
+
+Usage:
+    python scripts/check_prompt_cache.py [--live] [calls]
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.agents.mongo_query_builder.schemas import MongoQueryOutput
+from app.agents.mongo_query_validator.schemas import MongoQueryValidatorOutput
+from app.agents.result_summarizer.schemas import SummarizerOutput
+from app.agents.suggested_questions.schemas import SuggestionsOutput
+from app.agents.user_query_validator.schemas import ValidatorOutput
+from app.core.config import settings
+from app.utils.prompt_builder import buildAgentPrompt
+from app.utils.tokens import countTokens
+
+
+AGENTS_DIR = Path(__file__).resolve().parent.parent / "app" / "agents"
+
+HISTORY = [{"role": "user", "content": "Total spend by year"}]
+
+# (agent, system file, user file, output model, two sets of per-request variables)
+AGENT_PROMPTS: List[Tuple[str, str, str, Any, List[Dict[str, Any]]]] = [
+    (
+        "user_query_validator", "validator_system.txt", "validator_user.txt", ValidatorOutput,
+        [{"message": "Top suppliers in 2014", "history": []}, {"message": "Spend by department", "history": HISTORY}],
+    ),
+    (
+        "mongo_query_builder", "query_builder_system.txt", "query_builder_user.txt", MongoQueryOutput,
+        [
+            {"normalizedQuery": "Top 10 suppliers by spend in 2014", "history": [], "collectionName": "purchases",
+             "refinement": "None", "previousResult": "None", "resolvedEntities": "None"},
+            {"normalizedQuery": "Spend by department", "history": HISTORY, "collectionName": "purchases",
+             "refinement": "Use exact match", "previousResult": "None", "resolvedEntities": "None"},
+        ],
+    ),
+    (
+        "mongo_query_validator", "validator_system.txt", "validator_user.txt", MongoQueryValidatorOutput,
+        [
+            {"userMessage": "a", "normalizedQuery": "a", "history": [], "pipeline": "[]", "results": "[]",
+             "resultCount": 0, "findings": "None"},
+            {"userMessage": "b", "normalizedQuery": "b", "history": HISTORY, "pipeline": "[{}]", "results": "[{}]",
+             "resultCount": 1, "findings": "- empty"},
+        ],
+    ),
+    (
+        "result_summarizer", "summarizer_system.txt", "summarizer_user.txt", SummarizerOutput,
+        [
+            {"question": "Total spend by year", "history": [], "results": "[]"},
+            {"question": "Top suppliers", "history": HISTORY, "results": '[{"supplier_name": "Acme"}]'},
+        ],
+    ),
+    (
+        "suggested_questions", "suggestions_system.txt", "suggestions_user.txt", SuggestionsOutput,
+        [
+            {"question": "Total spend by year", "answer": "It grew.", "history": []},
+            {"question": "Top suppliers", "answer": "Acme led.", "history": HISTORY},
+        ],
+    ),
+]
+
+
+def sharedPrefix(a: str, b: str) -> str:
+    length = 0
+    for charA, charB in zip(a, b):
+        if charA != charB:
+            break
+        length += 1
+    return a[:length]
+
+
+def checkPrefixes() -> None:
+    print(f"{'agent':<24} {'system chars':>12} {'shared chars':>12} {'shared tokens':>14}  stable")
+
+    for agentName, systemFile, userFile, outputModel, variableSets in AGENT_PROMPTS:
+        prompt, _ = buildAgentPrompt(AGENTS_DIR / agentName, systemFile, userFile, outputModel)
+        rendered = [prompt.invoke(variables).to_messages() for variables in variableSets]
+
+        systemA, systemB = rendered[0][0].content, rendered[1][0].content
+        prefix = sharedPrefix(
+            "\n".join(str(m.content) for m in rendered[0]),
+            "\n".join(str(m.content) for m in rendered[1]),
+        )
+
+        print(
+            f"{agentName:<24} {len(systemA):>12} {len(prefix):>12} "
+            f"{countTokens(prefix, settings.openaiModel):>14}  {'yes' if systemA == systemB else 'NO'}"
+        )
+
+
+def checkLive(calls: int) -> None:
+    from app.core.llm import getChatModel
+
+    agentName, systemFile, userFile, outputModel, variableSets = AGENT_PROMPTS[3]
+    prompt, _ = buildAgentPrompt(AGENTS_DIR / agentName, systemFile, userFile, outputModel)
+    model = getChatModel(agentName)
+
+    print(f"\nlive: {calls} calls to {agentName} ({model.model_name})")
+
+    for i in range(calls):
+        variables = variableSets[i % len(variableSets)]
+        startedAt = time.perf_counter()
+        message = model.invoke(prompt.invoke(variables))
+        elapsed = time.perf_counter() - startedAt
+
+        usage = message.usage_metadata or {}
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0)
+
+        print(f"call {i + 1}: {elapsed * 1000:7.0f} ms  prompt={usage.get('input_tokens')}  cached={cached}")
+
+
+def main() -> None:
+    checkPrefixes()
+
+    if "--live" in sys.argv:
+        if not os.getenv("OPENAI_API_KEY") and not settings.openaiApiKey:
+            sys.exit("--live needs OPENAI_API_KEY")
+
+        numbers = [arg for arg in sys.argv[1:] if arg.isdigit()]
+        checkLive(int(numbers[0]) if numbers else 5)
+
+
+if __name__ == "__main__":
+    main()
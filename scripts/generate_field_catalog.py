@@ -0,0 +1,41 @@
+"""
+Generate app/core/field_catalog.json from the versioned document schema.
+
+The catalog must describe the layout the collection was ingested with
+(INGEST_LAYOUT); `--check` exits non-zero when the file is out of date.
+
+Usage:
+    python scripts/generate_field_catalog.py [flat|compact] [--check]
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.db.document_schema import LAYOUTS, fieldCatalogFor, renderFieldCatalog
+from app.utils.field_catalog import FIELD_CATALOG_PATH
+
+
+def main() -> None:
+    layouts = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    layout = layouts[0] if layouts else "flat"
+
+    if layout not in LAYOUTS:
+        raise SystemExit(f"Unknown layout {layout!r}; expected one of {', '.join(LAYOUTS)}")
+
+    text = renderFieldCatalog(fieldCatalogFor(layout))
+    current = FIELD_CATALOG_PATH.read_text(encoding="utf-8") if FIELD_CATALOG_PATH.exists() else ""
+
+    if "--check" in sys.argv:
+        if current.replace("\r\n", "\n") != text:
+            raise SystemExit(f"{FIELD_CATALOG_PATH} is out of date for the {layout} layout")
+        print(f"{FIELD_CATALOG_PATH} matches the {layout} layout")
+        return
+
+    FIELD_CATALOG_PATH.write_text(text, encoding="utf-8")
+    print(f"Wrote {FIELD_CATALOG_PATH} ({layout} layout, {len(text):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
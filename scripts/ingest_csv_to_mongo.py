@@ -1,90 +1,95 @@
 import os
 import csv
+import sys
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 from datetime import datetime
-from pymongo import MongoClient
 from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 # Load environment variables
 load_dotenv()
 
+from app.db.document_schema import LAYOUTS, DocumentBuilder, fieldCatalogFor, layoutSizeReport, loadDocumentSchema
+from app.core.config import settings
+from app.db.mongo import getMongoIngestClient
+from app.db.time_buckets import LINES_FIELD, TimeBucketBuilder, parseDimensions
+from app.utils.field_catalog import loadFieldCatalog
 
-def normalizeKey(key: str) -> str:
-    return key.strip().lower().replace(" ", "_").replace("-", "_")
-
-
-def parseUsDate(value: Any) -> Optional[datetime]:
-    if value is None:
-        return None
-
-    s = str(value).strip()
 
-    if not s:
+def collectionSizes(db, collectionName: str) -> Optional[Dict[str, Any]]:
+    if collectionName not in db.list_collection_names():
         return None
 
-    for fmt in ("%m/%d/%Y", "%m/%d/%y"):
-        try:
-            return datetime.strptime(s, fmt)
-        except Exception:
-            continue
+    stats = db.command("collStats", collectionName)
 
-    return None
+    return {key: stats.get(key, 0) for key in ("count", "avgObjSize", "size", "storageSize", "totalIndexSize")}
 
 
-def parseCurrency(value: Any) -> Optional[float]:
-    if value is None:
-        return None
-
-    s = str(value).strip()
-
-    if not s:
-        return None
-
-    s = s.replace("$", "").replace(",", "").strip()
+def printSizes(label: str, sizes: Optional[Dict[str, Any]]) -> None:
+    if sizes is None:
+        print(f"{label}: collection does not exist")
+        return
 
-    try:
-        return float(s)
-    except Exception:
-        return None
+    print(
+        f"{label}: {sizes['count']:,} docs, avg {sizes['avgObjSize']:,} B, data {sizes['size'] / 1e6:,.1f} MB, "
+        f"storage {sizes['storageSize'] / 1e6:,.1f} MB, indexes {sizes['totalIndexSize'] / 1e6:,.1f} MB"
+    )
 
 
-def parseNumber(value: Any) -> Optional[float]:
-    if value is None:
-        return None
+def printLayoutReport(csvFile: Path) -> None:
+    # Offline comparison of the layouts on this CSV (BSON bytes per document), no MongoDB needed.
 
-    s = str(value).strip()
+    with csvFile.open("r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        report = layoutSizeReport(reader, reader.fieldnames or [])
 
-    if not s:
-        return None
+    flatBytes = report["flat"]["bytes"] or 1
 
-    s2 = s.replace(",", "")
+    for layout, stats in report.items():
+        print(
+            f"{layout:>8}: {stats['documents']:,} docs, {stats['bytes'] / 1e6:,.1f} MB BSON, "
+            f"avg {stats['avgBytes']:,} B ({stats['bytes'] / flatBytes:.0%} of flat)"
+        )
 
-    try:
-        return float(s2)
-    except Exception:
-        return None
 
+def writeTimeBuckets(db, bucketCollectionName: str, buckets: TimeBucketBuilder) -> None:
+    # Buckets are added to (upserted), like the line items appended to the flat collection, so both
+    # always describe the same rows; --reload clears both.
 
-def computeDateFields(doc: Dict[str, Any], dateField: str) -> None:
-    dt = doc.get(dateField)
+    bucketCollection = db[bucketCollectionName]
 
-    if not isinstance(dt, datetime):
-        return
+    requests = [UpdateOne(query, update, upsert=True) for query, update in buckets.updates()]
 
-    doc["calendar_year"] = dt.year
+    for start in range(0, len(requests), 1000):
+        bucketCollection.bulk_write(requests[start:start + 1000], ordered=False)
 
-    doc["calendar_month"] = dt.month
+    for field in ["creation_date", "fiscal_year", *buckets.dimensions]:
+        bucketCollection.create_index(field)
 
-    doc["calendar_quarter"] = int(((dt.month - 1) / 3) + 1)
+    print(
+        f"Time buckets: {len(requests):,} {buckets.grain} buckets updated with {buckets.lines:,} lines "
+        f"in {db.name}.{bucketCollectionName}"
+    )
 
-    fiscalYearStart = dt.year if dt.month >= 7 else dt.year - 1
 
-    doc["fiscal_year_start"] = fiscalYearStart
+def checkTimeBuckets(db, collectionName: str, bucketCollectionName: str) -> None:
+    # Buckets created after the flat collection was loaded miss the earlier rows; rewritten queries would
+    # then return smaller totals than the line items.
 
-    fiscalMonth = ((dt.month - 7) % 12) + 1
+    totals = list(db[bucketCollectionName].aggregate([
+        {"$group": {"_id": None, "lines": {"$sum": f"${LINES_FIELD}"}}},
+    ]))
+    bucketLines = totals[0]["lines"] if totals else 0
+    flatLines = db[collectionName].count_documents({})
 
-    doc["fiscal_quarter"] = int(((fiscalMonth - 1) / 3) + 1)
+    if bucketLines != flatLines:
+        print(
+            f"Time buckets cover {bucketLines:,} lines but {collectionName} has {flatLines:,}; "
+            "run the ingest with --reload before enabling TIME_BUCKET_COLLECTION"
+        )
 
 
 def main() -> None:
@@ -94,25 +99,42 @@ def main() -> None:
     if not csvPath:
         raise ValueError("Missing DATASET_CSV_PATH in .env")
 
-    mongoUri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-
     dbName = os.getenv("MONGODB_DB", "procurement")
 
     collectionName = os.getenv("MONGODB_COLLECTION", "purchases")
 
+    # flat: every column, nulls kept; compact: see app/core/document_schema.json
+    layout = os.getenv("INGEST_LAYOUT", "flat").strip()
+
+    if layout not in LAYOUTS:
+        raise ValueError(f"INGEST_LAYOUT must be one of {', '.join(LAYOUTS)}")
+
     csvFile = Path(csvPath)
 
     if not csvFile.exists():
         raise FileNotFoundError(f"CSV not found: {csvFile}")
 
-    client = MongoClient(mongoUri)
+    if "--report" in sys.argv:
+        printLayoutReport(csvFile)
+        return
+
+    # Separate pool (MONGO_INGEST_URI / MONGO_INGEST_MAX_POOL_SIZE) so a load doesn't starve the API.
+
+    client = getMongoIngestClient()
 
     db = client[dbName]
 
     collection = db[collectionName]
 
-    # Uncomment if you want a clean reload every time.
-    # collection.delete_many({})
+    printSizes("Before", collectionSizes(db, collectionName))
+
+    # --reload replaces the data: the flat collection and its time buckets are cleared together.
+
+    if "--reload" in sys.argv:
+        collection.delete_many({})
+
+        if settings.timeBucketCollection:
+            db[settings.timeBucketCollection].delete_many({})
 
     insertedCount = 0
 
@@ -124,40 +146,22 @@ def main() -> None:
         if not reader.fieldnames:
             raise ValueError("CSV has no headers")
 
-        normalizedHeaders = [normalizeKey(h) for h in reader.fieldnames]
-
-        for row in reader:
-            doc: Dict[str, Any] = {}
-
-            for originalKey, normalizedKey in zip(reader.fieldnames, normalizedHeaders):
-                value = row.get(originalKey)
-
-                parsedValue: Any = value
-
-                if normalizedKey in ["creation_date", "purchase_date"]:
-                    parsedValue = parseUsDate(value)
-
-                elif normalizedKey in ["unit_price", "total_price"]:
-                    parsedValue = parseCurrency(value)
+        builder = DocumentBuilder(reader.fieldnames, layout)
 
-                elif normalizedKey in ["quantity"]:
-                    parsedValue = parseNumber(value)
+        # TIME_BUCKET_COLLECTION also writes per-period pre-summed buckets for time-grouped queries.
 
-                else:
-                    if value is None:
-                        parsedValue = None
-                    else:
-                        parsedValue = str(value).strip()
+        buckets = None
+        if settings.timeBucketCollection:
+            buckets = TimeBucketBuilder(settings.timeBucketGrain, parseDimensions(settings.timeBucketDimensions))
 
-                        if parsedValue == "":
-                            parsedValue = None
-
-                doc[normalizedKey] = parsedValue
-
-            computeDateFields(doc, "creation_date")
+        for row in reader:
+            doc = builder.build(row)
 
             batch.append(doc)
 
+            if buckets is not None:
+                buckets.add(doc)
+
             if len(batch) >= 1000:
                 collection.insert_many(batch)
 
@@ -187,7 +191,25 @@ def main() -> None:
 
     collection.create_index("department_name")
 
-    print(f"Inserted: {insertedCount} documents into {dbName}.{collectionName}")
+    if buckets is not None:
+        writeTimeBuckets(db, settings.timeBucketCollection, buckets)
+
+        checkTimeBuckets(db, collectionName, settings.timeBucketCollection)
+
+    # Record which layout and schema version the documents follow; field_catalog.json must match the layout.
+
+    db["schema_info"].replace_one(
+        {"_id": collectionName},
+        {"layout": layout, "version": loadDocumentSchema()["version"], "ingestedAt": datetime.utcnow()},
+        upsert=True,
+    )
+
+    print(f"Inserted: {insertedCount} documents into {dbName}.{collectionName} ({layout} layout)")
+
+    printSizes("After", collectionSizes(db, collectionName))
+
+    if loadFieldCatalog() != fieldCatalogFor(layout):
+        print(f"field_catalog.json describes another layout; run: python scripts/generate_field_catalog.py {layout}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+"""Tests for chat admission control."""
+
+import asyncio
+from threading import Event
+
+import pytest
+
+from app.api.admission import AdmissionController, AdmissionRejected
+
+
+def makeController(maxWorkers=1, maxQueue=5, maxWaitSeconds=60.0):
+    return AdmissionController(name="test", maxWorkers=maxWorkers, maxQueue=maxQueue, maxWaitSeconds=maxWaitSeconds)
+
+
+async def waitFor(condition, timeout=2.0):
+    for _ in range(int(timeout / 0.005)):
+        if condition():
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("condition not reached")
+
+
+def test_admitted_work_runs_and_is_counted():
+    controller = makeController()
+
+    assert asyncio.run(controller.run(lambda a, b=0: a + b, 2, b=3)) == 5
+
+    stats = controller.stats()
+    assert (stats["admitted"], stats["completed"], stats["queued"], stats["inFlight"]) == (1, 1, 0, 0)
+
+
+def test_full_queue_is_rejected():
+    controller = makeController(maxWorkers=1, maxQueue=1)
+    release = Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(controller.run(release.wait, 2))
+        await waitFor(lambda: controller.stats()["inFlight"] == 1)
+        queued = asyncio.ensure_future(controller.run(lambda: "queued"))
+        await waitFor(lambda: controller.stats()["queued"] == 1)
+
+        with pytest.raises(AdmissionRejected, match="queue is full") as excinfo:
+            await controller.run(lambda: "rejected")
+
+        release.set()
+        return excinfo.value, await running, await queued
+
+    rejection, _, queuedResult = asyncio.run(scenario())
+
+    assert rejection.retryAfter >= 1
+    assert queuedResult == "queued"
+    assert controller.stats()["rejected"] == 1
+
+
+def test_long_estimated_wait_is_rejected():
+    # One worker busy and ~5s per request: the next caller would wait past the 1s limit.
+    controller = makeController(maxWorkers=1, maxQueue=10, maxWaitSeconds=1.0)
+    release = Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(controller.run(release.wait, 2))
+        await waitFor(lambda: controller.stats()["inFlight"] == 1)
+
+        with pytest.raises(AdmissionRejected, match="estimated wait"):
+            await controller.run(lambda: None)
+
+        release.set()
+        await running
+
+    asyncio.run(scenario())
+
+    assert controller.stats()["queued"] == 0
+
+
+def test_cancelled_queued_request_releases_its_queue_slot():
+    controller = makeController(maxWorkers=1)
+    release = Event()
+    ran = []
+
+    async def scenario():
+        running = asyncio.ensure_future(controller.run(release.wait, 2))
+        await waitFor(lambda: controller.stats()["inFlight"] == 1)
+
+        queued = asyncio.ensure_future(controller.run(lambda: ran.append(1)))
+        await waitFor(lambda: controller.stats()["queued"] == 1)
+
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+        assert controller.stats()["queued"] == 0
+
+        release.set()
+        await running
+
+    asyncio.run(scenario())
+
+    stats = controller.stats()
+    assert (stats["queued"], stats["inFlight"], stats["completed"]) == (0, 0, 1)
+    assert ran == []
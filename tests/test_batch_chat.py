@@ -0,0 +1,56 @@
+"""Tests for the batch chat endpoint."""
+
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.api.batch as batch
+import app.db.mongo as mongo
+from app.api.routes.chat import router
+
+
+def test_batch_dedupes_streams_and_shares_results(monkeypatch):
+    mongoCalls = []
+
+    def fakeAggregation(pipeline, columns):
+        mongoCalls.append(pipeline)
+        return [{"total": 1}]
+
+    def fakeAssistant(message, history, collectionName):
+        # Different questions that build the same pipeline share one MongoDB round trip.
+        rows = mongo.runAggregation([{"$group": {"_id": None, "total": {"$sum": 1}}}])
+        return {"status": "ok", "answer": message, "data": rows}
+
+    monkeypatch.setattr(mongo, "_runAggregation", fakeAggregation)
+    monkeypatch.setattr(batch, "runProcurementAssistant", fakeAssistant)
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+
+    questions = ["Total spend?", "total   SPEND", "How many purchases"]
+    response = TestClient(app).post("/api/chat/batch", json={"questions": questions})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    items, summary = lines[:-1], lines[-1]
+
+    assert sorted(tuple(item["indices"]) for item in items) == [(0, 1), (2,)]
+    assert all(item["status"] == "ok" and item["result"]["traceId"] for item in items)
+    assert summary["type"] == "summary"
+    assert summary["questions"] == 3 and summary["unique"] == 2
+    assert summary["statuses"] == {"ok": 3}
+    assert len(mongoCalls) == 1
+
+
+def test_batch_rejects_oversized_batches(monkeypatch):
+    monkeypatch.setattr(batch.settings, "batchMaxQuestions", 2)
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+
+    response = TestClient(app).post("/api/chat/batch", json={"questions": ["a", "b", "c"]})
+
+    assert response.status_code == 413
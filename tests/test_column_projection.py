@@ -0,0 +1,34 @@
+"""Tests for the declared-column $project used by pushdown aggregation."""
+
+from app.db.mongo import buildColumnProjection
+
+
+GROUPED = [
+    {"$match": {"fiscal_year": "2013-2014"}},
+    {"$group": {"_id": "$department_name", "totalSpend": {"$sum": "$total_price"}}},
+]
+
+UNGROUPED = [{"$match": {"fiscal_year": "2013-2014"}}, {"$sort": {"total_price": -1}}, {"$limit": 10}]
+
+
+def test_grouped_pipeline_keeps_the_group_key():
+    assert buildColumnProjection(GROUPED, ["totalSpend"]) == {"totalSpend": 1}
+    assert buildColumnProjection(GROUPED, ["_id", "totalSpend"]) == {"_id": 1, "totalSpend": 1}
+
+
+def test_ungrouped_pipeline_drops_id_unless_declared():
+    assert buildColumnProjection(UNGROUPED, ["supplier_name", "total_price"]) == {
+        "supplier_name": 1, "total_price": 1, "_id": 0,
+    }
+    assert buildColumnProjection(UNGROUPED, ["_id", "supplier_name"]) == {"_id": 1, "supplier_name": 1}
+
+
+def test_dotted_columns_keep_their_top_level_field():
+    assert buildColumnProjection(GROUPED, ["_id.year", "_id.month", "totalSpend"]) == {"_id": 1, "totalSpend": 1}
+    assert buildColumnProjection(UNGROUPED, ["supplier.name", "supplier.city"]) == {"supplier": 1, "_id": 0}
+
+
+def test_dollar_prefixed_and_empty_names_are_ignored():
+    assert buildColumnProjection(UNGROUPED, ["$total_price", "", "quantity"]) == {"quantity": 1, "_id": 0}
+    assert buildColumnProjection(UNGROUPED, ["$total_price", ""]) is None
+    assert buildColumnProjection(GROUPED, []) is None
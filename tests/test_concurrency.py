@@ -0,0 +1,161 @@
+"""Tests for request coalescing and concurrency limits."""
+
+import time
+from threading import Event, Thread
+
+import pytest
+
+from app.core.concurrency import ConcurrencyLimiter, SingleFlight
+
+
+def startThread(target, *args):
+    thread = Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def waitUntil(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def test_single_flight_coalesces_concurrent_callers():
+    flight = SingleFlight()
+    release = Event()
+    calls = []
+    results = []
+
+    def work():
+        calls.append(1)
+        release.wait(2)
+        return "answer"
+
+    leader = startThread(lambda: results.append(flight.do("q", work)))
+    waitUntil(lambda: flight.stats()["inFlight"] == 1)
+
+    followers = [startThread(lambda: results.append(flight.do("q", work))) for _ in range(3)]
+    waitUntil(lambda: flight.stats()["coalesced"] == 3)
+
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(2)
+
+    assert len(calls) == 1
+    assert sorted(results) == [("answer", False)] + [("answer", True)] * 3
+    assert flight.stats() == {"inFlight": 0, "executed": 1, "coalesced": 3}
+
+
+def test_single_flight_propagates_errors_to_followers_and_cleans_up():
+    flight = SingleFlight()
+    release = Event()
+    errors = []
+
+    def failing():
+        release.wait(2)
+        raise ValueError("boom")
+
+    def call():
+        try:
+            flight.do("q", failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    leader = startThread(call)
+    waitUntil(lambda: flight.stats()["inFlight"] == 1)
+    follower = startThread(call)
+    waitUntil(lambda: flight.stats()["coalesced"] == 1)
+
+    release.set()
+    leader.join(2)
+    follower.join(2)
+
+    assert errors == ["boom", "boom"]
+    assert flight.stats()["inFlight"] == 0
+
+    # The failed key is gone, so the next call runs again.
+    assert flight.do("q", lambda: 42) == (42, False)
+
+
+def test_single_flight_keys_are_independent():
+    flight = SingleFlight()
+
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("b", lambda: 2) == (2, False)
+    assert flight.stats()["executed"] == 2
+
+
+def holdSlot(limiter, name, entered, release):
+    with limiter.slot(name, timeout=2):
+        entered.set()
+        release.wait(2)
+
+
+def test_per_name_limit_times_out_while_other_names_proceed():
+    limiter = ConcurrencyLimiter(globalLimit=4, defaultLimit=1, limits={"summarizer": 2})
+    entered, release = Event(), Event()
+
+    holder = startThread(holdSlot, limiter, "builder", entered, release)
+    assert entered.wait(2)
+
+    with pytest.raises(TimeoutError, match="builder slot"):
+        with limiter.slot("builder", timeout=0.05):
+            pass
+
+    with limiter.slot("summarizer", timeout=0.05):
+        assert limiter.stats()["inFlight"] == 2
+        assert limiter.stats()["perName"]["summarizer"]["limit"] == 2
+
+    release.set()
+    holder.join(2)
+
+    assert limiter.stats()["inFlight"] == 0
+    assert limiter.stats()["queueDepth"] == 0
+
+
+def test_global_limit_applies_across_names_and_releases_the_name_slot():
+    limiter = ConcurrencyLimiter(globalLimit=1, defaultLimit=2)
+    entered, release = Event(), Event()
+
+    holder = startThread(holdSlot, limiter, "builder", entered, release)
+    assert entered.wait(2)
+
+    with pytest.raises(TimeoutError, match="global slot"):
+        with limiter.slot("summarizer", timeout=0.05):
+            pass
+
+    assert limiter.stats()["perName"]["summarizer"]["queued"] == 0
+    assert limiter.stats()["maxQueueDepth"] == 1
+
+    release.set()
+    holder.join(2)
+
+    # The timed-out caller gave its name slot back, so both are free now.
+    assert limiter._semaphore("summarizer").acquire(timeout=0.05)
+    assert limiter._semaphore("summarizer").acquire(timeout=0.05)
+
+
+def test_queued_caller_gets_the_slot_when_it_frees():
+    limiter = ConcurrencyLimiter(globalLimit=1, defaultLimit=1)
+    entered, release = Event(), Event()
+    order = []
+
+    holder = startThread(holdSlot, limiter, "builder", entered, release)
+    assert entered.wait(2)
+
+    def waiter():
+        with limiter.slot("builder", timeout=2):
+            order.append("waiter")
+
+    queued = startThread(waiter)
+    waitUntil(lambda: limiter.stats()["queueDepth"] == 1)
+
+    order.append("release")
+    release.set()
+    holder.join(2)
+    queued.join(2)
+
+    assert order == ["release", "waiter"]
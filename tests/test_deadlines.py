@@ -0,0 +1,93 @@
+"""Tests for request deadlines and hedged LLM calls."""
+
+import threading
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.prompt_values import StringPromptValue
+
+import app.core.llm as llm
+from app.core.concurrency import ConcurrencyLimiter
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, requestDeadline, timeoutFor
+from app.core.latency import LatencyTracker
+from app.db.mongo import aggregationMaxTimeMs
+
+
+class SlowFirstModel:
+    """First call stalls (a tail-latency outlier); later calls answer immediately."""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, promptValue):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+
+        if call == 1:
+            time.sleep(1.0)
+            return AIMessage(content="slow")
+
+        return AIMessage(content="fast")
+
+
+def test_hedged_request_returns_first_answer(monkeypatch):
+    monkeypatch.setattr(settings, "llmHedgingEnabled", True)
+    monkeypatch.setattr(settings, "llmHedgeMinDelaySeconds", 0.01)
+    monkeypatch.setattr(llm, "agentLatency", LatencyTracker(minSamples=1))
+    llm.agentLatency.observe(0.05, "suggested_questions", "model")
+
+    model = SlowFirstModel()
+    startedAt = time.perf_counter()
+
+    message = llm.invokeModel("suggested_questions", "model", model, StringPromptValue(text="hi"), timeout=5)
+
+    assert message.content == "fast"
+    assert model.calls == 2
+    assert time.perf_counter() - startedAt < 0.5
+
+
+def test_deadline_clamps_timeouts_and_expires():
+    assert timeoutFor(30) == 30
+
+    with requestDeadline(0.2):
+        assert timeoutFor(30) <= 0.2
+        assert aggregationMaxTimeMs() <= 200
+
+        # An inner, looser deadline doesn't extend the outer one.
+        with requestDeadline(60) as deadline:
+            assert deadline.seconds == 0.2
+
+        time.sleep(0.25)
+
+        with pytest.raises(DeadlineExceeded):
+            timeoutFor(30)
+
+
+def test_losing_primary_keeps_its_slot_until_it_finishes(monkeypatch):
+    monkeypatch.setattr(settings, "llmHedgingEnabled", True)
+    monkeypatch.setattr(settings, "llmHedgeMinDelaySeconds", 0.01)
+    monkeypatch.setattr(llm, "agentLatency", LatencyTracker(minSamples=1))
+    monkeypatch.setattr(llm, "llmLimiter", ConcurrencyLimiter(globalLimit=4, defaultLimit=4))
+    llm.agentLatency.observe(0.05, "suggested_questions", "model")
+
+    model = SlowFirstModel()
+
+    with llm.llmLimiter.slot("suggested_questions") as lease:
+        message = llm.invokeModel(
+            "suggested_questions", "model", model, StringPromptValue(text="hi"), timeout=5, lease=lease,
+        )
+
+    assert message.content == "fast"
+
+    # The hedge won; the slow primary is still running and still holds the caller's slot.
+    assert llm.llmLimiter.stats()["inFlight"] == 1
+
+    deadline = time.monotonic() + 3
+    while llm.llmLimiter.stats()["inFlight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert llm.llmLimiter.stats()["inFlight"] == 0
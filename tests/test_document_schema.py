@@ -0,0 +1,90 @@
+"""Tests for the versioned document schema and the compact ingest layout."""
+
+from datetime import datetime
+
+import pytest
+
+from app.db.document_schema import (
+    DocumentBuilder,
+    fieldCatalogFor,
+    fieldSpecs,
+    layoutSizeReport,
+    renderFieldCatalog,
+)
+from app.utils.field_catalog import FIELD_CATALOG_PATH
+
+
+HEADERS = [
+    "Creation Date", "Purchase Date", "Fiscal Year", "Department Name", "Supplier Qualifications",
+    "CalCard", "Quantity", "Unit Price", "Total Price", "LPA Number",
+]
+
+ROW = {
+    "Creation Date": "8/15/2013",
+    "Purchase Date": "",
+    "Fiscal Year": "2013-2014",
+    "Department Name": " Corrections and Rehabilitation ",
+    "Supplier Qualifications": "CA-SB CA-DVBE",
+    "CalCard": "NO",
+    "Quantity": "12",
+    "Unit Price": "$1,250.50",
+    "Total Price": "$15,006.00",
+    "LPA Number": "",
+}
+
+
+def test_field_catalog_is_generated_from_the_schema():
+    current = FIELD_CATALOG_PATH.read_text(encoding="utf-8").replace("\r\n", "\n")
+
+    assert renderFieldCatalog(fieldCatalogFor("flat")) == current
+
+
+def test_compact_catalog_describes_converted_fields():
+    catalog = fieldCatalogFor("compact")
+
+    assert catalog["calcard"]["type"] == "boolean"
+    assert "enums" not in catalog["calcard"]
+    assert catalog["supplier_qualifications"]["type"] == "array"
+    assert all("ingest" not in spec and "layouts" not in spec for spec in catalog.values())
+
+    with pytest.raises(ValueError):
+        fieldCatalogFor("columnar")
+
+
+def test_flat_layout_keeps_every_column():
+    doc = DocumentBuilder(HEADERS, "flat").build(ROW)
+
+    assert doc["creation_date"] == datetime(2013, 8, 15)
+    assert doc["purchase_date"] is None and doc["lpa_number"] is None
+    assert doc["department_name"] == "Corrections and Rehabilitation"
+    assert doc["supplier_qualifications"] == "CA-SB CA-DVBE"
+    assert doc["calcard"] == "NO"
+    assert doc["quantity"] == 12.0 and isinstance(doc["quantity"], float)
+    assert doc["fiscal_year_start"] == 2013 and doc["fiscal_quarter"] == 1
+
+
+def test_compact_layout_drops_nulls_and_normalizes_values():
+    doc = DocumentBuilder(HEADERS, "compact").build(ROW)
+
+    assert "purchase_date" not in doc and "lpa_number" not in doc
+    assert doc["supplier_qualifications"] == ["CA-SB", "CA-DVBE"]
+    assert doc["calcard"] is False
+    assert doc["quantity"] == 12 and isinstance(doc["quantity"], int)
+    assert doc["unit_price"] == 1250.5
+
+
+def test_compact_layout_keeps_whole_prices_as_doubles():
+    # The catalog describes prices as usd_float; only int_or_float fields are narrowed.
+    doc = DocumentBuilder(HEADERS, "compact").build(ROW)
+    specs = fieldSpecs("compact")
+
+    assert doc["total_price"] == 15006.0 and isinstance(doc["total_price"], float)
+    assert specs["total_price"]["format"] == specs["unit_price"]["format"] == "usd_float"
+    assert specs["quantity"]["format"] == "int_or_float"
+
+
+def test_size_report_compares_layouts():
+    report = layoutSizeReport([ROW, dict(ROW, **{"Supplier Qualifications": ""})], HEADERS)
+
+    assert report["flat"]["documents"] == report["compact"]["documents"] == 2
+    assert report["compact"]["bytes"] < report["flat"]["bytes"]
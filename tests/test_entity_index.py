@@ -0,0 +1,117 @@
+"""Tests for entity mention resolution and index rebuilds."""
+
+import pytest
+
+import app.db.entity_index as entityIndexModule
+from app.db.entity_index import EntityIndex
+
+
+VALUES = {
+    "department_name": [
+        "Corrections and Rehabilitation, Department of",
+        "Health Care Services, Department of",
+        "Public Health, Department of",
+        "Transportation, Department of",
+    ],
+    "supplier_name": [
+        "Dell Marketing L.P.",
+        "Dell Computer Corporation",
+        "CDW Government LLC",
+        "Hewlett-Packard Company",
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def index():
+    return EntityIndex(VALUES)
+
+
+def topValue(index, mention):
+    matches = index.lookup(mention)
+    return matches[0].value if matches else None
+
+
+def test_exact_names_resolve_with_full_score(index):
+    matches = index.lookup("Dell Marketing L.P.")
+
+    assert matches[0].value == "Dell Marketing L.P."
+    assert matches[0].score == 1.0
+    assert topValue(index, "Health Care Services, Department of") == "Health Care Services, Department of"
+
+
+def test_partial_mentions_resolve(index):
+    assert topValue(index, "Dell Marketing") == "Dell Marketing L.P."
+    assert topValue(index, "Corrections") == "Corrections and Rehabilitation, Department of"
+    assert topValue(index, "CDW") == "CDW Government LLC"
+    assert topValue(index, "Department of Transportation") == "Transportation, Department of"
+
+
+def test_prefixes_and_typos_resolve_below_exact_matches(index):
+    prefix = index.lookup("Corr")
+    typo = index.lookup("Transportaton")
+
+    assert prefix[0].value == "Corrections and Rehabilitation, Department of"
+    assert typo[0].value == "Transportation, Department of"
+    assert prefix[0].score < index.lookup("Corrections")[0].score
+
+
+def test_legal_suffixes_are_ignored(index):
+    assert index.lookup("Dell LP")[0].score == index.lookup("Dell")[0].score
+    assert index.lookup("L.P.") == []
+
+
+def test_ambiguous_mentions_return_every_candidate_best_first(index):
+    dell = index.lookup("Dell")
+    health = index.lookup("Health")
+
+    assert {m.value for m in dell} == {"Dell Marketing L.P.", "Dell Computer Corporation"}
+    assert {m.value for m in health} == {"Health Care Services, Department of", "Public Health, Department of"}
+
+    # Fewer extra words ranks first.
+    assert health[0].value == "Public Health, Department of"
+
+
+def test_unrelated_mentions_and_field_filter(index):
+    assert index.lookup("Oracle") == []
+    assert index.lookup("Dell Oracle") == []
+    assert index.lookup("Dell", field="department_name") == []
+
+
+def test_resolve_finds_mentions_in_a_question(index):
+    matches = index.resolve("How much did Corrections spend with Dell Marketing in 2014?")
+
+    assert {(m.field, m.value) for m in matches} == {
+        ("department_name", "Corrections and Rehabilitation, Department of"),
+        ("supplier_name", "Dell Marketing L.P."),
+    }
+
+
+def test_failed_builds_back_off_and_keep_the_previous_index(monkeypatch):
+    calls = []
+
+    def failingCollection():
+        calls.append(1)
+        raise ConnectionError("mongo down")
+
+    monkeypatch.setattr(entityIndexModule, "getCollection", failingCollection)
+    monkeypatch.setattr(entityIndexModule, "_entityIndex", None)
+    monkeypatch.setattr(entityIndexModule, "_failures", 0)
+    monkeypatch.setattr(entityIndexModule, "_nextAttemptAt", 0.0)
+    monkeypatch.setattr(entityIndexModule, "_entityIndexStats", {})
+    monkeypatch.setattr(entityIndexModule, "Thread", lambda target, **kwargs: type("T", (), {"start": staticmethod(target)})())
+
+    assert entityIndexModule.getEntityIndex() is None
+    assert len(calls) == 1
+
+    # Still inside the retry window: requests don't trigger another build.
+    assert entityIndexModule.getEntityIndex() is None
+    assert len(calls) == 1
+
+    with pytest.raises(ConnectionError):
+        entityIndexModule.refreshEntityIndex()
+
+    stats = entityIndexModule.getEntityIndexStats()
+    assert stats["failures"] == 2
+    assert "mongo down" in stats["lastError"]
+    assert entityIndexModule.resolveEntities("Dell Marketing") == []
@@ -0,0 +1,118 @@
+"""Tests for streaming full-result exports."""
+
+import csv
+import io
+import json
+
+import zstandard
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.db.export as export
+from app.api.routes.export import router
+from app.db.export import stripRowLimits
+from app.db.pipeline_registry import getPipelineRegistry
+
+
+PIPELINE = [
+    {"$group": {"_id": "$supplier_name", "totalSpend": {"$sum": "$total_price"}}},
+    {"$sort": {"totalSpend": -1}},
+    {"$limit": 30},
+    {"$project": {"_id": 0, "supplier_name": "$_id", "totalSpend": 1}},
+]
+
+COLUMNS = [{"name": "supplier_name", "type": "TEXT"}, {"name": "totalSpend", "type": "MONEY"}]
+
+
+def makeClient(monkeypatch, seenPipelines):
+    def fakeCursor(pipeline):
+        seenPipelines.append(pipeline)
+        return iter([
+            [{"totalSpend": 30.5, "supplier_name": "Acme"}, {"totalSpend": 20.0, "supplier_name": "Beta"}],
+            [{"totalSpend": 10.0, "supplier_name": "Gamma, Inc"}],
+        ])
+
+    monkeypatch.setattr(export, "openExportCursor", fakeCursor)
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+
+    return TestClient(app)
+
+
+def test_strip_row_limits_keeps_explicit_top_n():
+    topTen = [{"$sort": {"x": -1}}, {"$limit": 10}]
+    capped = [{"$match": {}}, {"$limit": 30}, {"$project": {"x": 1}}]
+
+    assert stripRowLimits(topTen) == topTen
+    assert stripRowLimits(capped) == [{"$match": {}}, {"$project": {"x": 1}}]
+
+
+def test_strip_row_limits_keeps_a_top_n_equal_to_the_default_cap():
+    topThirty = [{"$group": {"_id": "$supplier_name", "spend": {"$sum": "$total_price"}}}, {"$sort": {"spend": -1}}, {"$limit": 30}]
+    unordered = [{"$match": {}}, {"$limit": 5}, {"$sort": {"x": -1}}, {"$limit": 30}]
+
+    assert stripRowLimits(topThirty) == topThirty
+    assert stripRowLimits(unordered) == [{"$match": {}}, {"$sort": {"x": -1}}, {"$limit": 30}]
+
+
+def test_strip_row_limits_keeps_top_n_after_order_preserving_stages():
+    projected = [{"$sort": {"x": -1}}, {"$project": {"y": "$x"}}, {"$limit": 10}]
+    regrouped = [{"$sort": {"x": -1}}, {"$group": {"_id": "$y"}}, {"$limit": 10}]
+    skipped = [{"$sort": {"x": -1}}, {"$skip": 10}, {"$set": {"z": 1}}, {"$limit": 10}]
+
+    assert stripRowLimits(projected) == projected
+    assert stripRowLimits(regrouped) == regrouped[:2]
+    assert stripRowLimits(skipped) == skipped
+
+
+def test_arrow_format_is_not_offered(monkeypatch):
+    client = makeClient(monkeypatch, [])
+
+    assert client.post("/api/export", json={"pipeline": PIPELINE, "format": "arrow"}).status_code == 422
+
+
+def test_export_by_hash_streams_csv_in_column_order(monkeypatch):
+    seen = []
+    client = makeClient(monkeypatch, seen)
+    key = getPipelineRegistry().register(PIPELINE, COLUMNS)
+
+    response = client.get(f"/api/export/{key}", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert list(csv.reader(io.StringIO(response.text))) == [
+        ["supplier_name", "totalSpend"],
+        ["Acme", "30.5"],
+        ["Beta", "20.0"],
+        ["Gamma, Inc", "10.0"],
+    ]
+    assert {"$limit": 30} in seen[0]
+
+
+def test_export_ndjson_with_zstd(monkeypatch):
+    client = makeClient(monkeypatch, [])
+
+    response = client.post(
+        "/api/export",
+        json={"pipeline": PIPELINE, "format": "ndjson"},
+        headers={"Accept-Encoding": "zstd"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "zstd"
+
+    # httpx decodes zstd itself when zstandard is installed.
+    body = response.content
+    if body[:4] == b"\x28\xb5\x2f\xfd":
+        body = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+
+    rows = [json.loads(line) for line in body.decode().splitlines()]
+    assert [row["supplier_name"] for row in rows] == ["Acme", "Beta", "Gamma, Inc"]
+
+
+def test_export_rejects_writes_and_unknown_hashes(monkeypatch):
+    client = makeClient(monkeypatch, [])
+
+    assert client.post("/api/export", json={"pipeline": [{"$out": "copy"}]}).status_code == 400
+    assert client.get("/api/export/unknown").status_code == 404
@@ -0,0 +1,32 @@
+"""Tests that package imports stay lazy."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _loadedAfter(statement: str, modules):
+    code = f"import sys; {statement}; print(','.join(m for m in {modules!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return [m for m in output.stdout.strip().split(",") if m]
+
+
+def test_single_agent_schema_does_not_load_llm_stack():
+    assert _loadedAfter(
+        "import app.agents.result_summarizer.schemas",
+        ["langchain_openai", "langchain_core.prompts", "app.agents.orchestrator.orchestrator", "app.core.llm"],
+    ) == []
+
+
+def test_utils_submodule_does_not_load_bson():
+    assert _loadedAfter("from app.utils import loadFieldCatalog", ["bson", "orjson"]) == []
+
+
+def test_lazy_exports_resolve():
+    assert _loadedAfter(
+        "from app.agents.orchestrator import runProcurementAssistant; from app.utils import dumpsJson",
+        ["app.agents.orchestrator.orchestrator", "bson"],
+    ) == ["app.agents.orchestrator.orchestrator", "bson"]
@@ -0,0 +1,130 @@
+"""Tests for follow-up pipelines evaluated on cached result rows."""
+
+import pytest
+
+import app.agents.orchestrator.orchestrator as orchestrator
+from app.agents.mongo_query_builder import MongoQueryOutput
+from app.db.local_aggregation import runLocalAggregation, UnsupportedPipelineError
+import app.db.session_store as sessionStoreModule
+from app.db.pipeline_policy import PipelinePolicyError, pipelinePolicy
+from app.db.session_store import MongoSessionBackend, Session, SessionBackend, SessionStore, SessionTurn
+
+
+ROWS = [
+    {"supplier_name": "Acme", "calendar_year": 2013, "totalSpend": 300.0},
+    {"supplier_name": "Beta", "calendar_year": 2013, "totalSpend": 100.0},
+    {"supplier_name": "Acme", "calendar_year": 2014, "totalSpend": 50.0},
+    {"supplier_name": "Gamma", "calendar_year": 2014, "totalSpend": 200.0},
+]
+
+
+def test_top_n_follow_up():
+    pipeline = [{"$sort": {"totalSpend": -1}}, {"$limit": 2}]
+
+    results = runLocalAggregation(ROWS, pipeline)
+
+    assert [row["supplier_name"] for row in results] == ["Acme", "Gamma"]
+
+
+def test_regroup_and_filter_follow_up():
+    pipeline = [
+        {"$match": {"totalSpend": {"$gte": 100}}},
+        {"$group": {"_id": "$calendar_year", "totalSpend": {"$sum": "$totalSpend"}, "suppliers": {"$sum": 1}}},
+        {"$project": {"_id": 0, "calendar_year": "$_id", "totalSpend": 1, "suppliers": 1}},
+        {"$sort": {"calendar_year": 1}},
+    ]
+
+    results = runLocalAggregation(ROWS, pipeline)
+
+    assert results == [
+        {"totalSpend": 400.0, "suppliers": 2, "calendar_year": 2013},
+        {"totalSpend": 200.0, "suppliers": 1, "calendar_year": 2014},
+    ]
+
+
+def test_high_cardinality_group_follow_up_runs_on_cached_rows(monkeypatch):
+    # supplier_name has ~30,000 values in the collection, but only three in the cached rows.
+    monkeypatch.setattr(pipelinePolicy, "cardinality", {"supplier_name": 30000, "calendar_year": 3}.get)
+    monkeypatch.setattr(pipelinePolicy, "documentCount", lambda: 300000)
+
+    def mongoAggregation(pipeline, columns=None):
+        raise AssertionError("cached follow-ups must not query MongoDB")
+
+    monkeypatch.setattr(orchestrator, "runAggregation", mongoAggregation)
+
+    previousPipeline = [{"$match": {"calendar_year": {"$gte": 2013}}}]
+    followUp = MongoQueryOutput(
+        pipeline=[
+            {"$group": {"_id": "$supplier_name", "totalSpend": {"$sum": "$totalSpend"}}},
+            {"$sort": {"totalSpend": -1}},
+        ],
+        columns=[{"name": "_id", "type": "TEXT"}, {"name": "totalSpend", "type": "MONEY"}],
+        applyToPrevious=True,
+    )
+    cached = SessionTurn(message="q", normalizedQuery="q", pipeline=previousPipeline, results=ROWS, resultCount=len(ROWS))
+
+    pipeline, results = orchestrator._executeQuery(followUp, cached)
+
+    assert pipeline == previousPipeline + followUp.pipeline
+    assert [row["_id"] for row in results] == ["Acme", "Gamma", "Beta"]
+
+    # Without cached rows the combined pipeline goes to MongoDB and the group guard applies.
+    with pytest.raises(PipelinePolicyError, match="supplier_name"):
+        orchestrator._executeQuery(followUp, cached.model_copy(update={"results": None}))
+
+
+def test_unsupported_stage_raises():
+    with pytest.raises(UnsupportedPipelineError):
+        runLocalAggregation(ROWS, [{"$lookup": {"from": "other"}}])
+
+
+def test_session_store_evicts_least_recently_used():
+    store = SessionStore(maxSessions=2)
+
+    for sessionId in ("a", "b"):
+        store.appendTurn(Session(sessionId=sessionId), SessionTurn(message="q", normalizedQuery="q"))
+
+    store.get("a")
+    store.appendTurn(Session(sessionId="c"), SessionTurn(message="q", normalizedQuery="q"))
+
+    assert store.get("a") is not None
+    assert store.get("b") is None
+    assert store.get("c") is not None
+
+
+class FailingBackend(SessionBackend):
+    def load(self, sessionId):
+        return None
+
+    def save(self, session):
+        raise RuntimeError("mongo down")
+
+
+def test_session_save_failure_keeps_the_turn_in_memory():
+    store = SessionStore(maxSessions=2, backend=FailingBackend())
+
+    store.appendTurn(Session(sessionId="a"), SessionTurn(message="q", normalizedQuery="q"))
+
+    assert len(store.get("a").turns) == 1
+
+
+def test_mongo_session_save_drops_oldest_rows_to_fit(monkeypatch):
+    saved = {}
+
+    class FakeCollection:
+        def replace_one(self, query, doc, upsert):
+            saved["doc"] = doc
+
+    monkeypatch.setattr(sessionStoreModule, "MAX_SESSION_DOCUMENT_BYTES", 20000)
+    monkeypatch.setattr(MongoSessionBackend, "_collection", lambda self: FakeCollection())
+
+    rows = [{"supplier": f"Supplier {i}", "spend": float(i)} for i in range(200)]
+    session = Session(sessionId="a", turns=[
+        SessionTurn(message=q, normalizedQuery=q, pipeline=[{"$limit": 1}], results=rows, resultCount=len(rows))
+        for q in ("first", "second")
+    ])
+
+    MongoSessionBackend("sessions").save(session)
+
+    assert [turn["results"] is None for turn in saved["doc"]["turns"]] == [True, False]
+    assert session.turns[0].results == rows
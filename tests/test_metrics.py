@@ -0,0 +1,29 @@
+"""Tests for Prometheus text exposition of in-process metrics."""
+
+from app.core.metrics import Counter, Histogram, MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram("test_duration_seconds", "Test.", ["agent"], buckets=(0.1, 1.0)))
+
+    histogram.observe(0.05, agent="builder")
+    histogram.observe(0.5, agent="builder")
+    histogram.observe(5.0, agent="builder")
+
+    lines = registry.render().splitlines()
+
+    assert 'test_duration_seconds_bucket{agent="builder",le="0.1"} 1' in lines
+    assert 'test_duration_seconds_bucket{agent="builder",le="1"} 2' in lines
+    assert 'test_duration_seconds_bucket{agent="builder",le="+Inf"} 3' in lines
+    assert 'test_duration_seconds_count{agent="builder"} 3' in lines
+
+
+def test_counter_labels_are_escaped():
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("test_events_total", "Test.", ["cache"]))
+
+    counter.inc(cache='say "hi"')
+    counter.inc(2, cache='say "hi"')
+
+    assert 'test_events_total{cache="say \\"hi\\""} 3' in registry.render().splitlines()
@@ -0,0 +1,37 @@
+"""Tests for per-agent model selection under a latency budget."""
+
+import time
+
+import app.core.llm as llm
+from app.core.config import settings
+from app.core.deadline import latencyBudget
+from app.core.latency import LatencyTracker
+
+
+def test_agent_model_overrides_and_budget_degrade(monkeypatch):
+    monkeypatch.setattr(settings, "openaiModel", "large")
+    monkeypatch.setattr(settings, "fastModel", "small")
+    monkeypatch.setattr(settings, "agentModels", {"suggested_questions": "small"})
+    monkeypatch.setattr(settings, "latencyBudgetReserveSeconds", 5.0)
+    monkeypatch.setattr(llm, "agentLatency", LatencyTracker(minSamples=1))
+
+    assert llm.selectModel("suggested_questions") == ("small", False)
+    assert llm.selectModel("mongo_query_builder") == ("large", False)
+
+    # No latency data yet: the reserve decides.
+    with latencyBudget(2.0):
+        assert llm.selectModel("mongo_query_builder") == ("small", True)
+
+    # Recent latency on the primary model fits in the remaining budget.
+    llm.agentLatency.observe(0.5, "mongo_query_builder", "large")
+    with latencyBudget(2.0):
+        assert llm.selectModel("mongo_query_builder") == ("large", False)
+
+
+def test_latency_budget_is_scoped():
+    with latencyBudget(0.05) as budget:
+        time.sleep(0.06)
+        assert budget.expired
+
+    with latencyBudget(0) as budget:
+        assert budget is None
@@ -0,0 +1,105 @@
+"""Tests for the MongoDB connection profile and pool metrics."""
+
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pymongo import MongoClient
+from pymongo.errors import WaitQueueTimeoutError
+
+import app.agents.orchestrator.orchestrator as orchestrator
+import app.db.mongo as mongo
+from app.agents.mongo_query_builder import MongoQueryOutput
+from app.agents.user_query_validator import ValidatorOutput
+from app.api.routes.chat import router
+from app.core.config import settings
+from app.core.metrics import renderMetrics
+
+
+def test_serving_and_ingest_profiles(monkeypatch):
+    monkeypatch.setattr(settings, "mongoMaxPoolSize", 20)
+    monkeypatch.setattr(settings, "mongoIngestMaxPoolSize", 2)
+    monkeypatch.setattr(settings, "mongoWaitQueueTimeoutMs", 1500)
+    monkeypatch.setattr(settings, "mongoCompressors", "zstd,zlib,unknown")
+
+    serving = mongo.mongoClientOptions("serving")
+    ingest = mongo.mongoClientOptions("ingest")
+
+    assert serving["maxPoolSize"] == 20 and ingest["maxPoolSize"] == 2
+    assert serving["waitQueueTimeoutMS"] == 1500
+    assert "zlib" in serving["compressors"].split(",")
+    assert "unknown" not in serving["compressors"]
+    assert serving["event_listeners"][0] is mongo.poolListeners["serving"]
+
+    # MongoClient connects lazily, so the options can be checked without a server.
+    client = MongoClient("mongodb://localhost:27017", **serving)
+    try:
+        assert client.options.pool_options.max_pool_size == 20
+        assert client.options.pool_options.wait_queue_timeout == 1.5
+    finally:
+        client.close()
+
+
+def test_analytics_read_preference_applies_to_the_collection_only(monkeypatch):
+    monkeypatch.setattr(settings, "mongoAnalyticsReadPreference", "secondaryPreferred")
+    monkeypatch.setattr(settings, "mongoMaxStalenessSeconds", 120)
+
+    client = MongoClient("mongodb://localhost:27017", connect=False)
+    monkeypatch.setattr(mongo, "getMongoClient", lambda: client)
+    try:
+        collection = mongo.getCollection()
+
+        assert collection.read_preference.mongos_mode == "secondaryPreferred"
+        assert collection.read_preference.max_staleness == 120
+        assert client[settings.mongodbDb][settings.sessionCollection].read_preference.mongos_mode == "primary"
+    finally:
+        client.close()
+
+
+def test_pool_listener_tracks_checkouts_and_waits():
+    listener = mongo.PoolMetricsListener("test")
+    address = ("localhost", 27017)
+
+    listener.connection_created(SimpleNamespace(address=address, connection_id=1))
+    listener.connection_checked_out(SimpleNamespace(address=address, connection_id=1, duration=0.002))
+    listener.connection_checked_out(SimpleNamespace(address=address, connection_id=2, duration=0.004))
+    listener.connection_checked_in(SimpleNamespace(address=address, connection_id=1))
+    listener.connection_check_out_failed(SimpleNamespace(address=address, reason="timeout", duration=1.5))
+
+    assert listener.stats() == {"open": 1, "checkedOut": 1}
+
+    text = renderMetrics()
+    assert 'procurement_mongo_pool_checkout_wait_seconds_count{client="test"} 3' in text
+    assert 'procurement_mongo_pool_events_total{client="test",event="checkoutFailed:timeout"} 1' in text
+
+
+def test_exhausted_pool_answers_503_without_a_refinement_retry(monkeypatch):
+    builderCalls = []
+
+    def fakeBuilder(normalizedQuery, history, collectionName, **kwargs):
+        builderCalls.append(kwargs.get("refinement"))
+        return MongoQueryOutput(
+            pipeline=[{"$group": {"_id": "$department_name", "n": {"$sum": 1}}}],
+            columns=[{"name": "_id", "type": "TEXT"}, {"name": "n", "type": "NUMERIC"}],
+        )
+
+    def exhaustedPool(pipeline, columns=None):
+        raise WaitQueueTimeoutError("Timed out while checking out a connection from connection pool")
+
+    monkeypatch.setattr(settings, "singleFlightEnabled", False)
+    monkeypatch.setattr(orchestrator, "runUserQueryValidator", lambda message, history: ValidatorOutput(isValid=True, normalizedQuery=message))
+    monkeypatch.setattr(orchestrator, "resolveEntities", lambda query: [])
+    monkeypatch.setattr(orchestrator, "runMongoQueryBuilder", fakeBuilder)
+    monkeypatch.setattr(orchestrator, "runAggregation", exhaustedPool)
+    monkeypatch.setattr(orchestrator, "enforcePipelinePolicy", lambda pipeline: pipeline)
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+
+    response = TestClient(app).post("/api/chat", json={"message": "Purchases per department"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json()["status"] == "unavailable"
+    assert builderCalls == [None]
+
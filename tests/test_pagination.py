@@ -0,0 +1,167 @@
+"""Tests for paging large chat result sets."""
+
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.db.pagination as pagination
+from app.api.routes.results import router
+from app.core.config import settings
+from app.db.local_aggregation import runLocalAggregation
+from app.db.pagination import ResultSetCache, firstPage, keysetPipeline, keysetSortSpec
+from app.db.pipeline_registry import getPipelineRegistry
+
+
+PIPELINE = [
+    {"$group": {"_id": "$supplier_name", "totalSpend": {"$sum": "$total_price"}}},
+    {"$project": {"_id": 0, "supplier_name": "$_id", "totalSpend": 1}},
+    {"$sort": {"totalSpend": -1}},
+]
+
+COLUMNS = [{"name": "supplier_name", "type": "TEXT"}, {"name": "totalSpend", "type": "MONEY"}]
+
+# The sort key is renamed by the final $project.
+RENAMED = [
+    {"$group": {"_id": "$supplier_name", "total": {"$sum": "$total_price"}}},
+    {"$sort": {"total": -1}},
+    {"$project": {"_id": 0, "supplier": "$_id", "spend": "$total"}},
+]
+
+# Ties on totalSpend make the supplier_name tiebreaker matter.
+ROWS = [{"supplier_name": f"Supplier {i:02d}", "totalSpend": float(i // 2)} for i in range(25)]
+
+
+def collectPages(client, token):
+    rows = []
+
+    while token:
+        response = client.get(f"/api/results/{token}")
+        assert response.status_code == 200
+        body = response.json()
+        rows.extend(body["data"])
+        token = body["page"]["nextToken"]
+
+    return rows
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "resultPageSize", 10)
+    monkeypatch.setattr(pagination, "resultSetCache", ResultSetCache(maxRows=1000))
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+
+    return TestClient(app)
+
+
+def test_sort_spec_uses_final_sort_then_tiebreakers():
+    assert keysetSortSpec(PIPELINE, ROWS[0]) == [("totalSpend", -1), ("supplier_name", 1)]
+
+    sortedGroups = [{"$group": {"_id": "$a", "n": {"$max": "$d"}}}, {"$sort": {"n": 1}}, {"$limit": 50}]
+    assert keysetSortSpec(sortedGroups, {"_id": "a", "n": datetime(2014, 1, 1), "x": {"y": 1}}) == [
+        ("n", 1),
+        ("_id", 1),
+    ]
+
+
+def test_sort_spec_is_empty_when_the_order_cant_be_reproduced():
+    row = {"supplier": "Acme", "spend": 10.0}
+
+    assert keysetSortSpec(PIPELINE[:1], row) == []
+    assert keysetSortSpec(RENAMED, row) == []
+    assert keysetSortSpec([{"$sort": {"spend": -1}}, {"$set": {"spend": {"$round": "$spend"}}}], row) == []
+    assert keysetSortSpec([{"$sort": {"spend": -1}}, {"$group": {"_id": "$supplier"}}], row) == []
+
+
+def test_pages_from_cache(client):
+    key = getPipelineRegistry().register(PIPELINE, COLUMNS)
+    page, info = firstPage(key, PIPELINE, ROWS)
+
+    assert len(page) == 10 and info["totalRows"] == 25
+    assert page[0]["totalSpend"] == 12.0
+
+    rest = collectPages(client, info["nextToken"])
+
+    expected = sorted(ROWS, key=lambda row: (-row["totalSpend"], row["supplier_name"]))
+    assert page + rest == expected
+
+
+def test_keyset_pages_match_cached_order(client, monkeypatch):
+    key = getPipelineRegistry().register(PIPELINE, COLUMNS)
+    page, info = firstPage(key, PIPELINE, ROWS)
+
+    # Evicted result set: later pages come from keyset queries (evaluated locally here).
+
+    queries = []
+
+    def fakeAggregation(pipeline, columns=None):
+        queries.append(pipeline)
+        return runLocalAggregation(ROWS, pipeline[len(PIPELINE):])
+
+    monkeypatch.setattr(pagination, "resultSetCache", ResultSetCache(maxRows=1000))
+    monkeypatch.setattr(pagination, "runAggregation", fakeAggregation)
+
+    rest = collectPages(client, info["nextToken"])
+
+    expected = sorted(ROWS, key=lambda row: (-row["totalSpend"], row["supplier_name"]))
+    assert page + rest == expected
+    assert all(not any("$skip" in stage for stage in query) for query in queries)
+
+
+def test_small_results_and_bad_tokens(client):
+    assert firstPage("k", PIPELINE, ROWS[:5]) == (ROWS[:5], None)
+    assert client.get("/api/results/not-a-token").status_code == 400
+
+    pipeline = keysetPipeline(PIPELINE, [("totalSpend", -1)], [3.0], 10)
+    assert pipeline[-2] == {"$match": {"$or": [{"$or": [{"totalSpend": {"$lt": 3.0}}, {"totalSpend": None}]}]}}
+
+
+def test_first_page_keeps_server_order_when_the_sort_key_is_renamed(client):
+    # Server order: largest spend first, which the renamed fields can't reproduce.
+    serverRows = [{"supplier": f"Supplier {i:02d}", "spend": float(100 - i)} for i in range(25)]
+    key = getPipelineRegistry().register(RENAMED, [])
+
+    page, info = firstPage(key, RENAMED, serverRows)
+
+    assert page == serverRows[:10]
+    assert collectPages(client, info["nextToken"]) == serverRows[10:]
+
+    # Without keyset keys the token can't outlive the cached rows.
+    pagination.resultSetCache = ResultSetCache(maxRows=1000)
+    assert client.get(f"/api/results/{info['nextToken']}").status_code == 410
+
+
+@pytest.mark.parametrize("direction", [1, -1])
+def test_keyset_pages_handle_null_missing_and_mixed_type_keys(client, monkeypatch, direction):
+    rows = []
+    for i in range(24):
+        row = {"supplier_name": f"Supplier {i:02d}"}
+        if i % 4 == 0:
+            row["totalSpend"] = None
+        elif i % 4 == 1:
+            row["totalSpend"] = f"n/a {i // 8}"
+        elif i % 4 == 2:
+            row["totalSpend"] = float(i // 3)
+        rows.append(row)
+
+    # Ascending: null and missing first, then numbers, then strings (explicit null row 0 leads).
+    pipeline = [{"$project": {"_id": 0, "supplier_name": 1, "totalSpend": 1}}, {"$sort": {"totalSpend": direction}}]
+    serverRows = runLocalAggregation(rows, pipeline[1:])
+    key = getPipelineRegistry().register(pipeline, [])
+
+    page, info = firstPage(key, pipeline, serverRows)
+    assert info["nextToken"] and pagination.decodePageToken(info["nextToken"])["k"] is not None
+
+    def fakeAggregation(keyset, columns=None):
+        return runLocalAggregation(serverRows, keyset[len(pipeline):])
+
+    monkeypatch.setattr(pagination, "resultSetCache", ResultSetCache(maxRows=1000))
+    monkeypatch.setattr(pagination, "runAggregation", fakeAggregation)
+
+    rest = collectPages(client, info["nextToken"])
+
+    assert len(page + rest) == len(serverRows)
+    assert page + rest == pagination.sortRows(serverRows, keysetSortSpec(pipeline, serverRows[0]))
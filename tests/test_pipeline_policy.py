@@ -0,0 +1,166 @@
+"""Tests for the pipeline safety and resource policy."""
+
+import pytest
+
+from app.db.pipeline_policy import CollectionCardinality, PipelinePolicy, PipelinePolicyError, estimateDistinct
+
+
+DISTINCT = {
+    "fiscal_year": 3, "department_name": 100, "supplier_name": 20000, "item_name": 150000,
+    "creation_date": 1500, "purchase_order_number": 250000,
+}
+
+
+def makePolicy(documents=300000):
+    return PipelinePolicy(
+        maxLimit=5000,
+        maxGroups=20000,
+        cardinality=DISTINCT.get,
+        documentCount=lambda: documents,
+    )
+
+
+@pytest.mark.parametrize("pipeline", [
+    [{"$match": {"fiscal_year": "2013-2014"}}, {"$out": "copy"}],
+    [{"$merge": {"into": "copy"}}],
+    [{"$lookup": {"from": "users", "localField": "a", "foreignField": "b", "as": "c"}}],
+    [{"$unionWith": "other"}],
+    [{"$match": {"$where": "this.total_price > 0"}}],
+    [{"$facet": {"a": [{"$group": {"_id": None, "f": {"$function": {"body": "x", "args": [], "lang": "js"}}}}]}}],
+    [{"$facet": {"a": [{"$limit": 1}], "b": [{"$out": "copy"}]}}],
+    [{"$collStats": {}}],
+])
+def test_unsafe_stages_and_operators_are_rejected(pipeline):
+    with pytest.raises(PipelinePolicyError) as excinfo:
+        makePolicy().enforce(pipeline)
+
+    assert excinfo.value.violations
+    assert "not allowed" in str(excinfo.value)
+
+
+def test_limits_are_clamped_without_touching_the_input():
+    pipeline = [{"$sort": {"total_price": -1}}, {"$limit": 1000000}]
+
+    enforced = makePolicy().enforce(pipeline)
+
+    assert enforced == [{"$sort": {"total_price": -1}}, {"$limit": 5000}]
+    assert pipeline[1] == {"$limit": 1000000}
+    assert makePolicy().enforce(pipeline, capLimits=False) == pipeline
+
+
+def test_high_cardinality_group_needs_a_limit():
+    group = {"$group": {"_id": "$item_name", "totalSpend": {"$sum": "$total_price"}}}
+
+    with pytest.raises(PipelinePolicyError) as excinfo:
+        makePolicy().enforce([group])
+
+    assert "item_name" in str(excinfo.value)
+    assert "$limit" in str(excinfo.value)
+
+    bounded = [group, {"$sort": {"totalSpend": -1}}, {"$limit": 10}]
+    assert makePolicy().enforce(bounded) == bounded
+    assert makePolicy().enforce([group], checkGroups=False) == [group]
+
+
+def test_group_estimate_uses_key_product_and_match_selectivity():
+    composite = {"$group": {"_id": {"y": "$fiscal_year", "d": "$department_name"}, "n": {"$sum": 1}}}
+    assert makePolicy().enforce([composite]) == [composite]
+
+    # 150,000 items, but one department's rows are ~3,000 documents.
+    filtered = [
+        {"$match": {"department_name": "Corrections"}},
+        {"$group": {"_id": "$item_name", "n": {"$sum": 1}}},
+    ]
+    assert makePolicy().enforce(filtered) == filtered
+
+    # Unknown fields and constant keys aren't estimated, so they aren't refused.
+    assert makePolicy().enforce([{"$group": {"_id": "$unknown_field"}}])
+    assert makePolicy().enforce([{"$group": {"_id": {"$literal": "$supplier_name"}}}])
+
+
+def test_expression_keys_are_bounded_by_the_fields_they_read():
+    # A date part has no more values than the date itself: 1,500 groups is fine.
+    assert makePolicy().enforce([{"$group": {"_id": {"$year": "$creation_date"}}}])
+
+    compound = {"$group": {"_id": {"s": "$supplier_name", "y": {"$year": "$creation_date"}}, "n": {"$sum": 1}}}
+
+    with pytest.raises(PipelinePolicyError, match="supplier_name, creation_date"):
+        makePolicy().enforce([compound])
+
+    bounded = [compound, {"$sort": {"n": -1}}, {"$limit": 10}]
+    assert makePolicy().enforce(bounded) == bounded
+
+
+def test_sort_by_count_is_checked_like_a_group():
+    with pytest.raises(PipelinePolicyError, match="purchase_order_number"):
+        makePolicy().enforce([{"$sortByCount": "$purchase_order_number"}])
+
+    bounded = [{"$sortByCount": "$purchase_order_number"}, {"$limit": 10}]
+    assert makePolicy().enforce(bounded) == bounded
+    assert makePolicy().enforce([{"$sortByCount": "$department_name"}])
+
+
+def test_catalog_enums_answer_cardinality_without_a_query(monkeypatch):
+    import app.db.pipeline_policy as policyModule
+
+    def failingCollection():
+        raise AssertionError("enum fields must not query MongoDB")
+
+    monkeypatch.setattr(policyModule, "getCollection", failingCollection)
+
+    cardinality = CollectionCardinality(timeoutMs=100, sampleSize=1000)
+
+    assert cardinality.distinct("acquisition_type") > 0
+    assert cardinality.distinct("not_a_field") is None
+
+
+class FakeCollection:
+    def __init__(self, result=None, documents=300000):
+        self.result = result
+        self.count = documents
+        self.pipelines = []
+
+    def aggregate(self, pipeline, **kwargs):
+        self.pipelines.append(pipeline)
+        if self.result is None:
+            raise TimeoutError("operation exceeded time limit")
+        return iter(self.result)
+
+    def estimated_document_count(self, **kwargs):
+        return self.count
+
+
+def test_distinct_counts_come_from_a_bounded_sample(monkeypatch):
+    import app.db.pipeline_policy as policyModule
+
+    # 1,000 of 289,000 rows sampled: 400 values seen once (each scaled by sqrt(289)), 100 seen repeatedly.
+    collection = FakeCollection([{"rows": 1000, "distinct": 500, "singletons": 400}], documents=289000)
+    monkeypatch.setattr(policyModule, "getCollection", lambda: collection)
+
+    cardinality = CollectionCardinality(timeoutMs=100, sampleSize=1000)
+
+    assert cardinality.distinct("supplier_name") == estimateDistinct(1000, 500, 400, 289000) == 100 + 400 * 17
+    assert cardinality.distinct("supplier_name") == 6900
+    assert len(collection.pipelines) == 1
+    assert collection.pipelines[0][0] == {"$sample": {"size": 1000}}
+
+
+def test_failed_estimates_are_not_cached(monkeypatch):
+    import app.db.pipeline_policy as policyModule
+
+    collection = FakeCollection(result=None)
+    monkeypatch.setattr(policyModule, "getCollection", lambda: collection)
+
+    cardinality = CollectionCardinality(timeoutMs=100, sampleSize=1000)
+
+    assert cardinality.distinct("supplier_name") is None
+
+    collection.result = [{"rows": 1000, "distinct": 20, "singletons": 0}]
+    assert cardinality.distinct("supplier_name") == 20
+    assert len(collection.pipelines) == 2
+
+
+def test_sample_covering_the_collection_is_exact():
+    assert estimateDistinct(800, 800, 800, 800) == 800
+    assert estimateDistinct(1000, 1000, 1000, 4000) == 2000
+    assert estimateDistinct(1000, 1000, 1000, None) == 1000
@@ -0,0 +1,25 @@
+"""Tests for the opt-in request sampling profiler."""
+
+import time
+
+from app.core.profiling import SamplingProfiler
+
+
+def _busyLoop(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+def test_profiler_samples_the_calling_thread():
+    with SamplingProfiler(interval=0.001) as profiler:
+        _busyLoop(0.05)
+
+    assert profiler.sampleCount > 0
+    assert "_busyLoop (tests/test_profiling.py" in profiler.collapsed()
+
+    document = profiler.speedscope("request")
+    profile = document["profiles"][0]
+
+    assert len(profile["samples"]) == len(profile["weights"])
+    assert "_busyLoop" in {frame["name"] for frame in document["shared"]["frames"]}
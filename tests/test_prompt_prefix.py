@@ -0,0 +1,39 @@
+"""Tests that agent prompts start with a stable, request-independent prefix."""
+
+import json
+
+from app.agents.mongo_query_builder import mongo_query_builder
+from app.utils.prompt_builder import renderFieldCatalog
+
+
+def _renderBuilderPrompt(monkeypatch, query, **kwargs):
+    captured = []
+
+    def fakeRunAgentChain(agentName, prompt, parser, variables):
+        captured.append(prompt.invoke(variables).to_messages())
+        raise RuntimeError("stop")
+
+    monkeypatch.setattr(mongo_query_builder, "runAgentChain", fakeRunAgentChain)
+
+    try:
+        mongo_query_builder.runMongoQueryBuilder(query, [], "purchases", **kwargs)
+    except RuntimeError:
+        pass
+
+    return captured[0]
+
+
+def test_builder_static_content_is_a_fixed_prefix(monkeypatch):
+    first = _renderBuilderPrompt(monkeypatch, "Top 10 suppliers by spend")
+    second = _renderBuilderPrompt(monkeypatch, "Spend by department", refinement="Use exact match")
+
+    assert first[0].content == second[0].content
+    assert renderFieldCatalog() in first[0].content
+    assert "Top 10 suppliers by spend" not in first[0].content
+    assert renderFieldCatalog() not in first[1].content
+
+
+def test_field_catalog_rendering_is_deterministic():
+    rendered = renderFieldCatalog()
+
+    assert rendered == json.dumps(json.loads(rendered), sort_keys=True, indent=2, ensure_ascii=False)
@@ -0,0 +1,72 @@
+"""Tests for the local query result checks."""
+
+from app.agents.mongo_query_builder.schemas import ColumnMetadata
+from app.agents.mongo_query_validator.heuristics import runHeuristicValidation
+
+
+def _columns(*names):
+    return [ColumnMetadata(name=name, type="TEXT") for name in names]
+
+
+def test_clean_grouped_results_skip_llm():
+    pipeline = [
+        {"$match": {"fiscal_year": "2014-2015"}},
+        {"$group": {"_id": "$department_name", "totalSpend": {"$sum": "$total_price"}}},
+        {"$project": {"_id": 0, "department_name": "$_id", "totalSpend": 1}},
+    ]
+    results = [
+        {"department_name": "Corrections and Rehabilitation, Department of", "totalSpend": 10.0},
+        {"department_name": "Water Resources, Department of", "totalSpend": 5.0},
+    ]
+
+    output = runHeuristicValidation(pipeline, results, _columns("department_name", "totalSpend"))
+
+    assert not output.isSuspicious
+    assert output.reasons == []
+
+
+def test_empty_results_escalate():
+    output = runHeuristicValidation([{"$limit": 30}], [], _columns("supplier_name"))
+
+    assert output.isSuspicious
+
+
+def test_regex_matching_several_entities_escalates():
+    pipeline = [
+        {"$match": {"department_name": {"$regex": "health", "$options": "i"}}},
+        {"$group": {"_id": "$department_name", "totalSpend": {"$sum": "$total_price"}}},
+        {"$project": {"_id": 0, "department_name": "$_id", "totalSpend": 1}},
+    ]
+    results = [
+        {"department_name": "Health Care Services, Department of", "totalSpend": 10.0},
+        {"department_name": "Public Health, Department of", "totalSpend": 5.0},
+    ]
+
+    output = runHeuristicValidation(pipeline, results, _columns("department_name", "totalSpend"))
+
+    assert output.isSuspicious
+    assert any("department_name" in reason for reason in output.reasons)
+
+
+def test_single_regex_entity_passes_with_context():
+    pipeline = [
+        {"$match": {"department_name": {"$regex": "health\\s+care", "$options": "i"}}},
+        {"$group": {"_id": "$department_name", "totalSpend": {"$sum": "$total_price"}}},
+    ]
+    results = [{"_id": "Health Care Services, Department of", "totalSpend": 10.0}]
+
+    output = runHeuristicValidation(pipeline, results, _columns("_id", "totalSpend"))
+
+    assert not output.isSuspicious
+    assert output.context == "Matched department_name: Health Care Services, Department of"
+
+
+def test_column_mismatch_and_null_columns_escalate():
+    pipeline = [{"$match": {}}, {"$limit": 30}]
+    results = [{"supplier_name": "Acme", "unit_price": None}, {"supplier_name": "Beta", "unit_price": None}]
+
+    output = runHeuristicValidation(pipeline, results, _columns("supplier_name", "total_price"))
+
+    assert output.isSuspicious
+    assert any("total_price" in reason for reason in output.reasons)
+    assert any("unit_price" in reason for reason in output.reasons)
@@ -0,0 +1,57 @@
+"""Tests for the local result digest used in agent prompts."""
+
+import json
+
+from app.core.config import settings
+from app.utils.result_digest import buildResultDigest, resultsForPrompt
+
+
+COLUMNS = [
+    {"name": "fiscal_year", "type": "YEAR"},
+    {"name": "department_name", "type": "TEXT"},
+    {"name": "totalSpend", "type": "MONEY"},
+]
+
+ROWS = [
+    {"fiscal_year": year, "department_name": f"Dept {d}", "totalSpend": float(100 * (d + 1) * (i + 1))}
+    for i, year in enumerate(["2012-2013", "2013-2014", "2014-2015"])
+    for d in range(20)
+]
+
+
+def test_digest_totals_ranks_and_period_deltas():
+    digest = buildResultDigest(ROWS, COLUMNS, topK=3)
+
+    assert digest["rowCount"] == 60
+    assert digest["measures"]["totalSpend"]["total"] == sum(row["totalSpend"] for row in ROWS)
+    assert digest["dimensions"]["department_name"]["distinct"] == 20
+    assert [row["totalSpend"] for row in digest["topRows"]] == [6000.0, 5700.0, 5400.0]
+    assert digest["bottomRows"][0]["totalSpend"] == 100.0
+
+    series = digest["periods"]["series"]
+    assert [point["period"] for point in series] == ["2012-2013", "2013-2014", "2014-2015"]
+    assert series[1]["deltaPct"] == 100.0
+    assert "delta" not in series[0]
+
+
+def test_prompt_uses_digest_only_for_large_results(monkeypatch):
+    monkeypatch.setattr(settings, "resultDigestMinRows", 30)
+
+    small = resultsForPrompt("result_summarizer", ROWS[:10], COLUMNS)
+    large = resultsForPrompt("result_summarizer", ROWS, COLUMNS)
+
+    assert json.loads(small) == ROWS[:10]
+    assert json.loads(large)["rowCount"] == 60
+    assert len(large) < len(json.dumps(ROWS))
+
+
+def test_raw_fallback_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "resultPromptMaxRows", 20)
+
+    monkeypatch.setattr(settings, "resultDigestMinRows", 0)
+    assert json.loads(resultsForPrompt("result_summarizer", ROWS, COLUMNS)) == ROWS[:20]
+
+    monkeypatch.setattr(settings, "resultDigestMinRows", 30)
+    assert json.loads(resultsForPrompt("mongo_query_validator", ROWS, None)) == ROWS[:20]
+    assert json.loads(resultsForPrompt("mongo_query_validator", ROWS[:10], None)) == ROWS[:10]
+
@@ -0,0 +1,92 @@
+"""Tests for the orjson response encoder against the previous JSONResponse path."""
+
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from bson import Decimal128, ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.api.responses import BsonJSONResponse
+from app.utils.serialization import convertObjectIds, dumpsJson, dumpsJsonText
+
+
+OBJECT_ID = ObjectId("5f1d7c2e9b1e8a3d4c5b6a79")
+
+
+def previousBody(content):
+    return json.loads(JSONResponse(jsonable_encoder(convertObjectIds(content))).body)
+
+
+def newBody(content):
+    return json.loads(BsonJSONResponse(content).body)
+
+
+def test_object_ids_match_the_previous_output():
+    content = {"_id": OBJECT_ID, "ids": [OBJECT_ID], "nested": {"ref": OBJECT_ID}}
+
+    assert newBody(content) == previousBody(content) == {
+        "_id": str(OBJECT_ID), "ids": [str(OBJECT_ID)], "nested": {"ref": str(OBJECT_ID)},
+    }
+
+
+def test_datetimes_match_the_previous_output():
+    content = {
+        "naive": datetime(2014, 7, 1, 12, 30, 5, 250000),
+        "utc": datetime(2014, 7, 1, tzinfo=timezone.utc),
+        "offset": datetime(2014, 7, 1, 8, tzinfo=timezone(timedelta(hours=-7))),
+    }
+
+    assert newBody(content) == previousBody(content) == {
+        "naive": "2014-07-01T12:30:05.250000",
+        "utc": "2014-07-01T00:00:00+00:00",
+        "offset": "2014-07-01T08:00:00-07:00",
+    }
+
+
+def test_decimals_match_the_previous_output():
+    content = {"whole": Decimal("1200"), "cents": Decimal("19.99"), "scaled": Decimal("1E+2")}
+
+    assert newBody(content) == previousBody(content) == {"whole": 1200, "cents": 19.99, "scaled": 100}
+
+
+def test_decimal128_is_encoded_as_its_number():
+    assert newBody({"total": Decimal128("1234.50"), "count": Decimal128("3")}) == {"total": 1234.5, "count": 3}
+
+
+def test_non_finite_numbers_become_null():
+    # The previous JSONResponse raised on these (allow_nan=False); null keeps the response valid.
+    content = {
+        "nan": float("nan"),
+        "inf": float("inf"),
+        "decimalNan": Decimal("NaN"),
+        "decimal128Inf": Decimal128("Infinity"),
+    }
+
+    assert json.loads(dumpsJson(content)) == dict.fromkeys(content)
+
+
+def test_nested_rows_match_the_previous_output():
+    content = {
+        "status": "ok",
+        "data": [
+            {
+                "_id": {"year": 2014, "department": "Corrections and Rehabilitation, Department of"},
+                "totalSpend": 1234567.89,
+                "supplierIds": [OBJECT_ID],
+                "firstOrder": datetime(2013, 1, 2),
+                "note": "Café supplies",
+                "missing": None,
+            },
+        ],
+        "columns": [{"name": "totalSpend", "type": "MONEY"}],
+        "byYear": {2014: 10, 2015: 12},
+    }
+
+    assert newBody(content) == previousBody(content)
+
+
+def test_text_and_indent_variants():
+    assert dumpsJsonText({"a": [1, 2]}) == '{"a":[1,2]}'
+    assert dumpsJson({"a": 1}, indent=True) == b'{\n  "a": 1\n}'
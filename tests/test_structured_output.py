@@ -0,0 +1,123 @@
+"""Tests for native structured output against a stub OpenAI-compatible server."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.agents.user_query_validator import user_query_validator
+from app.agents.user_query_validator.schemas import ValidatorOutput
+from app.core.config import settings
+from app.core.llm import NativeStructuredOutput
+from app.utils.prompt_builder import buildAgentPrompt
+
+
+REPLY = {"isValid": True, "clarifyingQuestion": "", "normalizedQuery": "Total spend by fiscal year"}
+
+
+class StubOpenAI(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StubOpenAI.requests.append(body)
+
+        content = json.dumps(REPLY)
+        if "response_format" not in body:
+            content = f"```json\n{content}\n```"
+
+        payload = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content, "refusal": None},
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stubServer(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenAI)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    StubOpenAI.requests = []
+    monkeypatch.setenv("OPENAI_API_BASE", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setattr(settings, "openaiApiKey", "sk-test")
+    monkeypatch.setattr(settings, "llmHedgingEnabled", False)
+
+    yield StubOpenAI.requests
+
+    server.shutdown()
+
+
+def runValidator(monkeypatch, mode):
+    monkeypatch.setattr(settings, "agentStructuredOutput", {"user_query_validator": mode})
+    return user_query_validator.runUserQueryValidator("total spend by fiscal year?", [])
+
+
+def test_native_mode_drops_format_instructions_from_the_request(monkeypatch, stubServer):
+    parsed = runValidator(monkeypatch, "parser")
+    native = runValidator(monkeypatch, "native")
+
+    assert parsed == native == ValidatorOutput(**REPLY)
+
+    parserRequest, nativeRequest = stubServer
+    parserSystem = parserRequest["messages"][0]["content"]
+    nativeSystem = nativeRequest["messages"][0]["content"]
+
+    assert "response_format" not in parserRequest
+    assert nativeRequest["response_format"]["type"] == "json_schema"
+    assert "isValid" in json.dumps(nativeRequest["response_format"]["json_schema"]["schema"])
+
+    # Same instructions minus the schema dump.
+    assert parserSystem.startswith(nativeSystem)
+    assert "The output should be formatted as a JSON instance" in parserSystem
+    assert "The output should be formatted as a JSON instance" not in nativeSystem
+    assert nativeRequest["response_format"]["json_schema"]["strict"] is True
+    assert len(json.dumps(nativeRequest["messages"])) < len(json.dumps(parserRequest["messages"]))
+
+
+def test_native_prompt_is_a_stable_prefix_per_mode():
+    parserPrompt, parser = buildAgentPrompt(
+        user_query_validator.PROMPTS_DIR, "validator_system.txt", "validator_user.txt", ValidatorOutput
+    )
+    nativePrompt, native = buildAgentPrompt(
+        user_query_validator.PROMPTS_DIR, "validator_system.txt", "validator_user.txt", ValidatorOutput, native=True
+    )
+
+    assert isinstance(native, NativeStructuredOutput)
+    assert parser.get_format_instructions() in parserPrompt.messages[0].content
+    assert nativePrompt.messages[0].content == parserPrompt.messages[0].content[: len(nativePrompt.messages[0].content)]
+
+
+def test_free_form_schemas_are_sent_non_strict():
+    from app.agents.mongo_query_builder.schemas import MongoQueryOutput
+
+    assert NativeStructuredOutput(ValidatorOutput).strict
+    assert not NativeStructuredOutput(MongoQueryOutput).strict
+
+
+def test_refusal_raises_a_parser_error():
+    from langchain_core.exceptions import OutputParserException
+    from langchain_core.messages import AIMessage
+
+    output = {"raw": AIMessage(content="", additional_kwargs={"refusal": "I can't help"}), "parsed": None}
+
+    with pytest.raises(OutputParserException, match="I can't help"):
+        NativeStructuredOutput(ValidatorOutput).parse(output)
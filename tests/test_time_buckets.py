@@ -0,0 +1,208 @@
+"""Tests for the time-bucketed layout and pipeline rewriting."""
+
+import random
+from datetime import datetime
+
+import pytest
+
+import app.db.mongo as mongo
+from app.core.config import settings
+from app.db.document_schema import computeDateFields
+from app.db.local_aggregation import runLocalAggregation
+from app.db.time_buckets import LINES_FIELD, TimeBucketBuilder, TimeBucketRewriter, parseDate
+
+
+DIMENSIONS = ["department_name", "acquisition_type"]
+
+DEPARTMENTS = ["Corrections and Rehabilitation", "Water Resources", "State Hospitals"]
+
+
+def makeDocs(count=600):
+    rng = random.Random(7)
+    docs = []
+
+    for i in range(count):
+        doc = {
+            "creation_date": datetime(2012 + rng.randint(0, 2), rng.randint(1, 12), rng.randint(1, 28)),
+            "department_name": rng.choice(DEPARTMENTS),
+            "acquisition_type": rng.choice(["IT Goods", "NON-IT Goods", "NON-IT Services"]),
+            "supplier_name": f"Supplier {rng.randint(1, 40)}",
+            "total_price": None if i % 17 == 0 else round(rng.uniform(10, 50000), 2),
+            "quantity": float(rng.randint(1, 20)),
+        }
+        computeDateFields(doc, "creation_date")
+        doc["fiscal_year"] = f"{doc['fiscal_year_start']}-{doc['fiscal_year_start'] + 1}"
+        docs.append(doc)
+
+    return docs
+
+
+DOCS = makeDocs()
+
+
+def buckets(grain="month"):
+    builder = TimeBucketBuilder(grain, DIMENSIONS)
+    for doc in DOCS:
+        builder.add(doc)
+    return builder.documents()
+
+
+def assertParity(pipeline, grain="month"):
+    rewritten = TimeBucketRewriter(grain, DIMENSIONS).rewrite(pipeline)
+    assert rewritten is not None
+
+    assertRowsMatch(runLocalAggregation(buckets(grain), rewritten), runLocalAggregation(DOCS, pipeline))
+
+
+def assertRowsMatch(actual, expected):
+    assert len(actual) == len(expected)
+    for want, got in zip(expected, actual):
+        assert got.keys() == want.keys()
+        for key, value in want.items():
+            assert got[key] == (pytest.approx(value) if isinstance(value, float) else value)
+
+
+def test_buckets_are_far_fewer_than_lines():
+    monthly = buckets("month")
+
+    assert sum(bucket["lines"] for bucket in monthly) == len(DOCS)
+    assert len(monthly) < len(DOCS) / 2
+
+
+def test_monthly_spend_trend_parity():
+    assertParity([
+        {"$group": {
+            "_id": {"year": "$calendar_year", "month": "$calendar_month"},
+            "totalSpend": {"$sum": "$total_price"},
+            "orders": {"$sum": 1},
+        }},
+        {"$sort": {"_id.year": 1, "_id.month": 1}},
+    ])
+
+
+def test_filtered_department_stats_parity():
+    assertParity([
+        {"$match": {"department_name": "Water Resources", "fiscal_year": {"$in": ["2013-2014", "2014-2015"]}}},
+        {"$group": {
+            "_id": "$fiscal_quarter",
+            "avgPrice": {"$avg": "$total_price"},
+            "maxPrice": {"$max": "$total_price"},
+            "minPrice": {"$min": "$total_price"},
+            "lines": {"$count": {}},
+            "quantity": {"$sum": "$quantity"},
+        }},
+        {"$project": {"_id": 0, "quarter": "$_id", "avgPrice": 1, "maxPrice": 1, "minPrice": 1, "lines": 1, "quantity": 1}},
+        {"$sort": {"quarter": 1}},
+    ])
+
+
+def test_date_expressions_and_aligned_ranges_parity():
+    assertParity([
+        {"$match": {"creation_date": {"$gte": datetime(2013, 1, 1), "$lt": datetime(2014, 7, 1)}}},
+        {"$group": {
+            "_id": {"y": {"$year": "$creation_date"}, "m": {"$month": {"date": "$creation_date"}}},
+            "totalSpend": {"$sum": "$total_price"},
+        }},
+        {"$sort": {"totalSpend": -1}},
+        {"$limit": 5},
+    ])
+
+
+def test_json_date_bounds_are_parsed_and_rewritten():
+    # Generated pipelines are parsed JSON: ISO strings and extended-JSON dates, never datetimes.
+    group = {"$group": {"_id": "$calendar_month", "totalSpend": {"$sum": "$total_price"}}}
+    fromJson = [{"$match": {"creation_date": {"$gte": "2013-01-01", "$lt": {"$date": "2014-07-01T00:00:00Z"}}}}, group]
+    native = [{"$match": {"creation_date": {"$gte": datetime(2013, 1, 1), "$lt": datetime(2014, 7, 1)}}}, group]
+
+    rewritten = TimeBucketRewriter("month", DIMENSIONS).rewrite(fromJson)
+
+    assert rewritten is not None
+    assert rewritten[0] == native[0]
+    assertRowsMatch(runLocalAggregation(buckets(), rewritten), runLocalAggregation(DOCS, native))
+
+    unaligned = [{"$match": {"creation_date": {"$gte": "2013-01-15T00:00:00"}}}, group]
+    assert TimeBucketRewriter("month", DIMENSIONS).rewrite(unaligned) is None
+
+
+def test_parse_date_forms():
+    assert parseDate("2014-07-01") == datetime(2014, 7, 1)
+    assert parseDate("2014-07-01T07:00:00-07:00") == datetime(2014, 7, 1, 14)
+    assert parseDate({"$date": {"$numberLong": "1404172800000"}}) == datetime(2014, 7, 1)
+    assert parseDate({"$date": 1404172800000}) == datetime(2014, 7, 1)
+    assert parseDate("Corrections") == "Corrections"
+
+
+def applyUpserts(store, updates):
+    # Minimal $inc/$min/$max upsert semantics of the bucket collection, keyed by the filter.
+    for query, update in updates:
+        key = tuple(sorted((field, repr(value)) for field, value in query.items()))
+        bucket = store.setdefault(key, {f: v for f, v in query.items() if not isinstance(v, dict)})
+
+        for field, value in update.get("$inc", {}).items():
+            bucket[field] = bucket.get(field, 0) + value
+        for operator, pick in (("$min", min), ("$max", max)):
+            for field, value in update.get(operator, {}).items():
+                bucket[field] = value if field not in bucket else pick(bucket[field], value)
+
+
+def test_bucket_upserts_accumulate_like_appended_lines():
+    store = {}
+
+    for part in (DOCS[:250], DOCS[250:]):
+        builder = TimeBucketBuilder("month", DIMENSIONS)
+        for doc in part:
+            builder.add(doc)
+        applyUpserts(store, builder.updates())
+
+    def byKey(documents):
+        return {tuple(doc.get(f) for f in TimeBucketBuilder("month", DIMENSIONS).keyFields): doc for doc in documents}
+
+    merged, whole = byKey(store.values()), byKey(buckets())
+
+    assert merged.keys() == whole.keys()
+    assert sum(doc[LINES_FIELD] for doc in merged.values()) == len(DOCS)
+    assertRowsMatch([merged[key] for key in whole], list(whole.values()))
+
+
+def test_day_grain_answers_day_of_month():
+    assertParity([
+        {"$group": {"_id": {"$dayOfMonth": "$creation_date"}, "totalSpend": {"$sum": "$total_price"}}},
+        {"$sort": {"_id": 1}},
+    ], grain="day")
+
+
+@pytest.mark.parametrize("pipeline", [
+    [{"$group": {"_id": "$supplier_name", "t": {"$sum": "$total_price"}}}],
+    [{"$match": {"total_price": {"$gt": 1000}}}, {"$group": {"_id": "$calendar_year", "t": {"$sum": 1}}}],
+    [{"$match": {"creation_date": {"$gte": datetime(2013, 1, 15)}}}, {"$group": {"_id": None, "t": {"$sum": 1}}}],
+    [{"$match": {"creation_date": {"$lte": datetime(2013, 2, 1)}}}, {"$group": {"_id": None, "t": {"$sum": 1}}}],
+    [{"$group": {"_id": "$calendar_month", "t": {"$sum": {"$multiply": ["$quantity", "$unit_price"]}}}}],
+    [{"$group": {"_id": {"$dayOfMonth": "$creation_date"}, "t": {"$sum": 1}}}],
+    [{"$group": {"_id": "$calendar_month", "first": {"$min": "$creation_date"}}}],
+    [{"$sort": {"creation_date": 1}}, {"$group": {"_id": "$calendar_month", "t": {"$sum": 1}}}],
+    [{"$match": {"calendar_year": 2013}}, {"$limit": 10}],
+])
+def test_pipelines_buckets_cannot_answer_are_left_alone(pipeline):
+    assert TimeBucketRewriter("month", DIMENSIONS).rewrite(pipeline) is None
+
+
+def test_rewriting_is_off_without_a_bucket_collection(monkeypatch):
+    pipeline = [{"$group": {"_id": "$calendar_year", "t": {"$sum": "$total_price"}}}]
+
+    monkeypatch.setattr(settings, "timeBucketCollection", "")
+    assert mongo.timeBucketRewrite(pipeline) is None
+
+    monkeypatch.setattr(settings, "timeBucketCollection", "purchases_monthly")
+    monkeypatch.setattr(mongo, "_timeBucketRewriter", None)
+    assert mongo.timeBucketRewrite(pipeline) == pipeline
+
+
+def test_line_item_queries_get_parsed_date_bounds_too(monkeypatch):
+    seen = []
+    monkeypatch.setattr(settings, "timeBucketCollection", "")
+    monkeypatch.setattr(mongo, "_aggregate", lambda pipeline, columns, *args: seen.append(pipeline) or [])
+
+    mongo._runAggregation([{"$match": {"creation_date": {"$gte": "2013-01-15"}}}, {"$limit": 5}], None)
+
+    assert seen == [[{"$match": {"creation_date": {"$gte": datetime(2013, 1, 15)}}}, {"$limit": 5}]]
+
@@ -0,0 +1,56 @@
+"""Tests for request tracing spans and exporters."""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from app.core import tracing
+from app.core.tracing import JsonlSpanExporter, startSpan, toOtlpPayload
+
+
+def _collect(monkeypatch):
+    exported = []
+    monkeypatch.setattr(tracing, "_exportTrace", lambda trace: exported.append(list(trace.spans)))
+    return exported
+
+
+def test_spans_nest_across_executor_threads(monkeypatch):
+    exported = _collect(monkeypatch)
+
+    def work():
+        with startSpan("aggregation", resultCount=3):
+            pass
+
+    with startSpan("chat") as root:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(copy_context().run, work).result()
+
+    [spans] = exported
+    byName = {span["name"]: span for span in spans}
+
+    assert byName["aggregation"]["traceId"] == root.traceId
+    assert byName["aggregation"]["parentId"] == root.spanId
+    assert byName["aggregation"]["attributes"] == {"resultCount": 3}
+    assert byName["chat"]["parentId"] is None
+
+
+def test_errors_are_recorded_and_exported(monkeypatch, tmp_path):
+    exported = _collect(monkeypatch)
+
+    try:
+        with startSpan("chat"):
+            with startSpan("agent.result_summarizer"):
+                raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    [spans] = exported
+    assert [span["status"] for span in spans] == ["error", "error"]
+
+    path = tmp_path / "spans.jsonl"
+    JsonlSpanExporter(str(path)).export(spans)
+    assert [json.loads(line)["name"] for line in path.read_text().splitlines()] == ["agent.result_summarizer", "chat"]
+
+    otlpSpans = toOtlpPayload(spans)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert otlpSpans[0]["parentSpanId"] == otlpSpans[1]["spanId"]
+    assert otlpSpans[0]["status"] == {"code": 2, "message": "RuntimeError: boom"}
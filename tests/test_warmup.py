@@ -0,0 +1,69 @@
+"""Tests for startup warmup readiness."""
+
+from threading import Event
+
+import app.core.warmup as warmupModule
+from app.core.warmup import WarmupState
+
+
+def test_ready_only_after_required_steps_succeed():
+    state = WarmupState()
+
+    state.record("imports", required=True, seconds=0.1, error=None)
+    state.record("tokenizer", required=False, seconds=0.0, error="RuntimeError: offline")
+    assert not state.ready
+
+    state.completed = True
+    assert state.ready
+
+    state.record("mongo", required=True, seconds=30.0, error="ServerSelectionTimeoutError: down")
+    assert not state.ready
+    assert state.snapshot()["steps"]["mongo"]["status"] == "error"
+
+
+def test_failed_required_steps_are_retried_until_they_pass(monkeypatch):
+    state = WarmupState()
+    monkeypatch.setattr(warmupModule, "warmupState", state)
+    monkeypatch.setattr(warmupModule, "_stopRequested", Event())
+    monkeypatch.setattr(warmupModule.settings, "warmupRetrySeconds", 0.01)
+
+    calls = {"mongo": 0, "entityIndex": 0}
+
+    def pingMongo():
+        calls["mongo"] += 1
+        if calls["mongo"] < 3:
+            raise ConnectionError("mongo down")
+
+    def buildEntityIndex():
+        calls["entityIndex"] += 1
+        if calls["mongo"] < 3:
+            raise ConnectionError("mongo down")
+
+    warmupModule.runWarmup([
+        ("mongo", pingMongo, True),
+        ("entityIndex", buildEntityIndex, False),
+        ("tokenizer", lambda: None, False),
+    ])
+
+    assert state.ready
+    assert state.snapshot()["steps"]["mongo"]["attempts"] == 3
+    # The optional step that failed with MongoDB is retried once after it recovers.
+    assert calls["entityIndex"] == 2
+    assert state.snapshot()["steps"]["tokenizer"]["attempts"] == 1
+
+
+def test_stop_ends_the_retry_loop(monkeypatch):
+    state = WarmupState()
+    stop = Event()
+    stop.set()
+    monkeypatch.setattr(warmupModule, "warmupState", state)
+    monkeypatch.setattr(warmupModule, "_stopRequested", stop)
+    monkeypatch.setattr(warmupModule.settings, "warmupRetrySeconds", 30)
+
+    def pingMongo():
+        raise ConnectionError("mongo down")
+
+    warmupModule.runWarmup([("mongo", pingMongo, True)])
+
+    assert state.completed and not state.ready
+    assert state.snapshot()["steps"]["mongo"]["attempts"] == 1